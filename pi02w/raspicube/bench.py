@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Render benchmarks for RasPiCube
+
+Drives every display_* screen of PiCubeTimer, plus a simulated solve (prep
+screens, running timer at 20 FPS, stop, completion, results), against an
+in-memory display device, and reports per screen:
+
+- fps / ms per frame: wall time of the display_* call, diffing included
+- bytes per frame:    pixel bytes that would go over SPI (or into /dev/fb)
+- allocations per frame: peak Python/NumPy memory allocated during a frame
+  (tracemalloc, measured in a separate pass so it doesn't skew the timing)
+  and how much of it is still held afterwards (growth per frame)
+
+No GPIO, SPI or storage is touched (RPi.GPIO and luma need not even be
+installed), and frames are pushed synchronously (no render thread), so the
+numbers are the CPU cost of one frame. Logging is
+turned down to warnings while the benchmark runs.
+
+    python3 bench.py [FRAMES] [--device luma|spidev|fbdev] [--json OUT.json] [--compare OLD.json]
+
+--device picks what receives the frames: luma (a NullDevice counting
+command()/data() calls), spidev (the st7789spi driver on a fake SPI bus) or
+fbdev (FramebufferDisplay on a temporary file). --compare prints the change
+against a previous --json run.
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import raspicube
+from raspicube import PiCubeTimer, FontManager, Colors, DISPLAY_WIDTH, DISPLAY_HEIGHT, TIMER_PIN
+from display import DirtyRectDisplay, LayerCache, NullDevice
+from inputs import ButtonInput
+from stats import SolveStats
+
+logger = logging.getLogger("raspicube")
+
+# What one pass of the solve loop may still allocate for a moment: CPython
+# int objects for the clock arithmetic and NumPy's per-call bookkeeping,
+# nothing frame-sized. None of it may be kept (traced memory must not grow).
+SOLVE_ALLOC_SLACK = 256
+# Growth allowed over the whole check: the device's counters (bytes sent,
+# transfers) each end up holding one int object allocated while tracing.
+# Keeping one object every 20 frames would already be several times this.
+SOLVE_GROWTH_LIMIT = 256
+# The check runs the solve loop at 1000 FPS instead of 20 so it takes seconds
+SOLVE_CHECK_FRAME_NS = 1000000
+# Diffing/pushing (render thread) also gets NumPy reduction temporaries of a
+# few hundred bytes each; a full-frame mask or copy would be 76800+ bytes
+RENDER_ALLOC_LIMIT = 16384
+
+
+class FakeSPI:
+    """spidev.SpiDev stand-in that only counts what is written"""
+
+    def __init__(self):
+        self.transfers = 0
+        self.bytes = 0
+
+    def writebytes2(self, data):
+        self.transfers += 1
+        self.bytes += len(data)
+
+    def close(self):
+        pass
+
+
+class FakeGPIO:
+    """Just enough of RPi.GPIO for the DC/reset pins of st7789spi and ButtonInput"""
+    OUT = 0
+    BOTH = 3
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+
+    def setup(self, pin, mode):
+        pass
+
+    def output(self, pin, level):
+        pass
+
+    def input(self, pin):
+        return self.levels.get(pin, 0)
+
+    def add_event_detect(self, pin, edge, callback):
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def press(self, pin, level=1):
+        """Change a button's level and fire its edge callback, like a finger would"""
+        self.levels[pin] = level
+        self.callbacks[pin](pin)
+
+
+def make_screen(device):
+    """A synchronous dirty-rect screen on the requested fake device"""
+    if device == "spidev":
+        from st7789spi import ST7789
+        panel = ST7789(width=DISPLAY_HEIGHT, height=DISPLAY_WIDTH, rotation=1, spi=FakeSPI(), gpio=FakeGPIO())
+        return DirtyRectDisplay(panel, DISPLAY_WIDTH, DISPLAY_HEIGHT), panel.close
+    if device == "fbdev":
+        from fbdev import FramebufferDisplay
+        stride = DISPLAY_WIDTH * 2
+        f = tempfile.NamedTemporaryFile()
+        f.truncate(stride * DISPLAY_HEIGHT)
+        screen = FramebufferDisplay(f.name, DISPLAY_WIDTH, DISPLAY_HEIGHT,
+                                    (DISPLAY_WIDTH, DISPLAY_HEIGHT), 16, stride)
+
+        def close():
+            screen.close()
+            f.close()
+        return screen, close
+    return DirtyRectDisplay(NullDevice(), DISPLAY_WIDTH, DISPLAY_HEIGHT), lambda: None
+
+
+def make_timer(screen, solves=100):
+    """
+    A PiCubeTimer with fonts, layer cache and timer buffer but no GPIO,
+    display hardware, scrambler or storage; `solves` random solves are
+    loaded into its statistics.
+    """
+    timer = PiCubeTimer.__new__(PiCubeTimer)
+    timer.screen = screen
+    timer.device = None
+    timer.font_manager = FontManager()
+    timer.layers = LayerCache((DISPLAY_WIDTH, DISPLAY_HEIGHT), Colors.BLACK,
+                              max_layers=raspicube.SCREEN_CACHE_SIZE)
+    timer.setup_timer_buffer()
+    timer.solver = None
+    timer.scrambles = None
+    timer.solve_times = [{"time": round(random.uniform(8, 30), 6), "scramble": "", "timestamp": 0}
+                         for _ in range(solves)]
+    timer.stats = SolveStats()
+    timer.stats.extend_times(entry["time"] for entry in timer.solve_times)
+    timer.backlight_on = True
+    timer.last_touch_time = timer.ticks_ms()
+    return timer
+
+
+def scenarios(timer, frames):
+    """{name: frame(i)} for every screen, plus the simulated solve"""
+    scrambles = [timer.generate_random_moves() for _ in range(16)]
+    prep = [("Hold GP26 to prep", Colors.YELLOW), ("Keep holding it", Colors.YELLOW),
+            ("Release to start!", Colors.RED)]
+
+    def solve(i):
+        # One frame of a solve `frames` frames long, in the order timer_control shows them
+        step = i % (frames + 6)
+        if step < 3:
+            timer.display_timer_prep(*prep[step])
+        elif step == 3:
+            timer.clear_timer_buffer()
+            timer.display_running_timer(0)
+        elif step < frames + 3:
+            timer.display_running_timer((step - 3) * 50000000)
+        elif step == frames + 3:
+            timer.display_timer_fast((step - 3) * 0.05 + 0.0123, running=False)
+        elif step == frames + 4:
+            timer.display_completion((step - 4) * 0.05 + 0.0123)
+        else:
+            final = (step - 5) * 0.05 + 0.0123
+            timer.solve_times.append({"time": final, "scramble": "", "timestamp": 0})
+            timer.stats.add(final)
+            timer.display_results_and_avgs(final, timer.solve_times)
+
+    def timer_fast(i):
+        if i == 0:
+            timer.clear_timer_buffer()
+        timer.display_timer_fast(i * 0.05, running=True)
+
+    def running_timer(i):
+        if i == 0:
+            timer.clear_timer_buffer()
+        timer.display_running_timer(i * 50000000)
+
+    return {
+        "scramble": lambda i: timer.display_scramble(scrambles[i % len(scrambles)]),
+        "timer_fast": timer_fast,
+        "running_timer": running_timer,
+        "timer": lambda i: timer.display_timer(i * 0.05, running=True),
+        "timer_prep": lambda i: timer.display_timer_prep(*prep[i % len(prep)]),
+        "completion": lambda i: timer.display_completion(10 + i * 0.001),
+        "results": lambda i: timer.display_results_and_avgs(10 + i * 0.001, timer.solve_times),
+        "results_cleared": lambda i: timer.display_results_and_avgs(0.0, [], clear_msg=True),
+        "are_you_sure": lambda i: timer.display_are_you_sure(),
+        "fill_screen": lambda i: timer.fill_screen(Colors.BLACK if i % 2 else Colors.BLUE),
+        "solve": solve,
+    }
+
+
+def measure(frame, screen, frames):
+    """Timing pass, then an allocation pass, of `frames` calls to frame(i)"""
+    frame(0)    # warm up: layer cache, glyphs, first full frame
+    sent = screen.bytes_sent
+    start = time.perf_counter()
+    for i in range(1, frames + 1):
+        frame(i)
+    elapsed = time.perf_counter() - start
+    sent = screen.bytes_sent - sent
+
+    tracemalloc.start()
+    # One traced frame first, so buffers that are replaced every frame
+    # (e.g. the screen's copy of the last frame) don't count as retained
+    frame(frames + 1)
+    peak_total = 0
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(frames + 2, 2 * frames + 2):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        frame(i)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - current
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = elapsed * 1000 / frames
+    return {
+        "frames": frames,
+        "fps": round(1000 / ms, 1) if ms else None,
+        "ms_per_frame": round(ms, 4),
+        "bytes_per_frame": round(sent / frames, 1),
+        "alloc_bytes_per_frame": round(peak_total / frames, 1),
+        "retained_bytes_per_frame": round((retained - before) / frames, 1),
+    }
+
+
+def solve_allocations(frames=2000, device="luma"):
+    """
+    tracemalloc check of the solve hot loop: the real timer_control(), with
+    its ButtonInput on a FakeGPIO and a thread pressing the timer button, so
+    each measured pass is the button wait, the clock and
+    display_running_timer exactly as during a solve (at SOLVE_CHECK_FRAME_NS
+    per frame). After a warm-up, traced memory (less this module's own
+    bookkeeping) may grow by at most SOLVE_GROWTH_LIMIT bytes over `frames`
+    frames. Two solves: composing only (the UI thread's share, at most
+    SOLVE_ALLOC_SLACK bytes per pass) and composing plus diffing and pushing
+    to the device (the render thread's share, at most RENDER_ALLOC_LIMIT
+    bytes per pass).
+    """
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    frame_ns = raspicube.RUNNING_FRAME_NS
+    raspicube.RUNNING_FRAME_NS = SOLVE_CHECK_FRAME_NS
+    screen, close = make_screen(device)
+    gpio = FakeGPIO()
+    buttons = ButtonInput((TIMER_PIN,), gpio=gpio)
+    results = {}
+    try:
+        timer = make_timer(screen)
+        timer.buttons = buttons
+        for name, target, limit in (("compose", None, SOLVE_ALLOC_SLACK),
+                                    ("frame", screen, RENDER_ALLOC_LIMIT)):
+            timer.screen = target
+            r = _traced_solve(timer, gpio, frames)
+            r["ok"] = r["max_alloc_bytes"] <= limit and r["growth_bytes"] <= SOLVE_GROWTH_LIMIT
+            results[name] = r
+    finally:
+        buttons.close()
+        close()
+        raspicube.RUNNING_FRAME_NS = frame_ns
+        logger.setLevel(level)
+    return results
+
+
+def _traced_solve(timer, gpio, frames, warmup=20):
+    """One solve through timer_control(), tracing `frames` passes of its loop"""
+    draw = timer.display_running_timer
+    # count, traced memory after the last pass, worst pass, total
+    state = [0, 0, 0, 0]
+    snapshots = []
+    # Released once the traced passes are done; a plain lock, so the button
+    # thread waiting on it doesn't allocate anything while we trace
+    traced = threading.Lock()
+    traced.acquire()
+
+    def frame(elapsed_ns):
+        draw(elapsed_ns)
+        state[0] += 1
+        if state[0] == warmup:
+            tracemalloc.start()
+        elif state[0] == warmup + 1:
+            # One traced pass first, so the loop's own live values (the clock
+            # readings it holds) are traced at both ends
+            snapshots.append(tracemalloc.take_snapshot())
+        elif state[0] <= warmup + frames + 1:
+            _, peak = tracemalloc.get_traced_memory()
+            state[2] = max(state[2], peak - state[1])
+            state[3] += peak - state[1]
+            if state[0] == warmup + frames + 1:
+                snapshots.append(tracemalloc.take_snapshot())
+                tracemalloc.stop()
+                traced.release()
+                return
+        else:
+            return
+        state[1], _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+    def fingers():
+        time.sleep(0.05)
+        gpio.press(TIMER_PIN)           # hold past HOLD_TIME_MS...
+        time.sleep(0.5)
+        gpio.press(TIMER_PIN, 0)        # ...and release: the clock starts
+        traced.acquire()
+        time.sleep(0.01)
+        gpio.press(TIMER_PIN)           # stop
+        time.sleep(0.01)
+        gpio.press(TIMER_PIN, 0)
+
+    thread = threading.Thread(target=fingers, name="bench-buttons", daemon=True)
+    timer.display_running_timer = frame
+    thread.start()
+    try:
+        timer.timer_control()
+    finally:
+        del timer.display_running_timer
+        thread.join()
+    # The snapshots and the counters above aren't the solve loop's
+    ours = (tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__))
+    start, end = (snapshot.filter_traces(ours) for snapshot in snapshots)
+    return {
+        "frames": frames,
+        "max_alloc_bytes": state[2],
+        "mean_alloc_bytes": round(state[3] / frames, 1),
+        "growth_bytes": sum(stat.size_diff for stat in end.compare_to(start, "filename")),
+    }
+
+
+def run(frames=200, device="luma"):
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    screen, close = make_screen(device)
+    try:
+        colmod = getattr(screen.device, "colmod", None)
+        if colmod is not None and colmod != 0x55:
+            raise RuntimeError(f"Panel left in pixel format 0x{colmod:02X}, frames are sent as RGB565 (0x55)")
+        random.seed(0)
+        timer = make_timer(screen)
+        results = {name: measure(frame, screen, frames)
+                   for name, frame in scenarios(timer, frames).items()}
+    finally:
+        close()
+        logger.setLevel(level)
+    return {
+        "version": raspicube.VERSION,
+        "device": device,
+        "timer_pipeline": raspicube.TIMER_PIPELINE,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "frames": frames,
+        "screens": results,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"RasPiCube {report['version']} | device {report['device']} | "
+          f"pipeline {report['timer_pipeline']} | {report['frames']} frames/screen")
+    print(f"{'screen':16s} {'fps':>8s} {'ms/frame':>9s} {'bytes/frame':>12s} {'alloc B/frame':>14s} {'retained B':>11s}")
+    for name, r in report["screens"].items():
+        line = (f"{name:16s} {r['fps'] or 0:8.1f} {r['ms_per_frame']:9.3f} {r['bytes_per_frame']:12.0f} "
+                f"{r['alloc_bytes_per_frame']:14.0f} {r['retained_bytes_per_frame']:11.1f}")
+        old = (baseline or {}).get("screens", {}).get(name)
+        if old and old["ms_per_frame"]:
+            change = (r["ms_per_frame"] - old["ms_per_frame"]) / old["ms_per_frame"] * 100
+            line += f"  {change:+6.1f}% ms vs {baseline['version']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RasPiCube render benchmarks")
+    parser.add_argument("frames", nargs="?", type=int, default=200)
+    parser.add_argument("--device", choices=("luma", "spidev", "fbdev"), default="luma")
+    parser.add_argument("--json", metavar="OUT", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="OLD", help="previous --json output to compare against")
+    parser.add_argument("--check-solve", action="store_true",
+                        help="only run the solve-loop allocation check (exit status 1 if it fails)")
+    args = parser.parse_args()
+
+    if args.check_solve:
+        results = solve_allocations(max(args.frames, 2000), args.device)
+        for name, r in results.items():
+            print(f"{name:8s} max {r['max_alloc_bytes']:6d} B/frame  mean {r['mean_alloc_bytes']:7.1f} B/frame  "
+                  f"growth {r['growth_bytes']:6d} B over {r['frames']} frames  {'OK' if r['ok'] else 'FAIL'}")
+        sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+    report = run(args.frames, args.device)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report, baseline)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
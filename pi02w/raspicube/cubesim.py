@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+NumPy 3x3 cube simulator for RasPiCube
+
+A cube state is 54 facelets in the usual URFDLB order (U1..U9, R1..R9, ...),
+each holding the face index (0-5) of the sticker colour. All 18 face turns
+are precomputed as permutation arrays, so applying a move is a single
+fancy-indexing gather, and whole batches of states (one row each) are moved
+at once.
+
+For a batch of different scrambles, every scramble is first composed into a
+single 54-entry permutation (all rows in parallel, one gather per move
+position), then applied to the states in one more gather. Validating a whole
+session's scrambles therefore takes a few milliseconds even on a Pi Zero 2 W.
+
+The turn definitions come from the cubie model in twophase.py, so this
+simulator and the scramble generator always agree on what "R" means.
+
+    python3 cubesim.py bench [N]    # time verifying N random-move scrambles
+"""
+
+import sys
+import time
+import random
+
+import numpy as np
+
+from twophase import MOVE_CUBES, MOVE_NAMES
+
+FACES = "URFDLB"
+N_FACELETS = 54
+
+# Facelet index of each corner/edge sticker, in cubie slot order (Kociemba)
+_U, _R, _F, _D, _L, _B = (9 * i for i in range(6))
+CORNER_FACELETS = (
+    (_U + 8, _R + 0, _F + 2), (_U + 6, _F + 0, _L + 2),
+    (_U + 0, _L + 0, _B + 2), (_U + 2, _B + 0, _R + 2),
+    (_D + 2, _F + 8, _R + 6), (_D + 0, _L + 8, _F + 6),
+    (_D + 6, _B + 8, _L + 6), (_D + 8, _R + 8, _B + 6),
+)
+EDGE_FACELETS = (
+    (_U + 5, _R + 1), (_U + 7, _F + 1), (_U + 3, _L + 1), (_U + 1, _B + 1),
+    (_D + 5, _R + 7), (_D + 1, _F + 7), (_D + 3, _L + 7), (_D + 7, _B + 7),
+    (_F + 5, _R + 3), (_F + 3, _L + 5), (_B + 5, _L + 3), (_B + 3, _R + 5),
+)
+
+SOLVED = np.repeat(np.arange(6, dtype=np.uint8), 9)
+IDENTITY = np.arange(N_FACELETS, dtype=np.intp)
+
+# Move index used to pad scrambles of different lengths
+NO_MOVE = len(MOVE_NAMES)
+_MOVE_INDEX = {name: i for i, name in enumerate(MOVE_NAMES)}
+
+
+def cubie_to_perm(cube):
+    """
+    Facelet permutation for a cubie-level cube (twophase.py format):
+    new_state = state[perm]
+    """
+    cp, co, ep, eo = cube
+    perm = IDENTITY.copy()
+    for i in range(8):
+        for k in range(3):
+            perm[CORNER_FACELETS[i][(k + co[i]) % 3]] = CORNER_FACELETS[cp[i]][k]
+    for i in range(12):
+        for k in range(2):
+            perm[EDGE_FACELETS[i][(k + eo[i]) % 2]] = EDGE_FACELETS[ep[i]][k]
+    return perm
+
+
+# (19, 54): the 18 face turns plus the identity for padding
+MOVE_PERMS = np.vstack([cubie_to_perm(cube) for cube in MOVE_CUBES] + [IDENTITY])
+
+
+def parse_scramble(scramble):
+    """Move indices for a scramble string such as "R U2 F'" """
+    return [_MOVE_INDEX[token] for token in scramble.split()]
+
+
+def scramble_perm(scramble):
+    """Single permutation equivalent to a whole scramble"""
+    perm = IDENTITY
+    for m in parse_scramble(scramble):
+        perm = perm[MOVE_PERMS[m]]
+    return perm
+
+
+def apply_scramble(states, scramble):
+    """Apply one scramble to one state (54,) or a batch of states (N, 54)"""
+    return np.asarray(states)[..., scramble_perm(scramble)]
+
+
+def encode_scrambles(scrambles):
+    """Pack scramble strings into an (N, max_len) move-index array"""
+    parsed = [parse_scramble(s) for s in scrambles]
+    width = max((len(p) for p in parsed), default=0)
+    moves = np.full((len(parsed), width), NO_MOVE, dtype=np.intp)
+    for row, p in enumerate(parsed):
+        moves[row, :len(p)] = p
+    return moves
+
+
+def batch_perms(moves):
+    """Compose every row of an (N, L) move array into an (N, 54) permutation"""
+    perms = np.broadcast_to(IDENTITY, (moves.shape[0], N_FACELETS))
+    for step in range(moves.shape[1]):
+        perms = np.take_along_axis(perms, MOVE_PERMS[moves[:, step]], axis=1)
+    return np.array(perms)
+
+
+def apply_scrambles(scrambles, states=None):
+    """Apply scramble i to state i (solved cubes by default), all at once"""
+    perms = batch_perms(encode_scrambles(scrambles))
+    if states is None:
+        states = np.broadcast_to(SOLVED, perms.shape)
+    return np.take_along_axis(np.asarray(states), perms, axis=1)
+
+
+def is_solved(states):
+    """True where every face is a single colour; works on (54,) or (N, 54)"""
+    faces = np.asarray(states).reshape(*np.shape(states)[:-1], 6, 9)
+    return (faces == faces[..., :1]).all(axis=(-1, -2))
+
+
+def to_facelet_string(state):
+    """State as a 54 character URFDLB string (the usual solver input format)"""
+    return "".join(FACES[c] for c in state)
+
+
+def verify_scrambles(scrambles):
+    """
+    Check a batch of scrambles: every move must parse and the scramble must
+    actually scramble the cube. Returns a boolean array (True = valid).
+    """
+    scrambles = list(scrambles)
+    valid = np.zeros(len(scrambles), dtype=bool)
+    good = []
+    for i, s in enumerate(scrambles):
+        try:
+            parse_scramble(s)
+            good.append(i)
+        except KeyError:
+            pass
+    if good:
+        states = apply_scrambles([scrambles[i] for i in good])
+        valid[good] = ~is_solved(states)
+    return valid
+
+
+def benchmark(count=1000):
+    """Verify `count` random 20-move scrambles and report the time taken"""
+    names = MOVE_NAMES
+    scrambles = [" ".join(random.choice(names) for _ in range(20)) for _ in range(count)]
+    start = time.perf_counter()
+    valid = verify_scrambles(scrambles)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Verified {count} scrambles in {elapsed:.1f} ms "
+          f"({elapsed * 1000 / count:.1f} us each), {int(valid.sum())} valid")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    else:
+        print("Usage: python3 cubesim.py bench [N]")
+        sys.exit(1)
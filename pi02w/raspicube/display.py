@@ -0,0 +1,531 @@
+"""
+Display output for RasPiCube
+
+DirtyRectDisplay sits between PiCubeTimer and the luma ST7789 device. It
+keeps the last frame that was pushed (as RGB565), diffs each new frame
+against it with NumPy, and only sends the changed regions using ST7789
+column/row address windows (CASET/RASET + RAMWR). Identical frames are
+skipped entirely, so the running timer only costs a few KB of SPI traffic
+per update instead of the full 150 KB frame.
+
+RenderThread moves that work (diffing and SPI transfers) off the UI thread.
+Frames are copied into a back buffer and swapped to the renderer's front
+buffer; if several frames arrive while one is being sent, only the newest
+one is shown, so a slow transfer never delays input handling.
+
+Screens can also skip PIL entirely: a Frame565 is composed straight into a
+big-endian RGB565 NumPy buffer (the timer uses pre-converted digit glyphs),
+so nothing has to be converted or byte-swapped per frame. PIL frames are
+diffed in RGB first and only their changed regions are converted.
+
+LayerCache keeps the static parts of each screen (titles, prompts, version)
+pre-rendered, so showing a screen is a copy plus its dynamic text.
+
+    python3 display.py bench [FRAMES]    # canvas vs Image vs RGB565 timer frames
+"""
+
+import sys
+import time
+import math
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger("raspicube")
+
+# ST7789 commands
+_CASET = 0x2A
+_RASET = 0x2B
+_RAMWR = 0x2C
+_COLMOD = 0x3A
+_COLMOD_RGB565 = 0x55
+_COLMOD_RGB666 = 0x06    # what luma.lcd's st7789 init selects
+
+# Changed row bands closer than this are sent as one window
+MERGE_GAP_ROWS = 8
+# If the dirty area is bigger than this fraction of the screen, send it all
+FULL_FRAME_RATIO = 0.6
+
+# Everything the running/stopped timer readout can contain
+TIMER_CHARS = "0123456789.: "
+
+
+def rgb_to_565(pixels):
+    """(H, W, 3) uint8 RGB array -> (H, W) uint16 RGB565"""
+    pixels = pixels.astype(np.uint16)
+    return ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+
+
+def dirty_rects(changed, merge_gap=MERGE_GAP_ROWS, bytes_per_pixel=1):
+    """
+    Bounding boxes (x0, y0, x1, y1), end-exclusive, covering every True
+    pixel of a (H, W) bool array. Runs of changed rows become one box each;
+    runs separated by fewer than `merge_gap` rows are merged.
+
+    `changed` may also be a per-byte mask of packed pixels (H, W * bytes_per_pixel);
+    the boxes are still returned in pixels.
+    """
+    rows = changed.any(axis=1)
+    if not rows.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.view(np.int8), [0]))))
+    bands = []
+    for y0, y1 in zip(edges[::2], edges[1::2]):
+        if bands and y0 - bands[-1][1] < merge_gap:
+            bands[-1][1] = y1
+        else:
+            bands.append([y0, y1])
+    rects = []
+    for y0, y1 in bands:
+        cols = changed[y0:y1].any(axis=0)
+        x0 = int(cols.argmax()) // bytes_per_pixel
+        x1 = -(-(len(cols) - int(cols[::-1].argmax())) // bytes_per_pixel)
+        rects.append((x0, int(y0), x1, int(y1)))
+    return rects
+
+
+def color_565(color):
+    """RGB tuple -> RGB565 value"""
+    r, g, b = color
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
+
+class Frame565:
+    """
+    Frame composed directly in RGB565, stored big-endian so it can go to
+    the panel without any per-frame conversion or byte swapping.
+    """
+
+    def __init__(self, width, height, color=(0, 0, 0)):
+        self.width = width
+        self.height = height
+        self.pixels = np.full((height, width), color_565(color), dtype=">u2")
+
+    def fill(self, color):
+        self.pixels.fill(color_565(color))
+
+    def fill_rect(self, x0, y0, x1, y1, color):
+        """Fill [x0, x1) x [y0, y1), clipped to the frame"""
+        self.pixels[max(y0, 0):max(y1, 0), max(x0, 0):max(x1, 0)] = color_565(color)
+
+    def blit(self, src, x, y):
+        """Copy a (h, w) RGB565 array with its top-left corner at (x, y)"""
+        h, w = src.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self.width), min(y + h, self.height)
+        if x0 < x1 and y0 < y1:
+            self.pixels[y0:y1, x0:x1] = src[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    def copy(self):
+        frame = Frame565.__new__(Frame565)
+        frame.width, frame.height = self.width, self.height
+        frame.pixels = self.pixels.copy()
+        return frame
+
+
+class DigitAtlas:
+    """
+    Timer characters rasterized once per colour, so drawing the readout is
+    just a few image pastes instead of FreeType work on every frame. Every
+    character gets the same advance (the widest one), which also stops the
+    readout from jittering as digits change.
+    """
+
+    def __init__(self, font, colors, background=(0, 0, 0), chars=TIMER_CHARS):
+        self.advance = max(math.ceil(font.getlength(ch)) for ch in chars)
+        self.height = max(font.getbbox(ch)[3] for ch in chars)
+        self.glyphs = {}
+        self.glyphs565 = {}
+        for color in colors:
+            for ch in chars:
+                cell = Image.new("RGB", (self.advance, self.height), background)
+                ImageDraw.Draw(cell).text((0, 0), ch, font=font, fill=color)
+                self.glyphs[color, ch] = cell
+                self.glyphs565[color, ch] = rgb_to_565(np.asarray(cell)).astype(">u2")
+
+    def width(self, text):
+        return len(text) * self.advance
+
+    def draw(self, image, text, x, y, color):
+        """Paste `text` into `image` with its top-left corner at (x, y)"""
+        for i, ch in enumerate(text):
+            image.paste(self.glyphs[color, ch], (x + i * self.advance, y))
+
+    def draw_565(self, frame, text, x, y, color):
+        """Same as draw(), into a Frame565"""
+        for i, ch in enumerate(text):
+            frame.blit(self.glyphs565[color, ch], x + i * self.advance, y)
+
+
+class RunningReadout:
+    """
+    The running timer ("{:6.1f}" seconds) drawn into a Frame565 without
+    allocating anything per frame: the six character cells are views into
+    the frame made up front, digits are worked out from an integer number
+    of tenths, and only cells whose character changed are copied.
+    """
+
+    CHARS = 6
+    MAX_TENTHS = 99999     # 9999.9 s, the widest value that fits "{:6.1f}"
+
+    def __init__(self, atlas, frame, x, y, color):
+        advance = atlas.advance
+        self.box = (x, y, x + self.CHARS * advance, y + atlas.height)
+        self._cells = [frame.pixels[y:y + atlas.height, x + i * advance:x + (i + 1) * advance]
+                       for i in range(self.CHARS)]
+        # Glyph index: 0-9 digits, 10 point, 11 blank
+        self._glyphs = [atlas.glyphs565[color, ch] for ch in "0123456789. "]
+        self._shown = [-1] * self.CHARS
+        self.tenths = -1
+
+    def reset(self):
+        """Forget what is on screen (after the frame was cleared)"""
+        for i in range(self.CHARS):
+            self._shown[i] = -1
+        self.tenths = -1
+
+    def _put(self, i, glyph):
+        if self._shown[i] != glyph:
+            np.copyto(self._cells[i], self._glyphs[glyph])
+            self._shown[i] = glyph
+
+    def draw(self, tenths):
+        """Draw `tenths` / 10 seconds; False if it is unchanged (nothing drawn)"""
+        if tenths == self.tenths:
+            return False
+        self.tenths = tenths
+        self._put(5, tenths % 10)
+        self._put(4, 10)
+        value = tenths // 10
+        # Integer part right-aligned in cells 0-3, blank-padded
+        for i in (3, 2, 1, 0):
+            if value or i == 3:
+                self._put(i, value % 10)
+                value //= 10
+            else:
+                self._put(i, 11)
+        return True
+
+
+class LayerCache:
+    """
+    Size-bounded LRU of pre-rendered static screen layers. A layer is keyed
+    by everything it depends on (screen name, text, colours...), so when the
+    content changes it simply gets a new entry and the old one ages out.
+    """
+
+    def __init__(self, size, background=(0, 0, 0), max_layers=12):
+        self.size = size
+        self.background = background
+        self.max_layers = max_layers
+        self._layers = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, draw_func):
+        """The layer for `key`, drawn with draw_func(draw) the first time. Don't modify it"""
+        layer = self._layers.get(key)
+        if layer is not None:
+            self._layers.move_to_end(key)
+            self.hits += 1
+            return layer
+        self.misses += 1
+        layer = Image.new("RGB", self.size, self.background)
+        draw_func(ImageDraw.Draw(layer))
+        self._layers[key] = layer
+        if len(self._layers) > self.max_layers:
+            self._layers.popitem(last=False)
+        return layer
+
+    def clear(self):
+        self._layers.clear()
+
+
+class DirtyRectDisplay:
+    """
+    Push frames to a luma ST7789, sending only what changed. Frames are
+    either PIL RGB images or Frame565 buffers (see Frame565).
+
+    Pixels go out as 2-byte RGB565. luma.lcd's st7789 leaves the panel in
+    18-bit mode (its display() sends 3 bytes per pixel), so the pixel format
+    is switched to RGB565 when the device is wrapped.
+    """
+
+    def __init__(self, device, width, height):
+        self.device = device
+        if device is not None:
+            device.command(_COLMOD, _COLMOD_RGB565)
+        self.width = width
+        self.height = height
+        # Panel contents as big-endian RGB565, plus the RGB frame it came from
+        # (if it came from a PIL image) so PIL frames can be diffed before
+        # anything is converted
+        self._last = None
+        self._last_rgb = None
+        # Reused every frame: the changed-pixel mask and the staging buffer
+        # a window's pixels are packed into before they go to the device
+        self._changed = np.empty((height, width), dtype=bool)
+        self._staging = bytearray(width * height * 2)
+        self._staging565 = np.frombuffer(self._staging, dtype=">u2")
+        self._staging_view = memoryview(self._staging)
+        # Counters (handy for benchmarks and debugging)
+        self.frames = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.windows = 0
+
+    def invalidate(self):
+        """Forget the last frame so the next one is sent in full"""
+        self._last = None
+        self._last_rgb = None
+
+    def display(self, frame):
+        """Show a PIL RGB image or a Frame565; returns the number of pixel bytes sent"""
+        self.frames += 1
+        if isinstance(frame, Frame565):
+            rects = self._diff_565(frame.pixels)
+        else:
+            rects = self._diff_rgb(frame)
+        if not rects:
+            self.skipped += 1
+            return 0
+        sent = 0
+        for rect in rects:
+            sent += self._push(rect)
+        self.bytes_sent += sent
+        return sent
+
+    def _full_or(self, rects):
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+        if area > FULL_FRAME_RATIO * self.width * self.height:
+            return [(0, 0, self.width, self.height)]
+        return rects
+
+    def _diff_565(self, pixels):
+        self._last_rgb = None
+        if self._last is None:
+            self._last = pixels.copy()
+            return [(0, 0, self.width, self.height)]
+        # Equality doesn't care about byte order; comparing native views
+        # avoids NumPy byte-swapping both frames through temporary buffers
+        np.not_equal(pixels.view(np.uint16), self._last.view(np.uint16), out=self._changed)
+        rects = dirty_rects(self._changed)
+        if rects:
+            np.copyto(self._last, pixels)
+        return self._full_or(rects)
+
+    def _diff_rgb(self, image):
+        rgb = np.asarray(image.convert("RGB") if image.mode != "RGB" else image)
+        if self._last is None:
+            self._last = rgb_to_565(rgb).astype(">u2")
+            self._last_rgb = rgb
+            return [(0, 0, self.width, self.height)]
+        if self._last_rgb is None:
+            # Previous frame was RGB565; compare in that space
+            frame = rgb_to_565(rgb)
+            np.not_equal(frame, self._last, out=self._changed)
+            rects = dirty_rects(self._changed)
+            if rects:
+                self._last[:] = frame
+        else:
+            # Compare raw RGB bytes and convert only the regions that changed
+            rows = rgb.shape[0]
+            changed = rgb.reshape(rows, -1) != self._last_rgb.reshape(rows, -1)
+            rects = dirty_rects(changed, bytes_per_pixel=3)
+            for x0, y0, x1, y1 in rects:
+                self._last[y0:y1, x0:x1] = rgb_to_565(rgb[y0:y1, x0:x1])
+        self._last_rgb = rgb
+        return self._full_or(rects)
+
+    def _push(self, rect):
+        x0, y0, x1, y1 = rect
+        self._set_window(x0, y0, x1 - 1, y1 - 1)
+        # _last is already big-endian, so this is a plain copy into the
+        # staging buffer (the device has consumed it by the time data() returns)
+        h, w = y1 - y0, x1 - x0
+        np.copyto(self._staging565[:h * w].reshape(h, w), self._last[y0:y1, x0:x1])
+        self.device.data(self._staging_view[:h * w * 2])
+        self.windows += 1
+        return h * w * 2
+
+    def _set_window(self, x0, y0, x1, y1):
+        """Set the inclusive pixel window for the next RAMWR"""
+        self.device.command(_CASET, x0 >> 8, x0 & 0xFF, x1 >> 8, x1 & 0xFF)
+        self.device.command(_RASET, y0 >> 8, y0 & 0xFF, y1 >> 8, y1 & 0xFF)
+        self.device.command(_RAMWR)
+
+
+class RenderThread:
+    """
+    Double-buffered, latest-frame-wins renderer in front of a display
+    backend (anything with display(image)). display() never waits on SPI.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self._cond = threading.Condition()
+        self._back = None      # staging buffer, written by display()
+        self._front = None     # buffer the renderer is sending
+        self._pending = False
+        self._busy = False
+        self._stopping = False
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="raspicube-render", daemon=True)
+        self._thread.start()
+
+    def display(self, image):
+        """Queue `image` (PIL image or Frame565) for display, replacing any frame not yet shown"""
+        with self._cond:
+            if isinstance(image, Frame565):
+                if isinstance(self._back, Frame565) and self._back.pixels.shape == image.pixels.shape:
+                    np.copyto(self._back.pixels, image.pixels)
+                else:
+                    self._back = image.copy()
+            elif (isinstance(self._back, Image.Image) and self._back.size == image.size
+                    and self._back.mode == image.mode):
+                self._back.paste(image)
+            else:
+                self._back = image.copy()
+            if self._pending:
+                self.dropped += 1
+            self._pending = True
+            self.submitted += 1
+            self._cond.notify()
+
+    def invalidate(self):
+        self.screen.invalidate()
+
+    def flush(self, timeout=None):
+        """Wait until every submitted frame has been sent (or replaced)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=2.0):
+        """Send the last frame and stop the thread"""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"submitted": self.submitted, "rendered": self.rendered, "dropped": self.dropped}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                # Swap buffers; the UI thread keeps writing into the other one
+                self._front, self._back = self._back, self._front
+                self._pending = False
+                self._busy = True
+                frame = self._front
+            try:
+                self.screen.display(frame)
+                self.rendered += 1
+            except Exception as e:
+                logger.error(f"Display error in render thread: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+class NullDevice:
+    """
+    Stands in for the luma device: counts commands and pixel bytes, and
+    tracks the pixel format (COLMOD), starting where luma's init leaves it
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.bytes = 0
+        self.colmod = _COLMOD_RGB666
+
+    def command(self, *cmd):
+        self.commands += 1
+        if cmd[0] == _COLMOD and len(cmd) > 1:
+            self.colmod = cmd[1]
+
+    def data(self, data):
+        self.bytes += len(data)
+
+
+def _bench_font(size):
+    from PIL import ImageFont
+    for path in ("/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf",
+                 "/usr/share/fonts/truetype/liberation/LiberationMono-Bold.ttf"):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def benchmark(frames=500, width=320, height=240):
+    """
+    CPU time per running-timer frame for three pipelines:
+    - canvas: new image + FreeType text + full-frame RGB565 conversion (the
+      old luma canvas path)
+    - image:  persistent PIL buffer + digit atlas, dirty regions converted
+    - rgb565: Frame565 + pre-converted digits, no conversion at all
+    """
+    font = _bench_font(28)
+    green = (0, 255, 0)
+    atlas = DigitAtlas(font, (green,))
+    texts = ["{:6.1f}".format(i * 0.05) for i in range(frames)]
+    results = {}
+
+    def run(name, render):
+        device = NullDevice()
+        start = time.process_time()
+        for text in texts:
+            render(device, text)
+        elapsed = time.process_time() - start
+        results[name] = (elapsed * 1000 / frames, device.bytes / frames)
+
+    def canvas_frame(device, text):
+        image = Image.new("RGB", (width, height))
+        draw = ImageDraw.Draw(image)
+        box = draw.textbbox((0, 0), text, font=font)
+        draw.text(((width - box[2]) // 2, (height - box[3]) // 2), text, font=font, fill=green)
+        device.data(rgb_to_565(np.asarray(image)).astype(">u2").tobytes())
+
+    image = Image.new("RGB", (width, height))
+    image_screen = DirtyRectDisplay(None, width, height)
+
+    def image_frame(device, text):
+        image_screen.device = device
+        x = (width - atlas.width(text)) // 2
+        atlas.draw(image, text, x, (height - atlas.height) // 2, green)
+        image_screen.display(image)
+
+    frame = Frame565(width, height)
+    frame_screen = DirtyRectDisplay(None, width, height)
+
+    def rgb565_frame(device, text):
+        frame_screen.device = device
+        x = (width - atlas.width(text)) // 2
+        atlas.draw_565(frame, text, x, (height - atlas.height) // 2, green)
+        frame_screen.display(frame)
+
+    run("canvas", canvas_frame)
+    run("image", image_frame)
+    run("rgb565", rgb565_frame)
+    for name, (ms, nbytes) in results.items():
+        print(f"{name:7s} {ms:7.3f} ms/frame  {nbytes:9.0f} bytes/frame")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 500)
+    else:
+        print("Usage: python3 display.py bench [FRAMES]")
+        sys.exit(1)
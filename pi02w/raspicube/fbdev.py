@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Linux framebuffer output for RasPiCube
+
+FramebufferDisplay runs the same UI on anything exposing /dev/fbN (an fbtft
+panel, or HDMI). The framebuffer is mmap'ed and viewed as a NumPy array, so
+the dirty regions found by DirtyRectDisplay are written straight into video
+memory: no device.data() calls and no intermediate byte strings. RGB565
+(16 bpp) and XRGB8888 (32 bpp) framebuffers are supported; on a screen
+larger than the UI, the UI is centered.
+
+Geometry is read from /sys/class/graphics/fbN, or can be passed in, which
+also lets a regular file stand in for the device:
+
+    python3 fbdev.py bench [FRAMES]    # ms/frame into a temporary file, contents checked
+"""
+
+import os
+import sys
+import mmap
+import time
+import logging
+import tempfile
+
+import numpy as np
+
+from display import DirtyRectDisplay, Frame565
+
+logger = logging.getLogger("raspicube")
+
+_SYSFS = "/sys/class/graphics"
+
+
+def framebuffer_info(path):
+    """((width, height), bits_per_pixel, stride) of /dev/fbN from sysfs"""
+    base = os.path.join(_SYSFS, os.path.basename(path))
+
+    def read(name):
+        with open(os.path.join(base, name)) as f:
+            return f.read().strip()
+
+    width, height = (int(v) for v in read("virtual_size").split(","))
+    return (width, height), int(read("bits_per_pixel")), int(read("stride"))
+
+
+class FramebufferDisplay(DirtyRectDisplay):
+    """
+    DirtyRectDisplay that writes into a memory-mapped framebuffer instead of
+    sending ST7789 windows. `fb_size`, `bpp` and `stride` (bytes per line)
+    default to what sysfs reports for `path`.
+    """
+
+    def __init__(self, path="/dev/fb0", width=320, height=240, fb_size=None, bpp=None, stride=None):
+        if fb_size is None or bpp is None or stride is None:
+            info = framebuffer_info(path)
+            fb_size = fb_size or info[0]
+            bpp = bpp or info[1]
+            stride = stride or info[2]
+        if bpp not in (16, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {bpp} bpp (need 16 or 32)")
+        fb_width, fb_height = fb_size
+        if width > fb_width or height > fb_height:
+            raise ValueError(f"{width}x{height} UI does not fit a {fb_width}x{fb_height} framebuffer")
+        super().__init__(None, width, height)
+        self.path = path
+        self.bpp = bpp
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), stride * fb_height)
+        x, y = (fb_width - width) // 2, (fb_height - height) // 2
+        offset = y * stride + x * bpp // 8
+        if bpp == 16:
+            # Native (little-endian) RGB565
+            self._fb = np.ndarray((height, width), "<u2", buffer=self._map,
+                                  offset=offset, strides=(stride, 2))
+        else:
+            # XRGB8888: B, G, R, X bytes
+            self._fb = np.ndarray((height, width, 4), np.uint8, buffer=self._map,
+                                  offset=offset, strides=(stride, 4, 1))
+        logger.info(f"✅ Framebuffer {path}: {fb_width}x{fb_height}, {bpp} bpp")
+
+    def _push(self, rect):
+        x0, y0, x1, y1 = rect
+        dst = self._fb[y0:y1, x0:x1]
+        if self.bpp == 16:
+            # _last is big-endian; NumPy swaps the bytes as it copies
+            dst[...] = self._last[y0:y1, x0:x1]
+        elif self._last_rgb is not None:
+            # PIL frame: full 8-bit channels are still available
+            rgb = self._last_rgb[y0:y1, x0:x1]
+            dst[..., 0] = rgb[..., 2]
+            dst[..., 1] = rgb[..., 1]
+            dst[..., 2] = rgb[..., 0]
+        else:
+            # Frame565: expand each channel, replicating the high bits
+            pixels = self._last[y0:y1, x0:x1]
+            r = (pixels >> 11) & 0x1F
+            g = (pixels >> 5) & 0x3F
+            b = pixels & 0x1F
+            dst[..., 0] = (b << 3) | (b >> 2)
+            dst[..., 1] = (g << 2) | (g >> 4)
+            dst[..., 2] = (r << 3) | (r >> 2)
+        self.windows += 1
+        return dst.size * dst.itemsize
+
+    def close(self):
+        """Unmap the framebuffer (the array view has to go first)"""
+        self._fb = None
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def _expected(frame, bpp):
+    """What a Frame565 should look like in a framebuffer of depth `bpp`"""
+    pixels = frame.pixels.astype(np.uint32)
+    if bpp == 16:
+        return frame.pixels.astype("<u2")
+    r, g, b = (pixels >> 11) & 0x1F, (pixels >> 5) & 0x3F, pixels & 0x1F
+    return np.stack(((b << 3) | (b >> 2), (g << 2) | (g >> 4), (r << 3) | (r >> 2),
+                     np.zeros_like(r)), axis=-1).astype(np.uint8)
+
+
+def benchmark(frames=500, width=320, height=240):
+    """
+    Running-timer frames (Frame565 + digit atlas) into a regular file
+    standing in for a 480x320 framebuffer, at 16 and 32 bpp. The file
+    contents are read back and compared after the run.
+    """
+    from display import DigitAtlas, _bench_font
+    fb_width, fb_height = 480, 320
+    atlas = DigitAtlas(_bench_font(28), ((0, 255, 0),))
+    for bpp in (16, 32):
+        stride = fb_width * bpp // 8
+        with tempfile.NamedTemporaryFile() as f:
+            f.truncate(stride * fb_height)
+            screen = FramebufferDisplay(f.name, width, height, (fb_width, fb_height), bpp, stride)
+            frame = Frame565(width, height)
+            frame.fill_rect(10, 10, width - 10, 40, (255, 128, 0))
+            screen.display(frame)
+            start = time.process_time()
+            for i in range(frames):
+                text = "{:6.2f}".format(i * 0.01)
+                atlas.draw_565(frame, text, (width - atlas.width(text)) // 2,
+                               (height - atlas.height) // 2, (0, 255, 0))
+                screen.display(frame)
+            elapsed = time.process_time() - start
+            bytes_sent = screen.bytes_sent
+            screen.close()
+
+            data = np.fromfile(f.name, np.uint8).reshape(fb_height, stride)
+            x, y = (fb_width - width) // 2, (fb_height - height) // 2
+            if bpp == 16:
+                got = data[y:y + height].view("<u2")[:, x:x + width]
+            else:
+                got = data[y:y + height].reshape(height, fb_width, 4)[:, x:x + width]
+            ok = np.array_equal(got, _expected(frame, bpp))
+        print(f"{bpp} bpp: {elapsed * 1000 / frames:7.3f} ms/frame  "
+              f"{bytes_sent / (frames + 1):9.0f} bytes/frame  contents {'OK' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 500)
+    else:
+        print("Usage: python3 fbdev.py bench [FRAMES]")
+        sys.exit(1)
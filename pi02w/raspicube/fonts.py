@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Precompiled bitmap fonts for RasPiCube
+
+Loading TrueType fonts and rasterizing every string through FreeType is a
+noticeable cost on a Pi Zero 2 W. `python3 fonts.py build` rasterizes the
+printable ASCII range at the sizes the UI uses into PIL bitmap fonts
+(a .pil metrics file plus an antialiased 8-bit .png glyph sheet) in fonts/
+next to this file, so the installer and the service (which may run as
+different users) see the same cache. FontManager loads those in a few
+milliseconds and PIL draws them by copying glyphs, without FreeType.
+
+PIL's bitmap fonts report the whole line box from getbbox(), while
+TrueType reports the ink box. BitmapFont reads the per-glyph boxes back from
+the .pil file so layout code gets the same numbers from either.
+
+A manifest records which TrueType file (path, size and mtime) each bitmap
+font was built from; if it doesn't match the font that would be used now,
+the cache is stale and FontManager falls back to TrueType.
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import logging
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger("raspicube")
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationMono-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"
+]
+FONT_SIZES = (28, 14)
+FONT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+FONT_CACHE_VERSION = 1
+
+GLYPHS = range(32, 127)      # printable ASCII
+_SHEET_WIDTH = 1024
+_METRIC = struct.Struct(">10h")
+
+
+class BitmapFont(ImageFont.ImageFont):
+    """PIL bitmap font whose getbbox() is the ink box, like FreeTypeFont's"""
+
+    @classmethod
+    def open(cls, filename):
+        font = cls()
+        font._load_pilfont(filename)
+        with open(filename, "rb") as f:
+            data = f.read()
+        data = data[data.index(b"DATA\n") + 5:]
+        metrics = [_METRIC.unpack_from(data, i * _METRIC.size) for i in range(256)]
+        # Glyph 0 holds the line box (see build_font)
+        font.ascent = -metrics[0][3]
+        # (advance, left, top, right, bottom) relative to the pen on the baseline
+        font.boxes = {chr(code): (m[0],) + m[2:6]
+                      for code, m in enumerate(metrics) if code in GLYPHS}
+        return font
+
+    def getbbox(self, text, *args, **kwargs):
+        """(left, top, right, bottom) of text drawn at (0, 0), as TrueType reports it"""
+        x = 0
+        box = None
+        for ch in text:
+            glyph = self.boxes.get(ch)
+            if glyph is None:
+                continue    # not in the sheet, drawn as nothing
+            advance, left, top, right, bottom = glyph
+            if box is None:
+                box = [x + left, top, x + right, bottom]
+            else:
+                box[0] = min(box[0], x + left)
+                box[1] = min(box[1], top)
+                box[2] = max(box[2], x + right)
+                box[3] = max(box[3], bottom)
+            x += advance
+        if box is None:
+            return 0, 0, 0, 0
+        return box[0], self.ascent + box[1], box[2], self.ascent + box[3]
+
+
+def find_truetype(paths=FONT_PATHS):
+    """First TrueType font that exists, or None"""
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {"path": path, "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def _manifest_path(cache_dir):
+    return os.path.join(cache_dir, "manifest.json")
+
+
+def build_font(source, size, root):
+    """Rasterize GLYPHS of a TrueType font into root.pil + root.png"""
+    font = ImageFont.truetype(source, size)
+    ascent, descent = font.getmetrics()
+    cells = []
+    for code in GLYPHS:
+        ch = chr(code)
+        # Ink box relative to the origin on the baseline
+        left, top, right, bottom = font.getbbox(ch, anchor="ls")
+        glyph = Image.new("L", (max(right - left, 0), max(bottom - top, 0)))
+        if glyph.width and glyph.height:
+            ImageDraw.Draw(glyph).text((-left, -top), ch, font=font, fill=255, anchor="ls")
+        cells.append((code, round(font.getlength(ch)), (left, top, right, bottom), glyph))
+
+    # Pack glyphs into rows of a sheet
+    row_height = max(g.height for _, _, _, g in cells)
+    x = y = 0
+    placed = []
+    for code, advance, dst, glyph in cells:
+        if x + glyph.width > _SHEET_WIDTH:
+            x, y = 0, y + row_height
+        placed.append((code, advance, dst, (x, y, x + glyph.width, y + glyph.height), glyph))
+        x += glyph.width
+    sheet = Image.new("L", (_SHEET_WIDTH, y + row_height))
+
+    metrics = [(0,) * 10] * 256
+    # Glyph 0 is never drawn; its box sets the line to exactly ascent + descent
+    # (PIL places text using the tallest box), matching TrueType positioning
+    metrics[0] = (0, 0, 0, -ascent, 0, descent, 0, 0, 0, 0)
+    for code, advance, dst, src, glyph in placed:
+        sheet.paste(glyph, src[:2])
+        metrics[code] = (advance, 0) + dst + src
+
+    sheet.save(root + ".png")
+    with open(root + ".pil", "wb") as f:
+        f.write(b"PILfont\n")
+        f.write(f";;;;;;{ascent + descent};\n".encode("ascii"))
+        f.write(b"DATA\n")
+        f.write(b"".join(_METRIC.pack(*m) for m in metrics))
+
+
+def build_font_cache(source=None, sizes=FONT_SIZES, cache_dir=FONT_CACHE_DIR):
+    """Build bitmap fonts for every size and write the manifest"""
+    source = source or find_truetype()
+    if source is None:
+        raise OSError("No TrueType font found to build from")
+    os.makedirs(cache_dir, exist_ok=True)
+    for size in sizes:
+        build_font(source, size, os.path.join(cache_dir, f"font{size}"))
+    manifest = {"version": FONT_CACHE_VERSION, "source": _source_info(source), "sizes": list(sizes)}
+    temp_file = _manifest_path(cache_dir) + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_file, _manifest_path(cache_dir))
+    return source
+
+
+def load_cached_fonts(sizes=FONT_SIZES, cache_dir=FONT_CACHE_DIR, paths=FONT_PATHS):
+    """
+    {size: ImageFont} from the bitmap cache, or None if the cache is missing
+    or was built from a different TrueType font than the one installed now.
+    """
+    try:
+        with open(_manifest_path(cache_dir), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    source = find_truetype(paths)
+    if (source is None or manifest.get("version") != FONT_CACHE_VERSION
+            or manifest.get("source") != _source_info(source)
+            or not set(sizes) <= set(manifest.get("sizes", ()))):
+        logger.warning("⚠️ Bitmap font cache is stale (run: python3 fonts.py build)")
+        return None
+    try:
+        return {size: BitmapFont.open(os.path.join(cache_dir, f"font{size}.pil")) for size in sizes}
+    except (OSError, SyntaxError, TypeError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ Could not load bitmap fonts: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        start = time.perf_counter()
+        source = build_font_cache(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Built {', '.join(map(str, FONT_SIZES))} px fonts from {source} "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms -> {FONT_CACHE_DIR}")
+    else:
+        print("Usage: python3 fonts.py build [font.ttf]")
+        sys.exit(1)
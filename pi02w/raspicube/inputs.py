@@ -0,0 +1,163 @@
+"""
+Button input for RasPiCube
+
+Instead of spinning on GPIO.input() with short sleeps, ButtonInput asks the
+kernel for edge interrupts on both buttons. Each edge is timestamped in the
+GPIO callback with timing.now_ns() and queued, so the UI can block until
+something happens and solve times come from when the callback ran (shortly
+after the edge), not from when a loop next looked at the pin.
+
+Waiting doesn't allocate: queue.Queue.get(timeout=...) creates a new
+Condition waiter lock on every call, which the solve loop would do 20 times a
+second. Events go into a deque instead, and a single preallocated lock, held
+while the deque is empty, is what wait() blocks on.
+
+If edge detection is unavailable (some kernels refuse it for RPi.GPIO), a
+small polling thread produces the same events at 1 ms resolution.
+"""
+
+import time
+import threading
+import logging
+from collections import deque, namedtuple
+
+from timing import now_ns
+
+logger = logging.getLogger("raspicube")
+
+# Edges on the same pin closer than this are contact bounce
+BOUNCE_NS = 5000000
+_POLL_INTERVAL_S = 0.001
+
+ButtonEvent = namedtuple("ButtonEvent", "pin pressed t_ns")
+
+
+class ButtonInput:
+    """Timestamped press/release events for a set of (pull-down) buttons"""
+
+    def __init__(self, pins, gpio=None):
+        if gpio is None:
+            import RPi.GPIO as gpio
+        self.gpio = gpio
+        self.pins = tuple(pins)
+        self._lock = threading.Lock()
+        # _ready is held while _events is empty, so acquiring it in wait()
+        # means there is an event to take; apart from that acquire, both only
+        # change under _lock
+        self._events = deque()
+        self._ready = threading.Lock()
+        self._ready.acquire()
+        # Level and time of the last accepted edge, as seen by the callback
+        self._level = {pin: bool(gpio.input(pin)) for pin in self.pins}
+        self._edge_ns = {pin: 0 for pin in self.pins}
+        # Button state (and last edge time) as seen by whoever consumes the queue
+        self.pressed = dict(self._level)
+        self._last_ns = {pin: 0 for pin in self.pins}
+        # At most one pending settle re-check per pin while it bounces
+        self._settle = {pin: None for pin in self.pins}
+        self._poller = None
+        self._stop = threading.Event()
+        try:
+            for pin in self.pins:
+                gpio.add_event_detect(pin, gpio.BOTH, callback=self._edge)
+            logger.info("✅ Button edge detection enabled")
+        except RuntimeError as e:
+            logger.warning(f"⚠️ Edge detection unavailable ({e}), polling buttons at 1 ms")
+            self._poller = threading.Thread(target=self._poll, name="raspicube-buttons", daemon=True)
+            self._poller.start()
+
+    def _edge(self, pin, level=None, t_ns=None):
+        """GPIO callback (also used by the fallback poller)"""
+        if t_ns is None:
+            t_ns = now_ns()
+        if level is None:
+            level = bool(self.gpio.input(pin))
+        with self._lock:
+            if level == self._level[pin]:
+                return
+            if t_ns - self._edge_ns[pin] < BOUNCE_NS:
+                # Probably bounce; look again once it has settled so a very
+                # quick tap doesn't leave the button stuck down
+                if self._settle[pin] is None and not self._stop.is_set():
+                    settle = threading.Timer(BOUNCE_NS / 1e9, self._settled, (pin,))
+                    settle.daemon = True
+                    self._settle[pin] = settle
+                    settle.start()
+                return
+            self._level[pin] = level
+            self._edge_ns[pin] = t_ns
+            self._events.append(ButtonEvent(pin, level, t_ns))
+            if self._ready.locked():
+                self._ready.release()
+
+    def _settled(self, pin):
+        """Settle timer: re-read the pin once bouncing should be over"""
+        with self._lock:
+            self._settle[pin] = None
+        self._edge(pin)
+
+    def _poll(self):
+        while not self._stop.is_set():
+            for pin in self.pins:
+                self._edge(pin)
+            time.sleep(_POLL_INTERVAL_S)
+
+    def wait(self, timeout=None):
+        """Next event, or None after `timeout` seconds (None waits forever)"""
+        if not self._ready.acquire(True, -1 if timeout is None else timeout):
+            return None
+        with self._lock:
+            event = self._events.popleft()
+            # An edge may have released it again since we acquired it
+            if self._events and self._ready.locked():
+                self._ready.release()
+        self.pressed[event.pin] = event.pressed
+        self._last_ns[event.pin] = event.t_ns
+        return event
+
+    def wait_press(self, pins=None, timeout=None):
+        """Wait for a press on one of `pins` (default: any); None on timeout"""
+        pins = self.pins if pins is None else pins
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            event = self.wait(remaining)
+            if event is None:
+                return None
+            if event.pressed and event.pin in pins:
+                return event
+
+    def wait_release(self, pin, timeout=None):
+        """
+        Wait until `pin` is released. Returns the release event (or a
+        synthetic one if it was already up), None on timeout.
+        """
+        if not self.pressed[pin]:
+            return ButtonEvent(pin, False, self._last_ns[pin])
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            event = self.wait(remaining)
+            if event is None:
+                return None
+            if event.pin == pin and not event.pressed:
+                return event
+
+    def any_pressed(self):
+        return any(self.pressed.values())
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for pin, settle in self._settle.items():
+                if settle is not None:
+                    settle.cancel()
+                    self._settle[pin] = None
+        if self._poller is not None:
+            self._poller.join(timeout=1.0)
+        else:
+            for pin in self.pins:
+                try:
+                    self.gpio.remove_event_detect(pin)
+                except RuntimeError:
+                    pass
@@ -37,3 +37,11 @@ echo "Enabling SPI interface..."
 if ! grep -q "dtparam=spi=on" /boot/config.txt; then
     echo 'dtparam=spi=on' | sudo tee -a /boot/config.txt
 fi
+
+# Build the random-state scramble tables (one-off, takes a few minutes)
+echo "Building scramble tables..."
+python3 "$(dirname "$0")/twophase.py" build
+
+# Precompile the bitmap fonts used by the UI
+echo "Building font cache..."
+python3 "$(dirname "$0")/fonts.py" build
@@ -0,0 +1,178 @@
+"""
+Write-behind persistence for RasPiCube
+
+The UI thread hands finished solves to WriteBehindWriter and carries on
+straight away; a background thread writes them to the storage backend
+(see storage.py). Bursts of solves are coalesced into one write and one
+fsync (group commit), and unsynced data is fsynced at most SYNC_INTERVAL_S
+after it was written. close() flushes everything, so call it from the
+`finally` block on shutdown.
+"""
+
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger("raspicube")
+
+MAX_PENDING = 256        # bounded queue of solves waiting to be written
+BATCH_WINDOW_S = 0.05    # how long to wait for more solves to join a batch
+SYNC_INTERVAL_S = 1.0    # fsync at most this long after a write
+
+# Queue operations
+_APPEND = "append"
+_CLEAR = "clear"
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class WriteBehindWriter:
+    """Background writer thread with a bounded queue and group commit"""
+
+    def __init__(self, storage, max_pending=MAX_PENDING,
+                 batch_window=BATCH_WINDOW_S, sync_interval=SYNC_INTERVAL_S):
+        self.storage = storage
+        self.batch_window = batch_window
+        self.sync_interval = sync_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._submitted = 0   # solves handed to submit()
+        self._durable = 0     # solves written AND fsynced
+        self._written = 0     # solves written (maybe not fsynced yet)
+        self.commits = 0
+        self.fsyncs = 0
+        self.overflows = 0
+        self._thread = threading.Thread(target=self._run, name="raspicube-writer", daemon=True)
+        self._thread.start()
+
+    # --- UI thread side ---
+    def submit(self, entry):
+        """Queue one solve for writing; returns immediately"""
+        with self._lock:
+            self._submitted += 1
+        self._put((_APPEND, entry))
+
+    def clear(self):
+        """Queue a history clear (ordered after any queued solves)"""
+        self._put((_CLEAR, None))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is on disk"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush, stop the thread and close the storage backend"""
+        if self._thread.is_alive():
+            pending = self.pending
+            self._queue.put((_STOP, None))
+            self._thread.join(timeout)
+            if pending:
+                logger.info(f"💾 Flushed {pending} pending solve(s) to disk")
+        self.storage.close()
+
+    @property
+    def pending(self):
+        """Solves submitted but not yet fsynced"""
+        with self._lock:
+            return self._submitted - self._durable
+
+    def stats(self):
+        """Counters for logging/debugging"""
+        return {
+            "pending": self.pending,
+            "queued": self._queue.qsize(),
+            "commits": self.commits,
+            "fsyncs": self.fsyncs,
+            "overflows": self.overflows,
+        }
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Writer can't keep up (very slow SD card?) - fall back to waiting
+            self.overflows += 1
+            logger.warning("⚠️ Solve write queue full, waiting for the disk")
+            self._queue.put(item)
+
+    # --- writer thread side ---
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+        running = True
+        while running:
+            try:
+                timeout = self.sync_interval if dirty else None
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                dirty = False
+                last_sync = time.monotonic()
+                continue
+
+            batch = [item] + self._drain()
+            entries = []
+            for op, arg in batch:
+                if op == _APPEND:
+                    entries.append(arg)
+                    continue
+                # Anything else is a barrier: write what we have first
+                dirty = self._commit(entries) or dirty
+                entries = []
+                if op == _CLEAR:
+                    self.storage.clear()
+                    dirty = False
+                    last_sync = time.monotonic()
+                    self._mark_durable()
+                elif op in (_FLUSH, _STOP):
+                    if dirty:
+                        self._sync()
+                        dirty = False
+                        last_sync = time.monotonic()
+                    self._mark_durable()
+                    if op == _FLUSH:
+                        arg.set()
+                    else:
+                        running = False
+            dirty = self._commit(entries) or dirty
+
+            if dirty and time.monotonic() - last_sync >= self.sync_interval:
+                self._sync()
+                dirty = False
+                last_sync = time.monotonic()
+
+    def _drain(self):
+        """Collect whatever else arrives within the batch window"""
+        items = []
+        deadline = time.monotonic() + self.batch_window
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _commit(self, entries):
+        """Write one batch of solves; returns True if anything was written"""
+        if not entries:
+            return False
+        self.storage.write(entries)
+        self.commits += 1
+        with self._lock:
+            self._written += len(entries)
+        return True
+
+    def _sync(self):
+        self.storage.sync()
+        self.fsyncs += 1
+        self._mark_durable()
+
+    def _mark_durable(self):
+        with self._lock:
+            self._durable = self._written
@@ -9,7 +9,7 @@ Replicates ALL functionality from the original Pico version including:
 - Full display UI with proper fonts and colors
 - Backlight management with touch-to-wake
 - Timer control with hold/release logic
-- Results display with averages (ao5, ao12)
+- Results display with averages (ao5, ao12, ao50, ao100) and bests
 - Clear history with confirmation dialog
 - Version display
 - Proper button handling and debouncing
@@ -18,9 +18,11 @@ Replicates ALL functionality from the original Pico version including:
 
 import time
 import random
-import json
 import os
 import logging
+import signal
+import functools
+import gc
 from pathlib import Path
 # from datetime import datetime
 # import sys
@@ -32,15 +34,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger("raspicube")
 
-# GPIO libraries for Pi
-import RPi.GPIO as GPIO
-
-# Display libraries - using luma.lcd instead of st7789
-from luma.core.interface.serial import spi
-from luma.core.render import canvas
-from luma.lcd.device import st7789
+# Hardware libraries (RPi.GPIO, luma.lcd) are imported where the hardware is
+# set up, so the rest of this module (fonts, layout, rendering) can be imported
+# and benchmarked on any machine, see bench.py
 from PIL import Image, ImageDraw, ImageFont
 
+# Incremental ao5/ao12/... engine (lives next to this file)
+from stats import SolveStats
+from storage import JsonStore, JsonLinesStore, BinaryStore, iter_times
+from persistence import WriteBehindWriter
+import twophase
+import fonts
+from scrambles import ScrambleProvider
+from display import DirtyRectDisplay, DigitAtlas, RunningReadout, RenderThread, Frame565, LayerCache
+from st7789spi import ST7789
+from fbdev import FramebufferDisplay
+import timing
+from timing import now_ns, format_time
+
 VERSION = "v1.7.1-rpi"
 
 # GPIO Pin definitions (BCM numbering)
@@ -68,6 +79,35 @@ modifiers = ['', "'", '2']
 opposite = {'U':'D', 'D':'U', 'L':'R', 'R':'L', 'F':'B', 'B':'F'}
 
 RESULTS_FILE = os.path.expanduser("~/.raspicube/cube_times.json")
+SOLVE_LOG_FILE = os.path.expanduser("~/.raspicube/cube_times.jsonl")
+SOLVE_BIN_FILE = os.path.expanduser("~/.raspicube/cube_times.bin")
+
+# "jsonl":  append-only log, constant-time saves (migrates RESULTS_FILE on first run)
+# "binary": fixed-width records, memory-mapped at startup (converts jsonl/json on first run)
+# "json":   legacy format, whole file rewritten after every solve
+STORAGE_MODE = "jsonl"
+
+# "random-state": WCA-style scrambles from the two-phase solver (needs `python3 twophase.py build`)
+# "random-moves": 20 random moves, the original generator
+SCRAMBLE_MODE = "random-state"
+SCRAMBLE_QUEUE_SIZE = 5   # random-state scrambles kept ready by the worker process
+SCRAMBLE_SAVE_FILE = os.path.expanduser("~/.raspicube/scrambles.json")
+SCRAMBLE_TOP = 90           # y of the first scramble line
+SCRAMBLE_LINE_PITCH = 35    # normal line spacing, reduced for long scrambles
+
+# "rgb565": the running timer is composed straight into an RGB565 buffer (no PIL per frame)
+# "pil":    the timer is drawn into a PIL image and converted on the way out
+TIMER_PIPELINE = "rgb565"
+SCREEN_CACHE_SIZE = 12    # pre-rendered static screen layers kept in memory
+TEXT_CACHE_SIZE = 256     # memoized text measurements/line wraps
+SOLVE_GC_OFF = True       # cyclic GC frozen/disabled while the clock runs, collected after
+RUNNING_FRAME_NS = 50000000   # running timer redraw interval (50 ms = 20 FPS)
+
+# "luma":   luma.lcd st7789 driver
+# "spidev": st7789spi.py, RGB565 straight to /dev/spidev0.0 (no luma)
+# "fbdev":  fbdev.py, dirty regions written into a mmap'ed /dev/fbN (fbtft or HDMI)
+DISPLAY_BACKEND = "luma"
+FRAMEBUFFER_DEVICE = "/dev/fb1"
 
 # Backlight management (same as Pico)
 BACKLIGHT_TIMEOUT_MS = 20000
@@ -77,31 +117,71 @@ SCRAMBLE_BACKLIGHT_TIMEOUT_MS = 30000  # 30 seconds on scramble screen
 class FontManager:
     """Manage fonts to match Pico's font sizes"""
     def __init__(self):
-        self.font_paths = [
-            "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationMono-Bold.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"
-        ]
+        self.font_paths = fonts.FONT_PATHS
+        
+        # Precompiled bitmap fonts (python3 fonts.py build) load in a few ms
+        # and draw without FreeType; TrueType is only the fallback
+        cached = fonts.load_cached_fonts((28, 14), paths=self.font_paths)
+        if cached:
+            logger.info("✅ Loaded bitmap font cache")
+        else:
+            logger.info("🔤 Bitmap font cache unavailable, using TrueType")
+            cached = {}
         
         # Font sizes matching Pico's vga1_16x32 and vga1_8x16
-        self.big_font = self._load_font(28)    # Larger for 320x240 display
-        self.small_font = self._load_font(14)  # Adjusted for readability
+        self.big_font = cached.get(28) or self._load_font(28)    # Larger for 320x240 display
+        self.small_font = cached.get(14) or self._load_font(14)  # Adjusted for readability
         
         # Calculate font metrics
         self.big_width = 18
         self.big_height = 32
         self.small_width = 9
         self.small_height = 16
+        
+        # Text measurement/layout is memoized: the same handful of strings
+        # (titles, prompts, VERSION, scramble lines) are laid out over and over
+        self.measure = functools.lru_cache(maxsize=TEXT_CACHE_SIZE)(self._measure)
+        self.wrap = functools.lru_cache(maxsize=TEXT_CACHE_SIZE)(self._wrap)
     
     def _load_font(self, size):
         """Load the best available font"""
         for path in self.font_paths:
+            if not os.path.exists(path):
+                continue
             try:
                 return ImageFont.truetype(path, size)
-            except:
+            except OSError:
                 continue
         return ImageFont.load_default()
+    
+    def _measure(self, text, font):
+        """(width, height) of text, same as draw.textbbox((0, 0), ...)"""
+        left, top, right, bottom = font.getbbox(text)
+        return right - left, bottom - top
+    
+    def centered_x(self, text, font, width=DISPLAY_WIDTH):
+        """x position that centres text horizontally"""
+        return max(0, (width - self.measure(text, font)[0]) // 2)
+    
+    def layout(self, text, font, width=DISPLAY_WIDTH):
+        """(width, height, centred x) of text"""
+        text_width, text_height = self.measure(text, font)
+        return text_width, text_height, max(0, (width - text_width) // 2)
+    
+    def _wrap(self, text, font, max_width):
+        """Split text on spaces into lines no wider than max_width pixels"""
+        lines = []
+        current = ""
+        for word in text.split():
+            candidate = word if not current else current + " " + word
+            if not current or self.measure(candidate, font)[0] <= max_width:
+                current = candidate
+            else:
+                lines.append(current)
+                current = word
+        if current:
+            lines.append(current)
+        return tuple(lines)
 
 class PiCubeTimer:
     def __init__(self):
@@ -109,38 +189,71 @@ class PiCubeTimer:
         results_dir = os.path.dirname(RESULTS_FILE)
         Path(results_dir).mkdir(parents=True, exist_ok=True)
         
+        # The scramble worker is forked, so start it before any threads
+        # (GPIO callbacks, render thread, writer) exist
+        self.setup_scrambler()
+        
         # Rest of initialization remains the same
         self.setup_gpio()
         self.setup_display()
         self.font_manager = FontManager()
+        self.layers = LayerCache((DISPLAY_WIDTH, DISPLAY_HEIGHT), Colors.BLACK, max_layers=SCREEN_CACHE_SIZE)
         self.setup_timer_buffer()
         
         # State management with better error handling
+        self.setup_storage()
         self.solve_times = self.load_times()
+        # Writes happen on a background thread from here on
+        self.writer = WriteBehindWriter(self.storage)
+        self.stats = SolveStats()
+        self.stats.extend_times(iter_times(self.solve_times))
         self.last_touch_time = self.ticks_ms()
         self.backlight_on = True
         
         logger.info("🚀 RasPiCube Timer initialized!")
-        logger.info(f"📝 Results file: {RESULTS_FILE}")
+        logger.info(f"📝 Results file: {self.storage.path}")
     
     def setup_gpio(self):
         """Initialize GPIO pins"""
+        import RPi.GPIO as GPIO
+        from inputs import ButtonInput
         GPIO.setwarnings(False)
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(TIMER_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
         GPIO.setup(NEXT_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        # Buttons are read from timestamped edge events, not by polling
+        self.buttons = ButtonInput((TIMER_PIN, NEXT_PIN))
         logger.info("✅ GPIO initialized")
     
     def setup_display(self):
-        """Initialize the ST7789 display using luma.lcd"""
+        """Initialize the ST7789 display (see DISPLAY_BACKEND)"""
         try:
-            # OPTIMIZED: Higher SPI speed for faster updates
-            self.serial = spi(port=0, device=0, gpio_DC=24, gpio_RST=25, spi_speed_hz=80000000)
-            
-            # Initialize ST7789 device
-            self.device = st7789(self.serial, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT, rotate=0)
-            
-            logger.info("✅ ST7789 display initialized with 80MHz SPI")
+            if DISPLAY_BACKEND == "fbdev":
+                # The framebuffer is both the device and the dirty-rect screen
+                self.device = FramebufferDisplay(FRAMEBUFFER_DEVICE, DISPLAY_WIDTH, DISPLAY_HEIGHT)
+            elif DISPLAY_BACKEND == "spidev":
+                # 240x320 panel in landscape, same wiring and SPI speed as luma
+                self.device = ST7789(port=0, device=0, dc=24, reset=25, width=DISPLAY_HEIGHT,
+                                     height=DISPLAY_WIDTH, rotation=1, speed_hz=80000000)
+            else:
+                # Display libraries - using luma.lcd instead of st7789
+                from luma.core.interface.serial import spi
+                from luma.lcd.device import st7789
+
+                # OPTIMIZED: Higher SPI speed for faster updates
+                self.serial = spi(port=0, device=0, gpio_DC=24, gpio_RST=25, spi_speed_hz=80000000)
+
+                # Initialize ST7789 device
+                self.device = st7789(self.serial, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT, rotate=0)
+            
+            # Frames go through the dirty-rectangle layer, not device.display,
+            # and are sent from a render thread so SPI never blocks input
+            if DISPLAY_BACKEND == "fbdev":
+                self.screen = RenderThread(self.device)
+                logger.info(f"✅ Framebuffer display initialized ({FRAMEBUFFER_DEVICE})")
+            else:
+                self.screen = RenderThread(DirtyRectDisplay(self.device, DISPLAY_WIDTH, DISPLAY_HEIGHT))
+                logger.info(f"✅ ST7789 display initialized with 80MHz SPI ({DISPLAY_BACKEND})")
             
             # Initialize with black screen
             self.fill_screen(Colors.BLACK)
@@ -148,16 +261,30 @@ class PiCubeTimer:
         except Exception as e:
             logger.error(f"❌ Failed to initialize display: {e}")
             self.device = None
+            self.screen = None
     
     def setup_timer_buffer(self):
         """Create persistent buffer for fast timer updates"""
-        self.timer_buffer = Image.new('RGB', (DISPLAY_WIDTH, DISPLAY_HEIGHT), Colors.BLACK)
-        self.timer_draw = ImageDraw.Draw(self.timer_buffer)
+        if TIMER_PIPELINE == "rgb565":
+            self.timer_buffer = Frame565(DISPLAY_WIDTH, DISPLAY_HEIGHT, Colors.BLACK)
+            self.timer_draw = None
+        else:
+            self.timer_buffer = Image.new('RGB', (DISPLAY_WIDTH, DISPLAY_HEIGHT), Colors.BLACK)
+            self.timer_draw = ImageDraw.Draw(self.timer_buffer)
         self.last_timer_str = ""
+        self.last_timer_box = None
+        # Digits are rasterized once here, never inside the timing loop
+        self.timer_atlas = DigitAtlas(self.font_manager.big_font, (Colors.GREEN, Colors.CYAN), Colors.BLACK)
+        # Preallocated running readout, same place as display_timer_fast puts "{:6.1f}"
+        self.running_readout = None
+        if self.timer_draw is None:
+            x_timer = max(0, (DISPLAY_WIDTH - self.timer_atlas.width("0" * RunningReadout.CHARS)) // 2)
+            y_timer = (DISPLAY_HEIGHT - self.timer_atlas.height) // 2
+            self.running_readout = RunningReadout(self.timer_atlas, self.timer_buffer, x_timer, y_timer, Colors.GREEN)
     
     def ticks_ms(self):
-        """Get current time in milliseconds (like Pico's time.ticks_ms())"""
-        return int(time.time() * 1000)
+        """Get current time in milliseconds (like Pico's time.ticks_ms()), monotonic"""
+        return timing.ticks_ms()
     
     def ticks_diff(self, new_ticks, old_ticks):
         """Calculate time difference (like Pico's time.ticks_diff())"""
@@ -167,13 +294,12 @@ class PiCubeTimer:
         """Sleep for milliseconds (like Pico's time.sleep_ms())"""
         time.sleep(ms / 1000.0)
     
-    # Display functions using luma.lcd
+    # Display functions (frames are diffed and only changed areas are sent)
     def fill_screen(self, color):
         """Fill entire screen with color"""
-        if self.device:
+        if self.screen:
             try:
-                with canvas(self.device) as draw:
-                    draw.rectangle(self.device.bounding_box, fill=color)
+                self.screen.display(Image.new('RGB', (DISPLAY_WIDTH, DISPLAY_HEIGHT), color))
             except Exception as e:
                 logger.error(f"Display error in fill_screen: {e}")
     
@@ -181,50 +307,94 @@ class PiCubeTimer:
         """Draw text with the given parameters"""
         draw.text((x, y), text, font=font, fill=color)
     
-    def create_display_image(self, draw_func):
-        """Create and display an image using the provided drawing function"""
-        if self.device:
+    def create_display_image(self, draw_func=None, static_key=None, draw_static=None):
+        """
+        Create and display an image using the provided drawing function.
+        If `draw_static` is given, it draws the parts of the screen that never
+        change; that layer is rendered once, cached under `static_key` and
+        `draw_func` only draws the dynamic parts on top of a copy of it.
+        """
+        if self.screen:
             try:
-                with canvas(self.device) as draw:
-                    draw_func(draw)
+                if draw_static is not None:
+                    layer = self.layers.get(static_key, draw_static)
+                    if draw_func is None:
+                        # Nothing dynamic: the render thread copies it anyway
+                        self.screen.display(layer)
+                        return
+                    image = layer.copy()
+                else:
+                    image = Image.new('RGB', (DISPLAY_WIDTH, DISPLAY_HEIGHT), Colors.BLACK)
+                draw_func(ImageDraw.Draw(image))
+                self.screen.display(image)
             except Exception as e:
                 logger.error(f"Display error: {e}")
     
     # OPTIMIZED TIMER DISPLAY - Fast updates with frame buffer
     def display_timer_fast(self, time_val, running=True):
-        """OPTIMIZED timer display - only updates changed areas"""
-        timer_str = "{:6.1f}".format(time_val) if running else "{:6.2f}".format(time_val)
+        """OPTIMIZED timer display - only redraws and sends changed areas"""
+        timer_str = "{:6.1f}".format(time_val) if running else "{:7.3f}".format(time_val)
         
         # Only redraw if timer value actually changed
         if timer_str != self.last_timer_str:
-            # Get text size
-            timer_bbox = self.timer_draw.textbbox((0, 0), timer_str, font=self.font_manager.big_font)
-            timer_width = timer_bbox[2] - timer_bbox[0]
-            timer_height = timer_bbox[3] - timer_bbox[1]
-            
+            # Fixed-advance layout from the pre-rendered digit atlas
+            atlas = self.timer_atlas
+            timer_width = atlas.width(timer_str)
             x_timer = max(0, (DISPLAY_WIDTH - timer_width) // 2)
-            y_timer = (DISPLAY_HEIGHT - timer_height) // 2
+            y_timer = (DISPLAY_HEIGHT - atlas.height) // 2
             
-            # Clear only the timer area (not whole screen)
-            self.timer_draw.rectangle([
-                x_timer - 10, y_timer - 10, 
-                x_timer + timer_width + 10, y_timer + timer_height + 10
-            ], fill=Colors.BLACK)
+            # Clear the old readout only if the new one doesn't cover it
+            box = (x_timer, y_timer, x_timer + timer_width, y_timer + atlas.height)
+            if self.last_timer_box and self.last_timer_box != box:
+                if self.timer_draw is None:
+                    self.timer_buffer.fill_rect(*self.last_timer_box, Colors.BLACK)
+                else:
+                    self.timer_draw.rectangle(self.last_timer_box, fill=Colors.BLACK)
+            self.last_timer_box = box
             
             # Draw new timer
             color = Colors.GREEN if running else Colors.CYAN
-            self.timer_draw.text((x_timer, y_timer), timer_str, font=self.font_manager.big_font, fill=color)
+            if self.timer_draw is None:
+                atlas.draw_565(self.timer_buffer, timer_str, x_timer, y_timer, color)
+            else:
+                atlas.draw(self.timer_buffer, timer_str, x_timer, y_timer, color)
             
-            # Push to display directly (bypass canvas overhead)
-            if self.device:
-                self.device.display(self.timer_buffer)
+            # Hand off to the render thread; only the changed digits are sent
+            if self.screen:
+                self.screen.display(self.timer_buffer)
             
             self.last_timer_str = timer_str
 
+    def display_running_timer(self, elapsed_ns):
+        """
+        Running timer for the solve loop. Unlike display_timer_fast it
+        allocates nothing per frame (no strings, tuples or arrays).
+        """
+        readout = self.running_readout
+        # Rounded to tenths, like "{:6.1f}"
+        tenths = (elapsed_ns + 50000000) // 100000000
+        if readout is None or tenths > readout.MAX_TENTHS:
+            self.display_timer_fast(elapsed_ns / 1e9, running=True)
+            return
+        if self.last_timer_box is not readout.box:
+            if self.last_timer_box:
+                self.timer_buffer.fill_rect(*self.last_timer_box, Colors.BLACK)
+            readout.reset()
+            self.last_timer_box = readout.box
+            self.last_timer_str = ""
+        if readout.draw(tenths) and self.screen:
+            self.screen.display(self.timer_buffer)
+
     def clear_timer_buffer(self):
         """Clear the timer buffer"""
-        self.timer_draw.rectangle([(0, 0), (DISPLAY_WIDTH, DISPLAY_HEIGHT)], fill=Colors.BLACK)
+        if self.timer_draw is None:
+            self.timer_buffer.fill(Colors.BLACK)
+        else:
+            self.timer_draw.rectangle([(0, 0), (DISPLAY_WIDTH, DISPLAY_HEIGHT)], fill=Colors.BLACK)
         self.last_timer_str = ""
+        self.last_timer_box = None
+        if self.running_readout is not None:
+            self.running_readout.reset()
     
     # Backlight management
     def set_backlight(self, state):
@@ -246,77 +416,84 @@ class PiCubeTimer:
             return True
         return False
     
+    def idle_timeout(self, timeout_ms=None):
+        """Seconds until the backlight would time out (None if it is already off)"""
+        if not self.backlight_on:
+            return None
+        effective_timeout = timeout_ms if timeout_ms is not None else BACKLIGHT_TIMEOUT_MS
+        remaining = effective_timeout - self.ticks_diff(self.ticks_ms(), self.last_touch_time)
+        return max(remaining, 0) / 1000 + 0.001
+    
     def any_touch(self):
         """Check if any button is pressed"""
-        return GPIO.input(TIMER_PIN) or GPIO.input(NEXT_PIN)
+        return self.buttons.any_pressed()
     
     # Core timer functions
+    def setup_storage(self):
+        """Pick the solve history backend (see STORAGE_MODE)"""
+        if STORAGE_MODE == "json":
+            self.storage = JsonStore(RESULTS_FILE)
+        elif STORAGE_MODE == "binary":
+            self.storage = BinaryStore(SOLVE_BIN_FILE, legacy_paths=(SOLVE_LOG_FILE, RESULTS_FILE))
+        else:
+            self.storage = JsonLinesStore(SOLVE_LOG_FILE, legacy_path=RESULTS_FILE)
+        logger.info(f"💾 Storage mode: {STORAGE_MODE}")
+    
     def load_times(self):
-        """Load solve times from file with better error handling"""
-        try:
-            if os.path.exists(RESULTS_FILE):
-                with open(RESULTS_FILE, "r") as f:
-                    return json.load(f)
-            else:
-                logger.warning(f"⚠️ No existing results file found at {RESULTS_FILE}")
-                return []
-        except json.JSONDecodeError as e:
-            logger.warning(f"⚠️ Error reading results file: Invalid JSON format - {e}")
-            # Backup corrupted file
-            if os.path.exists(RESULTS_FILE):
-                backup = f"{RESULTS_FILE}.bak"
-                try:
-                    os.rename(RESULTS_FILE, backup)
-                    logger.info(f"📦 Corrupted file backed up to {backup}")
-                except OSError as e:
-                    logger.error(f"❌ Failed to backup corrupted file: {e}")
-            return []
-        except OSError as e:
-            logger.warning(f"⚠️ Error accessing results file: {e}")
-            return []
-        except Exception as e:
-            logger.warning(f"⚠️ Unexpected error loading results: {e}")
-            return []
+        """Load solve times from the history backend"""
+        return self.storage.load()
 
-    def save_times(self, times):
-        """Save solve times to file with better error handling"""
-        try:
-            # Create temp file
-            temp_file = f"{RESULTS_FILE}.tmp"
-            with open(temp_file, "w") as f:
-                json.dump(times, f, indent=2)
-            
-            # Atomic replace
-            if os.name == 'nt':  # Windows
-                if os.path.exists(RESULTS_FILE):
-                    os.remove(RESULTS_FILE)
-            os.rename(temp_file, RESULTS_FILE)
-            
-        except OSError as e:
-            logger.error(f"❌ Error saving times: {e}")
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
-        except Exception as e:
-            logger.error(f"❌ Unexpected error saving times: {e}")
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+    def save_solve(self, entry):
+        """Queue a single new solve for the background writer (never blocks on disk)"""
+        self.writer.submit(entry)
 
     def clear_times(self):
-        """Clear all solve times with better error handling"""
+        """Clear all solve times"""
+        self.writer.clear()
+    
+    def handle_sigterm(self, signum, frame):
+        """systemd stops us with SIGTERM: unwind through main()'s finally block"""
+        raise KeyboardInterrupt
+    
+    def setup_scrambler(self):
+        """Map the two-phase tables for random-state scrambles, if available"""
+        self.solver = None
+        self.scrambles = None
+        if SCRAMBLE_MODE != "random-state":
+            return
+        if not twophase.TwoPhaseSolver.tables_exist():
+            logger.warning("⚠️ Scramble tables missing, using random-move scrambles "
+                           "(run: python3 twophase.py build)")
+            return
         try:
-            # Save empty list
-            with open(RESULTS_FILE, "w") as f:
-                json.dump([], f)
-        except Exception as e:
-            logger.error(f"❌ Error clearing times: {e}")
+            self.solver = twophase.get_solver()
+            logger.info("✅ Random-state scrambler ready")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not load scramble tables: {e}")
+            return
+        # Keep a few scrambles ready so the scramble screen never waits
+        self.scrambles = ScrambleProvider(twophase.generate_scramble,
+                                          size=SCRAMBLE_QUEUE_SIZE, path=SCRAMBLE_SAVE_FILE,
+                                          inline=self.generate_scramble_inline)
+    
+    def generate_scramble_inline(self):
+        """Random-state scramble the screen can wait for, at most SCRAMBLE_TIME_LIMIT_S"""
+        return twophase.generate_scramble(time_limit=twophase.SCRAMBLE_TIME_LIMIT_S)
     
     def generate_scramble(self, n_moves=20):
+        """Generate a scramble (random-state if the solver is available)"""
+        if self.solver is not None:
+            try:
+                if self.scrambles is not None:
+                    return self.scrambles.next()
+                return self.generate_scramble_inline()
+            except twophase.ScrambleTimeout as e:
+                logger.info(f"⏳ Random-state scramble too slow ({e}), using random moves")
+            except Exception as e:
+                logger.error(f"❌ Random-state scramble failed: {e}")
+        return self.generate_random_moves(n_moves)
+    
+    def generate_random_moves(self, n_moves=20):
         """Generate a random Rubik's cube scramble"""
         scramble = []
         prev = None
@@ -330,79 +507,85 @@ class PiCubeTimer:
             prev = f
         return " ".join(scramble)
     
-    def wrap_scramble(self, scramble, max_line_len=18):
-        """Wrap scramble text into lines (adjusted for wider display)"""
-        words = scramble.split()
-        lines = []
-        current = ""
-        for w in words:
-            if len(current) + len(w) + 1 <= max_line_len:
-                current += ("" if current == "" else " ") + w
-            else:
-                lines.append(current)
-                current = w
-        if current:
-            lines.append(current)
-        return lines
-    
-    def avg_of(self, times, count):
-        """Calculate average of count solves with trimming"""
-        if len(times) < count:
-            return None
-        
-        # Get the most recent 'count' times
-        recent_times = [entry["time"] for entry in times[-count:]]
-        
-        # For ao5 and ao12, trim the best and worst times
-        sorted_times = sorted(recent_times)
-        trimmed = sorted_times[1:-1]  # Remove best and worst
-        return sum(trimmed) / len(trimmed)
+    def wrap_scramble(self, scramble, max_width=DISPLAY_WIDTH - 20, font=None):
+        """Wrap scramble text into lines that fit the display (by pixel width)"""
+        return self.font_manager.wrap(scramble, font or self.font_manager.big_font, max_width)
+    
+    def layout_scramble(self, scramble):
+        """
+        (font, lines, line pitch) for the scramble screen. Long scrambles wrap
+        to more lines than fit at the normal pitch below y=SCRAMBLE_TOP, so the
+        pitch shrinks, down to the text height; past that the small font is used.
+        """
+        for font in (self.font_manager.big_font, self.font_manager.small_font):
+            lines = self.wrap_scramble(scramble, font=font)
+            text_height = max(self.font_manager.measure(line, font)[1] for line in lines)
+            bottom = max(font.getbbox(line)[3] for line in lines)
+            room = DISPLAY_HEIGHT - SCRAMBLE_TOP - bottom
+            pitch = min(SCRAMBLE_LINE_PITCH, room // max(1, len(lines) - 1))
+            if pitch >= text_height:
+                break
+        return font, lines, pitch
+    
+    def record_solve(self, time_val, scramble):
+        """Append a solve to the history and update the running averages"""
+        # Microsecond precision; the wall clock is only used for the timestamp
+        time_val = round(time_val, 6)
+        self.solve_times.append({"time": time_val, "scramble": scramble, "timestamp": int(time.time())})
+        self.stats.add(time_val)
+        self.save_solve(self.solve_times[-1])
+    
+    def reset_history(self):
+        """Forget every solve (history file and statistics)"""
+        self.solve_times = []
+        self.stats.reset()
+        self.clear_times()
+    
+    def format_avg(self, label, size):
+        """Format one 'aoN: current  best' line for the results screen"""
+        current = self.stats.average(size)
+        best = self.stats.best_average(size)
+        current_str = "--.--" if current is None else "{:.2f}".format(current)
+        best_str = "--.--" if best is None else "{:.2f}".format(best)
+        return "{:<5} {:>6}  best {:>6}".format(label + ":", current_str, best_str)
     
     # Display functions using luma.lcd
     def display_scramble(self, scramble):
         """Display scramble screen"""
-        def draw_scramble(draw):
+        def draw_static(draw):
             # Title
             title = "RasPiCubeZero"
-            title_bbox = draw.textbbox((0, 0), title, font=self.font_manager.big_font)
-            title_width = title_bbox[2] - title_bbox[0]
-            x_title = max(0, (DISPLAY_WIDTH - title_width) // 2)
+            x_title = self.font_manager.centered_x(title, self.font_manager.big_font)
             self.draw_text(draw, title, x_title, 10, self.font_manager.big_font, Colors.CYAN)
             
             # Subtitle
             subtitle = "Hold GP26 to prep"
-            subtitle_bbox = draw.textbbox((0, 0), subtitle, font=self.font_manager.big_font)
-            subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-            x_sub = max(0, (DISPLAY_WIDTH - subtitle_width) // 2)
+            x_sub = self.font_manager.centered_x(subtitle, self.font_manager.big_font)
             self.draw_text(draw, subtitle, x_sub, 50, self.font_manager.big_font, Colors.YELLOW)
             
-            # Scramble text
-            lines = self.wrap_scramble(scramble)
-            y = 90
-            for line in lines:
-                line_bbox = draw.textbbox((0, 0), line, font=self.font_manager.big_font)
-                line_width = line_bbox[2] - line_bbox[0]
-                x_line = max(0, (DISPLAY_WIDTH - line_width) // 2)
-                self.draw_text(draw, line, x_line, y, self.font_manager.big_font, Colors.WHITE)
-                y += 35
-            
             # Version
-            version_bbox = draw.textbbox((0, 0), VERSION, font=self.font_manager.small_font)
-            version_width = version_bbox[2] - version_bbox[0]
+            version_width, _ = self.font_manager.measure(VERSION, self.font_manager.small_font)
             x_version = DISPLAY_WIDTH - version_width - 10
             y_version = DISPLAY_HEIGHT - 25
             self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
         
-        self.create_display_image(draw_scramble)
+        def draw_scramble(draw):
+            # Scramble text
+            font, lines, pitch = self.layout_scramble(scramble)
+            y = SCRAMBLE_TOP
+            for line in lines:
+                x_line = self.font_manager.centered_x(line, font)
+                self.draw_text(draw, line, x_line, y, font, Colors.WHITE)
+                y += pitch
+        
+        self.create_display_image(draw_scramble, ("scramble", VERSION), draw_static)
         logger.info(f"🎲 Scramble: {scramble}")
     
     def display_timer(self, time_val, running=True):
         """Display timer (fallback for non-optimized screens)"""
         def draw_timer(draw):
-            timer_str = "{:6.1f}".format(time_val) if running else "{:6.2f}".format(time_val)
-            timer_bbox = draw.textbbox((0, 0), timer_str, font=self.font_manager.big_font)
-            timer_width = timer_bbox[2] - timer_bbox[0]
-            timer_height = timer_bbox[3] - timer_bbox[1]
+            timer_str = "{:6.1f}".format(time_val) if running else "{:7.3f}".format(time_val)
+            timer_width, timer_height = self.font_manager.measure(timer_str, self.font_manager.big_font)
             
             x_timer = max(0, (DISPLAY_WIDTH - timer_width) // 2)
             y_timer = (DISPLAY_HEIGHT - timer_height) // 2
@@ -411,340 +594,272 @@ class PiCubeTimer:
             self.draw_text(draw, timer_str, x_timer, y_timer, self.font_manager.big_font, color)
         
         self.create_display_image(draw_timer)
-        logger.info(f"⏱️  {time_val:.2f}s")
+        logger.info(f"⏱️  {format_time(time_val)}s")
     
     def display_results_and_avgs(self, latest_time, times, clear_msg=False):
         """Display solve results and averages"""
-        def draw_results(draw):
+        def draw_static(draw):
             # Title
             title = "Solve Results"
-            title_bbox = draw.textbbox((0, 0), title, font=self.font_manager.small_font)
-            title_width = title_bbox[2] - title_bbox[0]
-            x_title = max(0, (DISPLAY_WIDTH - title_width) // 2)
+            x_title = self.font_manager.centered_x(title, self.font_manager.small_font)
             self.draw_text(draw, title, x_title, 10, self.font_manager.small_font, Colors.CYAN)
             
             if clear_msg:
                 msg = "History Cleared!"
-                msg_bbox = draw.textbbox((0, 0), msg, font=self.font_manager.small_font)
-                msg_width = msg_bbox[2] - msg_bbox[0]
-                x_msg = max(0, (DISPLAY_WIDTH - msg_width) // 2)
+                x_msg = self.font_manager.centered_x(msg, self.font_manager.small_font)
                 self.draw_text(draw, msg, x_msg, 35, self.font_manager.small_font, Colors.RED)
                 
                 prompt = "Tap GP26 to exit"
-                prompt_bbox = draw.textbbox((0, 0), prompt, font=self.font_manager.small_font)
-                prompt_width = prompt_bbox[2] - prompt_bbox[0]
-                x_prompt = max(0, (DISPLAY_WIDTH - prompt_width) // 2)
+                x_prompt = self.font_manager.centered_x(prompt, self.font_manager.small_font)
                 self.draw_text(draw, prompt, x_prompt, DISPLAY_HEIGHT - 30, self.font_manager.small_font, Colors.MAGENTA)
                 
                 # Version
-                version_bbox = draw.textbbox((0, 0), VERSION, font=self.font_manager.small_font)
-                version_width = version_bbox[2] - version_bbox[0]
+                version_width, _ = self.font_manager.measure(VERSION, self.font_manager.small_font)
                 x_version = DISPLAY_WIDTH - version_width - 10
                 y_version = DISPLAY_HEIGHT - 25
                 self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
                 return
             
+            self.draw_text(draw, "Last 5:", 10, 55, self.font_manager.small_font, Colors.YELLOW)
+            
+            # Version
+            version_width, _ = self.font_manager.measure(VERSION, self.font_manager.small_font)
+            x_version = DISPLAY_WIDTH - version_width - 10
+            y_version = DISPLAY_HEIGHT - 25
+            self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
+        
+        def draw_results(draw):
             # Latest time
-            latest_str = "Latest: {:.2f}".format(latest_time)
+            latest_str = "Latest: {}".format(format_time(latest_time))
             self.draw_text(draw, latest_str, 10, 35, self.font_manager.small_font, Colors.GREEN)
             
             # Last 5 times
             y = 55
-            self.draw_text(draw, "Last 5:", 10, y, self.font_manager.small_font, Colors.YELLOW)
             for i, entry in enumerate(times[-5:][::-1]):
                 t = entry["time"]
-                time_str = "{:2d}: {:.2f}".format(len(times)-i, t)
+                time_str = "{:2d}: {}".format(len(times)-i, format_time(t))
                 self.draw_text(draw, time_str, 80, y, self.font_manager.small_font, Colors.WHITE)
                 y += 18
             
             y += 10
             
-            # Averages
-            ao5 = self.avg_of(times, 5)
-            ao12 = self.avg_of(times, 12)
-            
-            ao5_str = "ao5:  --.--" if ao5 is None else "ao5: {:.2f}".format(ao5)
-            ao12_str = "ao12: --.--" if ao12 is None else "ao12: {:.2f}".format(ao12)
-            
-            self.draw_text(draw, ao5_str, 10, y, self.font_manager.small_font, Colors.CYAN)
-            y += 18
-            self.draw_text(draw, ao12_str, 10, y, self.font_manager.small_font, Colors.CYAN)
-            
-            # Version
-            version_bbox = draw.textbbox((0, 0), VERSION, font=self.font_manager.small_font)
-            version_width = version_bbox[2] - version_bbox[0]
-            x_version = DISPLAY_WIDTH - version_width - 10
-            y_version = DISPLAY_HEIGHT - 25
-            self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
+            # Averages (kept up to date by SolveStats, no sorting here)
+            for size in (5, 12, 50, 100):
+                self.draw_text(draw, self.format_avg("ao{}".format(size), size), 10, y, self.font_manager.small_font, Colors.CYAN)
+                y += 18
         
-        self.create_display_image(draw_results)
+        self.create_display_image(None if clear_msg else draw_results,
+                                  ("results", clear_msg, VERSION), draw_static)
         
-        logger.info(f"📊 Latest: {latest_time:.2f}s")
-        ao5 = self.avg_of(times, 5)
-        ao12 = self.avg_of(times, 12)
-        if ao5:
-            logger.info(f"📊 ao5: {ao5:.2f}s")
-        if ao12:
-            logger.info(f"📊 ao12: {ao12:.2f}s")
+        logger.info(f"📊 Latest: {format_time(latest_time)}s")
+        for size in (5, 12, 50, 100, 1000):
+            avg = self.stats.average(size)
+            if avg is not None:
+                logger.info(f"📊 ao{size}: {avg:.2f}s (best {self.stats.best_average(size):.2f}s)")
     
     def display_are_you_sure(self):
         """Display confirmation dialog"""
-        def draw_confirm(draw):
+        def draw_static(draw):
             msg = "Are you sure?"
-            msg_bbox = draw.textbbox((0, 0), msg, font=self.font_manager.small_font)
-            msg_width = msg_bbox[2] - msg_bbox[0]
-            x_msg = max(0, (DISPLAY_WIDTH - msg_width) // 2)
+            x_msg = self.font_manager.centered_x(msg, self.font_manager.small_font)
             self.draw_text(draw, msg, x_msg, 60, self.font_manager.small_font, Colors.YELLOW)
             
             msg2 = "GP19: Clear | GP26: Cancel"
-            msg2_bbox = draw.textbbox((0, 0), msg2, font=self.font_manager.small_font)
-            msg2_width = msg2_bbox[2] - msg2_bbox[0]
-            x_msg2 = max(0, (DISPLAY_WIDTH - msg2_width) // 2)
+            x_msg2 = self.font_manager.centered_x(msg2, self.font_manager.small_font)
             self.draw_text(draw, msg2, x_msg2, 120, self.font_manager.small_font, Colors.MAGENTA)
             
             # Version
-            version_bbox = draw.textbbox((0, 0), VERSION, font=self.font_manager.small_font)
-            version_width = version_bbox[2] - version_bbox[0]
+            version_width, _ = self.font_manager.measure(VERSION, self.font_manager.small_font)
             x_version = DISPLAY_WIDTH - version_width - 10
             y_version = DISPLAY_HEIGHT - 25
             self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
         
-        self.create_display_image(draw_confirm)
+        self.create_display_image(None, ("confirm", VERSION), draw_static)
         logger.info("❓ Are you sure you want to clear history?")
     
     def display_timer_prep(self, message, color):
         """Display timer preparation screen"""
-        def draw_prep(draw):
+        def draw_static(draw):
             # Title
             title = "RasPiCubeZero"
-            title_bbox = draw.textbbox((0, 0), title, font=self.font_manager.big_font)
-            title_width = title_bbox[2] - title_bbox[0]
-            x_title = max(0, (DISPLAY_WIDTH - title_width) // 2)
+            x_title = self.font_manager.centered_x(title, self.font_manager.big_font)
             self.draw_text(draw, title, x_title, 10, self.font_manager.big_font, Colors.CYAN)
             
             # Message
-            msg_bbox = draw.textbbox((0, 0), message, font=self.font_manager.big_font)
-            msg_width = msg_bbox[2] - msg_bbox[0]
-            x_msg = max(0, (DISPLAY_WIDTH - msg_width) // 2)
+            x_msg = self.font_manager.centered_x(message, self.font_manager.big_font)
             self.draw_text(draw, message, x_msg, 80, self.font_manager.big_font, color)
         
-        self.create_display_image(draw_prep)
+        # Only a handful of messages exist, so the whole screen is cached
+        self.create_display_image(None, ("prep", message, color), draw_static)
     
     def display_completion(self, final_time):
         """Display completion screen"""
-        def draw_completion(draw):
-            # Timer
-            timer_str = "{:6.2f}".format(final_time)
-            timer_bbox = draw.textbbox((0, 0), timer_str, font=self.font_manager.big_font)
-            timer_width = timer_bbox[2] - timer_bbox[0]
-            timer_height = timer_bbox[3] - timer_bbox[1]
-            
-            x_timer = max(0, (DISPLAY_WIDTH - timer_width) // 2)
-            y_timer = (DISPLAY_HEIGHT - timer_height) // 2
-            self.draw_text(draw, timer_str, x_timer, y_timer, self.font_manager.big_font, Colors.CYAN)
-            
+        def draw_static(draw):
             # Completion message
             subtitle = "Done! Tap GP19"
-            subtitle_bbox = draw.textbbox((0, 0), subtitle, font=self.font_manager.big_font)
-            subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-            x_sub = max(0, (DISPLAY_WIDTH - subtitle_width) // 2)
+            x_sub = self.font_manager.centered_x(subtitle, self.font_manager.big_font)
             self.draw_text(draw, subtitle, x_sub, 50, self.font_manager.big_font, Colors.YELLOW)
             
             # Version
-            version_bbox = draw.textbbox((0, 0), VERSION, font=self.font_manager.small_font)
-            version_width = version_bbox[2] - version_bbox[0]
+            version_width, _ = self.font_manager.measure(VERSION, self.font_manager.small_font)
             x_version = DISPLAY_WIDTH - version_width - 10
             y_version = DISPLAY_HEIGHT - 25
             self.draw_text(draw, VERSION, x_version, y_version, self.font_manager.small_font, Colors.RED)
         
-        self.create_display_image(draw_completion)
+        def draw_completion(draw):
+            # Timer
+            timer_str = "{:7.3f}".format(final_time)
+            timer_width, timer_height = self.font_manager.measure(timer_str, self.font_manager.big_font)
+            
+            x_timer = max(0, (DISPLAY_WIDTH - timer_width) // 2)
+            y_timer = (DISPLAY_HEIGHT - timer_height) // 2
+            self.draw_text(draw, timer_str, x_timer, y_timer, self.font_manager.big_font, Colors.CYAN)
+        
+        self.create_display_image(draw_completion, ("completion", VERSION), draw_static)
     
     # Button handling functions (same as original with touch-to-wake)
-    def wait_for_touch_or_action(self, pin_check_fn, backlight_timeout=None):
-        """Wait for a pin to be pressed with touch-to-wake logic"""
+    def wait_for_touch_or_action(self, pins, backlight_timeout=None):
+        """Wait for one of `pins` to be pressed and released, with touch-to-wake logic. Returns the pin"""
         while True:
-            self.check_backlight_timeout(backlight_timeout)
-            if pin_check_fn():
-                self.update_touch_time()
-                if not self.backlight_on:
-                    # Wake the screen, but do NOT trigger the action
-                    while pin_check_fn():
-                        self.sleep_ms(10)
-                    continue
-                # Backlight is on, so this is a real action
-                while pin_check_fn():
-                    self.sleep_ms(10)
-                return
-            self.sleep_ms(10)
+            event = self.buttons.wait(self.idle_timeout(backlight_timeout))
+            if event is None:
+                self.check_backlight_timeout(backlight_timeout)
+                continue
+            if not event.pressed or event.pin not in pins:
+                continue
+            self.update_touch_time()
+            if not self.backlight_on:
+                # Wake the screen, but do NOT trigger the action
+                self.buttons.wait_release(event.pin)
+                continue
+            # Backlight is on, so this is a real action
+            self.buttons.wait_release(event.pin)
+            return event.pin
     
     def wait_for_next_scramble(self):
         """Wait for either pin to be pressed (30s timeout on scramble screen)"""
         self.wait_for_touch_or_action(
-            lambda: GPIO.input(NEXT_PIN) or GPIO.input(TIMER_PIN),
+            (NEXT_PIN, TIMER_PIN),
             backlight_timeout=SCRAMBLE_BACKLIGHT_TIMEOUT_MS
         )
     
     def wait_for_next(self):
         """Wait for either pin to be pressed (default timeout)"""
-        self.wait_for_touch_or_action(
-            lambda: GPIO.input(NEXT_PIN) or GPIO.input(TIMER_PIN)
-        )
+        self.wait_for_touch_or_action((NEXT_PIN, TIMER_PIN))
     
     def wait_for_next_with_results(self):
         """Wait for next_pin or timer_pin with touch-to-wake. Returns 'clear' or 'exit'"""
-        while True:
-            self.check_backlight_timeout()
-            if GPIO.input(NEXT_PIN):
-                self.update_touch_time()
-                if not self.backlight_on:
-                    while GPIO.input(NEXT_PIN):
-                        self.sleep_ms(10)
-                    continue
-                while GPIO.input(NEXT_PIN):
-                    self.sleep_ms(10)
-                return "clear"
-            if GPIO.input(TIMER_PIN):
-                self.update_touch_time()
-                if not self.backlight_on:
-                    while GPIO.input(TIMER_PIN):
-                        self.sleep_ms(10)
-                    continue
-                while GPIO.input(TIMER_PIN):
-                    self.sleep_ms(10)
-                return "exit"
-            self.sleep_ms(10)
+        pin = self.wait_for_touch_or_action((NEXT_PIN, TIMER_PIN))
+        return "clear" if pin == NEXT_PIN else "exit"
     
     def wait_for_confirm_clear(self):
         """Wait for confirmation. Returns 'clear' or 'cancel'"""
-        while True:
-            self.check_backlight_timeout()
-            if GPIO.input(NEXT_PIN):
-                self.update_touch_time()
-                if not self.backlight_on:
-                    while GPIO.input(NEXT_PIN):
-                        self.sleep_ms(10)
-                    continue
-                while GPIO.input(NEXT_PIN):
-                    self.sleep_ms(10)
-                return "clear"
-            if GPIO.input(TIMER_PIN):
-                self.update_touch_time()
-                if not self.backlight_on:
-                    while GPIO.input(TIMER_PIN):
-                        self.sleep_ms(10)
-                    continue
-                while GPIO.input(TIMER_PIN):
-                    self.sleep_ms(10)
-                return "cancel"
-            self.sleep_ms(10)
+        pin = self.wait_for_touch_or_action((NEXT_PIN, TIMER_PIN))
+        return "clear" if pin == NEXT_PIN else "cancel"
     
     def timer_control(self):
         """Timer control logic with OPTIMIZED display updates"""
         HOLD_TIME_MS = 400  # Minimum hold time to qualify as "ready"
+        buttons = self.buttons
         
         # Wait for button release first
-        while GPIO.input(TIMER_PIN):
-            self.update_touch_time()
-            self.sleep_ms(10)
+        buttons.wait_release(TIMER_PIN)
+        self.update_touch_time()
         
         while True:
             # Show initial prep message
             self.display_timer_prep("Hold GP26 to prep", Colors.YELLOW)
             
             # Wait for button press
-            while not GPIO.input(TIMER_PIN):
+            while True:
+                press = buttons.wait_press((TIMER_PIN,), self.idle_timeout())
+                if press is not None:
+                    break
                 self.check_backlight_timeout()
-                self.sleep_ms(10)
             
-            hold_start = self.ticks_ms()
-            held_long_enough = False
-            
-            while GPIO.input(TIMER_PIN):
-                held_time = self.ticks_diff(self.ticks_ms(), hold_start)
-                
-                # Show status based on hold time
-                if not held_long_enough and held_time < HOLD_TIME_MS:
-                    self.display_timer_prep("Keep holding it", Colors.YELLOW)
-                elif not held_long_enough and held_time >= HOLD_TIME_MS:
-                    held_long_enough = True
-                    self.display_timer_prep("Release to start!", Colors.RED)
-                
-                self.update_touch_time()
-                self.sleep_ms(30)
+            self.update_touch_time()
+            self.display_timer_prep("Keep holding it", Colors.YELLOW)
             
-            if held_long_enough:
+            release = buttons.wait_release(TIMER_PIN, timeout=HOLD_TIME_MS / 1000)
+            if release is None:
+                # Held long enough
+                self.display_timer_prep("Release to start!", Colors.RED)
+                release = buttons.wait_release(TIMER_PIN)
                 break
-            else:
-                # Button released too soon, loop and try again
-                self.update_touch_time()
-        
-        # Wait for button release to start timer
-        while GPIO.input(TIMER_PIN):
+            if release.t_ns - press.t_ns >= HOLD_TIME_MS * 1000000:
+                break
+            # Button released too soon, loop and try again
             self.update_touch_time()
-            self.sleep_ms(10)
         
-        # OPTIMIZED TIMER LOOP - Fast updates with frame buffer
-        timer_start = self.ticks_ms()
+        # The solve starts at the release edge, not when we noticed it
+        timer_start_ns = release.t_ns
         self.update_touch_time()
         
         # Clear timer buffer and prepare for fast updates
         self.clear_timer_buffer()
         
-        update_interval = 50   # 50ms = 20 FPS
-        poll_interval = 5      # 5ms button polling
-        last_update = self.ticks_ms()
+        update_interval_ns = RUNNING_FRAME_NS
+        next_update = now_ns()
         
-        while True:
-            elapsed = (self.ticks_ms() - timer_start) / 1000
-            now = self.ticks_ms()
-            if self.ticks_diff(now, last_update) >= update_interval:
-                self.display_timer_fast(elapsed, running=True)  # Use optimized method
-                last_update = now
-            self.sleep_ms(poll_interval)
-            if GPIO.input(TIMER_PIN):
-                break
-            if self.any_touch():
-                self.update_touch_time()
+        # Solve mode: everything the loop draws with is preallocated, and the
+        # cyclic GC can't pause it (existing objects are frozen out of it)
+        if SOLVE_GC_OFF:
+            gc.freeze()
+            gc.disable()
+        try:
+            # OPTIMIZED TIMER LOOP - sleeps until the next frame or a button edge
+            while True:
+                event = buttons.wait(max(0, next_update - now_ns()) / 1e9)
+                if event is None:
+                    now = now_ns()
+                    self.display_running_timer(now - timer_start_ns)
+                    next_update = now + update_interval_ns
+                    continue
+                if event.pressed:
+                    self.update_touch_time()
+                    if event.pin == TIMER_PIN:
+                        timer_stop_ns = event.t_ns
+                        break
+        finally:
+            if SOLVE_GC_OFF:
+                gc.enable()
+                gc.unfreeze()
         
-        final_elapsed = (self.ticks_ms() - timer_start) / 1000
+        # Both instants are edge timestamps on the same monotonic clock
+        final_elapsed = timing.us_to_seconds(timing.elapsed_us(timer_start_ns, timer_stop_ns))
         self.display_timer_fast(final_elapsed, running=False)  # Use optimized method
         
-        while GPIO.input(TIMER_PIN):
-            self.update_touch_time()
-            self.sleep_ms(10)
+        buttons.wait_release(TIMER_PIN)
+        self.update_touch_time()
         
         # Show completion screen
         self.display_completion(final_elapsed)
+        if SOLVE_GC_OFF:
+            # Whatever piled up during the solve, now that the result is shown
+            gc.collect()
         
         # Extra wait for long solves
         if final_elapsed >= 20:
             self.update_touch_time()
-            extra_wait = 0
-            while extra_wait < BACKLIGHT_SOLVE_EXTRA_MS:
-                self.sleep_ms(100)
-                extra_wait += 100
-                if self.any_touch():
-                    self.update_touch_time()
-                    break
-                self.check_backlight_timeout()
+            if buttons.wait_press(timeout=BACKLIGHT_SOLVE_EXTRA_MS / 1000) is not None:
+                self.update_touch_time()
+            self.check_backlight_timeout()
         
         return final_elapsed
     
     def main(self):
         """Main loop"""
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
         try:
             while True:
                 scramble = self.generate_scramble(20)
                 self.display_scramble(scramble)
                 self.wait_for_next_scramble()
                 timer_val = self.timer_control()
-                self.solve_times.append({"time": timer_val, "scramble": scramble})
-                self.save_times(self.solve_times)
+                self.record_solve(timer_val, scramble)
                 
                 # Wait for tap of GP19 to show results/averages
-                self.wait_for_touch_or_action(lambda: GPIO.input(NEXT_PIN))
-                while GPIO.input(NEXT_PIN):
-                    self.sleep_ms(10)
+                self.wait_for_touch_or_action((NEXT_PIN,))
                 
                 self.display_results_and_avgs(timer_val, self.solve_times)
                 
@@ -758,13 +873,10 @@ class PiCubeTimer:
                     self.display_are_you_sure()
                     confirm_action = self.wait_for_confirm_clear()
                     if confirm_action == "clear":
-                        self.solve_times = []
-                        self.clear_times()
+                        self.reset_history()
                         self.display_results_and_avgs(0, self.solve_times, clear_msg=True)
                         # Wait for tap of GP26 to exit cleared screen
-                        self.wait_for_touch_or_action(lambda: GPIO.input(TIMER_PIN))
-                        while GPIO.input(TIMER_PIN):
-                            self.sleep_ms(10)
+                        self.wait_for_touch_or_action((TIMER_PIN,))
                         continue
                     else:
                         # Cancel, redisplay stats
@@ -776,12 +888,9 @@ class PiCubeTimer:
                             self.display_are_you_sure()
                             confirm_action = self.wait_for_confirm_clear()
                             if confirm_action == "clear":
-                                self.solve_times = []
-                                self.clear_times()
+                                self.reset_history()
                                 self.display_results_and_avgs(0, self.solve_times, clear_msg=True)
-                                self.wait_for_touch_or_action(lambda: GPIO.input(TIMER_PIN))
-                                while GPIO.input(TIMER_PIN):
-                                    self.sleep_ms(10)
+                                self.wait_for_touch_or_action((TIMER_PIN,))
                                 continue
                             else:
                                 self.display_results_and_avgs(timer_val, self.solve_times)
@@ -793,12 +902,9 @@ class PiCubeTimer:
                                         self.display_are_you_sure()
                                         c = self.wait_for_confirm_clear()
                                         if c == "clear":
-                                            self.solve_times = []
-                                            self.clear_times()
+                                            self.reset_history()
                                             self.display_results_and_avgs(0, self.solve_times, clear_msg=True)
-                                            self.wait_for_touch_or_action(lambda: GPIO.input(TIMER_PIN))
-                                            while GPIO.input(TIMER_PIN):
-                                                self.sleep_ms(10)
+                                            self.wait_for_touch_or_action((TIMER_PIN,))
                                             break
         
         except KeyboardInterrupt:
@@ -808,6 +914,18 @@ class PiCubeTimer:
             import traceback
             traceback.print_exc()
         finally:
+            if self.scrambles is not None:
+                self.scrambles.close()
+            # Flush any solves still queued for the writer thread
+            self.writer.close()
+            logger.info(f"💾 Writer stats: {self.writer.stats()}")
+            self.buttons.close()
+            if self.screen:
+                self.screen.close()
+                logger.info(f"🖥️ Render stats: {self.screen.stats()}")
+            if DISPLAY_BACKEND in ("spidev", "fbdev") and self.device:
+                self.device.close()
+            import RPi.GPIO as GPIO
             GPIO.cleanup()
             logger.info("🧹 GPIO cleaned up")
 
@@ -0,0 +1,123 @@
+"""
+Background scramble pre-generation for RasPiCube
+
+Random-state scrambles cost real CPU time on a Pi Zero 2 W, so a worker
+process keeps a bounded queue of ready scrambles topped up (including while
+the user is solving) and the scramble screen just takes the next one.
+
+A separate process is used instead of a thread: the solver is CPU-bound
+Python (NumPy only batches its search) and would otherwise compete for the
+GIL with the timing loop. The Pi Zero
+2 W has four cores, so the worker runs alongside the UI at a lower priority.
+
+Scrambles that are still queued at shutdown are saved and handed out first
+after the next start, so nothing generated is wasted.
+"""
+
+import os
+import json
+import queue
+import multiprocessing
+import logging
+
+from cubesim import verify_scrambles
+
+logger = logging.getLogger("raspicube")
+
+SCRAMBLE_QUEUE_SIZE = 5
+WORKER_NICE = 10
+_PUT_TIMEOUT_S = 0.5
+
+
+def _worker(generate, out_queue, stop):
+    """Worker process: generate scrambles until stopped"""
+    try:
+        os.nice(WORKER_NICE)
+    except OSError:
+        pass
+    while not stop.is_set():
+        scramble = generate()
+        while not stop.is_set():
+            try:
+                out_queue.put(scramble, timeout=_PUT_TIMEOUT_S)
+                break
+            except queue.Full:
+                continue
+
+
+class ScrambleProvider:
+    """Hands out pre-generated scrambles, refilled by a worker process"""
+
+    def __init__(self, generate, size=SCRAMBLE_QUEUE_SIZE, path=None, inline=None):
+        self.generate = generate
+        # Used when the queue is empty; may be time-limited, unlike the worker
+        self.inline = inline or generate
+        self.size = size
+        self.path = path
+        self._saved = self._load_saved()
+        # fork keeps the already-mapped scramble tables; create this before
+        # starting any other threads
+        ctx = multiprocessing.get_context("fork")
+        self._queue = ctx.Queue(maxsize=size)
+        self._stop = ctx.Event()
+        self._process = ctx.Process(
+            target=_worker, args=(generate, self._queue, self._stop),
+            name="raspicube-scrambler", daemon=True)
+        self._process.start()
+        logger.info(f"🎲 Scramble worker started ({len(self._saved)} saved scrambles)")
+
+    def next(self):
+        """Next scramble, without waiting for the generator when possible"""
+        if self._saved:
+            return self._saved.pop(0)
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            logger.info("⏳ Scramble queue empty, generating inline")
+            return self.inline()
+
+    def close(self, timeout=2.0):
+        """Stop the worker and save any unused scrambles"""
+        self._stop.set()
+        leftover = list(self._saved)
+        try:
+            while True:
+                leftover.append(self._queue.get(timeout=0.1))
+        except (queue.Empty, OSError, EOFError):
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        # Cap what we keep so repeated restarts don't pile scrambles up
+        self._save(leftover[:self.size])
+
+    def _load_saved(self):
+        if not self.path or not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r") as f:
+                scrambles = json.load(f)
+            # Don't hand the same scrambles out twice after a crash
+            os.remove(self.path)
+            scrambles = [s for s in scrambles if isinstance(s, str)]
+            # The file may be stale or hand-edited: only keep scrambles that
+            # parse and really scramble the cube
+            valid = verify_scrambles(scrambles)
+            if not valid.all():
+                logger.warning(f"⚠️ Dropping {int((~valid).sum())} invalid saved scramble(s)")
+            return [s for s, ok in zip(scrambles, valid) if ok]
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not read saved scrambles: {e}")
+            return []
+
+    def _save(self, scrambles):
+        if not self.path or not scrambles:
+            return
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, "w") as f:
+                json.dump(scrambles, f)
+            os.replace(temp_file, self.path)
+            logger.info(f"💾 Saved {len(scrambles)} unused scramble(s)")
+        except OSError as e:
+            logger.error(f"❌ Failed to save scrambles: {e}")
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+spidev ST7789 driver for RasPiCube
+
+A CPython port of the Pico driver (pico/lib/st7789py.py, MIT License,
+Copyright (c) 2020-2023 Russ Hughes, Copyright (c) 2019 Ivan Belokobylskiy)
+that talks to /dev/spidevB.D directly, with RPi.GPIO for DC/reset. It skips
+luma and PIL entirely: pixel data is written as-is from any bytes-like
+object (bytes, bytearray, memoryview, NumPy array), split into transfers of
+the kernel's spidev `bufsiz` using memoryview slices, so nothing is copied
+on the way out.
+
+It also offers luma's command()/data() calls, so DirtyRectDisplay (see
+display.py) works on top of it unchanged. Select it with
+DISPLAY_BACKEND = "spidev" in raspicube.py.
+
+    python3 st7789spi.py bench [FRAMES]    # FPS and bytes/frame, luma vs spidev (needs the panel)
+"""
+
+import sys
+import time
+import struct
+import logging
+
+logger = logging.getLogger("raspicube")
+
+# ST7789 commands
+_SWRESET = 0x01
+_SLPIN = 0x10
+_SLPOUT = 0x11
+_INVOFF = 0x20
+_INVON = 0x21
+_CASET = 0x2A
+_RASET = 0x2B
+_RAMWR = 0x2C
+_MADCTL = 0x36
+
+_MADCTL_BGR = 0x08
+RGB = 0x00
+BGR = 0x08
+
+_ENCODE_POS = struct.Struct(">HH")
+
+# Rotation tables, same as the Pico driver
+#   (madctl, width, height, xstart, ystart)[rotation % 4]
+_DISPLAY_240x320 = (
+    (0x00, 240, 320, 0, 0),
+    (0x60, 320, 240, 0, 0),
+    (0xc0, 240, 320, 0, 0),
+    (0xa0, 320, 240, 0, 0))
+
+_DISPLAY_240x240 = (
+    (0x00, 240, 240, 0, 0),
+    (0x60, 240, 240, 0, 0),
+    (0xc0, 240, 240, 0, 80),
+    (0xa0, 240, 240, 80, 0))
+
+_SUPPORTED_DISPLAYS = {
+    (240, 320): _DISPLAY_240x320,
+    (240, 240): _DISPLAY_240x240,
+}
+
+# (command, data, delay_ms), same sequence as the Pico driver
+_INIT_CMDS = (
+    (0x11, b"\x00", 120),               # Exit sleep mode
+    (0x13, b"\x00", 0),                 # Turn on the display
+    (0xb6, b"\x0a\x82", 0),             # Set display function control
+    (0x3a, b"\x55", 10),                # Set pixel format to 16 bits per pixel (RGB565)
+    (0xb2, b"\x0c\x0c\x00\x33\x33", 0), # Set porch control
+    (0xb7, b"\x35", 0),                 # Set gate control
+    (0xbb, b"\x28", 0),                 # Set VCOMS setting
+    (0xc0, b"\x0c", 0),                 # Set power control 1
+    (0xc2, b"\x01\xff", 0),             # Set power control 2
+    (0xc3, b"\x10", 0),                 # Set power control 3
+    (0xc4, b"\x20", 0),                 # Set power control 4
+    (0xc6, b"\x0f", 0),                 # Set VCOM control 1
+    (0xd0, b"\xa4\xa1", 0),             # Set power control A
+    (0xe0, b"\xd0\x00\x02\x07\x0a\x28\x32\x44\x42\x06\x0e\x12\x14\x17", 0),  # Gamma +
+    (0xe1, b"\xd0\x00\x02\x07\x0a\x28\x31\x54\x47\x0e\x1c\x17\x1b\x1e", 0),  # Gamma -
+    (0x21, b"\x00", 0),                 # Enable display inversion
+    (0x29, b"\x00", 120),               # Turn on the display
+)
+
+_BUFSIZ_PATH = "/sys/module/spidev/parameters/bufsiz"
+_DEFAULT_BUFSIZ = 4096
+_FILL_CHUNK = 4096   # pixels per fill_rect transfer
+
+
+def spidev_bufsiz():
+    """Largest single transfer spidev accepts (module parameter bufsiz)"""
+    try:
+        with open(_BUFSIZ_PATH) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return _DEFAULT_BUFSIZ
+
+
+class ST7789:
+    """
+    ST7789 on spidev. `width`/`height` are the physical panel size (e.g.
+    240x320); `rotation` 1 gives the 320x240 landscape used by RasPiCube.
+    """
+
+    def __init__(self, port=0, device=0, dc=24, reset=25, width=240, height=320,
+                 rotation=1, speed_hz=80000000, spi_mode=0, color_order=BGR, spi=None, gpio=None):
+        self.rotations = _SUPPORTED_DISPLAYS.get((width, height))
+        if self.rotations is None:
+            supported = ", ".join(f"{w}x{h}" for w, h in _SUPPORTED_DISPLAYS)
+            raise ValueError(f"Unsupported {width}x{height} display. Supported displays: {supported}")
+        if gpio is None:
+            import RPi.GPIO as gpio
+        if spi is None:
+            import spidev
+            spi = spidev.SpiDev()
+            spi.open(port, device)
+            spi.max_speed_hz = speed_hz
+            spi.mode = spi_mode
+        self.spi = spi
+        self.gpio = gpio
+        self.dc = dc
+        self.reset = reset
+        self.color_order = color_order
+        self.bufsiz = spidev_bufsiz()
+        self.physical_width, self.physical_height = width, height
+        self.width, self.height = width, height
+        self.xstart = self.ystart = 0
+        # Counters for benchmarks
+        self.transfers = 0
+        self.bytes_written = 0
+        # Reused by _set_window() and fill_rect() so drawing doesn't allocate
+        self._window = bytearray(_ENCODE_POS.size)
+        self._fill = bytearray(_FILL_CHUNK * 2)
+        self._fill_view = memoryview(self._fill)
+        self._fill_color = None
+
+        gpio.setup(dc, gpio.OUT)
+        if reset is not None:
+            gpio.setup(reset, gpio.OUT)
+        self.hard_reset()
+        # yes, twice, once is not always enough
+        self.init(_INIT_CMDS)
+        self.init(_INIT_CMDS)
+        self.rotation(rotation)
+        self.fill(0)
+
+    # Low level
+    def _send(self, buf):
+        """Write a bytes-like object in spidev-sized pieces, without copying"""
+        view = memoryview(buf).cast("B")
+        step = self.bufsiz
+        for start in range(0, len(view), step):
+            self.spi.writebytes2(view[start:start + step])
+            self.transfers += 1
+        self.bytes_written += len(view)
+
+    def _write(self, command=None, data=None):
+        """SPI write to the device: a command byte and/or its data"""
+        if command is not None:
+            self.gpio.output(self.dc, 0)
+            self._send(bytes((command,)))
+        if data is not None:
+            self.gpio.output(self.dc, 1)
+            self._send(data)
+
+    # luma-compatible interface (used by DirtyRectDisplay)
+    def command(self, cmd, *args):
+        self._write(cmd, bytes(args) if args else None)
+
+    def data(self, data):
+        self._write(None, data)
+
+    def hard_reset(self):
+        if self.reset is None:
+            return
+        for level, delay in ((1, 0.01), (0, 0.01), (1, 0.12)):
+            self.gpio.output(self.reset, level)
+            time.sleep(delay)
+
+    def soft_reset(self):
+        self._write(_SWRESET)
+        time.sleep(0.15)
+
+    def init(self, commands):
+        for command, data, delay in commands:
+            self._write(command, data)
+            time.sleep(delay / 1000)
+
+    def sleep_mode(self, value):
+        self._write(_SLPIN if value else _SLPOUT)
+
+    def inversion_mode(self, value):
+        self._write(_INVON if value else _INVOFF)
+
+    def rotation(self, rotation):
+        """0 portrait, 1 landscape, 2 inverted portrait, 3 inverted landscape"""
+        madctl, self.width, self.height, self.xstart, self.ystart = self.rotations[rotation % 4]
+        if self.color_order == BGR:
+            madctl |= _MADCTL_BGR
+        else:
+            madctl &= ~_MADCTL_BGR
+        self._write(_MADCTL, bytes((madctl,)))
+
+    def _set_window(self, x0, y0, x1, y1):
+        """
+        Set the inclusive column/row window for the next RAMWR. Raises
+        ValueError if it isn't on screen: the data that follows would be
+        written somewhere else.
+        """
+        if not (0 <= x0 <= x1 < self.width and 0 <= y0 <= y1 < self.height):
+            raise ValueError(f"Window ({x0}, {y0})-({x1}, {y1}) is outside the "
+                             f"{self.width}x{self.height} display")
+        window = self._window
+        _ENCODE_POS.pack_into(window, 0, x0 + self.xstart, x1 + self.xstart)
+        self._write(_CASET, window)
+        _ENCODE_POS.pack_into(window, 0, y0 + self.ystart, y1 + self.ystart)
+        self._write(_RASET, window)
+        self._write(_RAMWR)
+
+    def _clip(self, x, y, width, height):
+        """(x, y, width, height) clipped to the display; width/height may be 0"""
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, self.width), min(y + height, self.height)
+        return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+    # Drawing
+    def blit_buffer(self, buffer, x, y, width, height):
+        """Copy big-endian RGB565 data (any bytes-like object) to the display"""
+        self._set_window(x, y, x + width - 1, y + height - 1)
+        self._write(None, buffer)
+
+    def fill_rect(self, x, y, width, height, color):
+        """Fill a rectangle with a 565 colour, clipped to the display"""
+        x, y, width, height = self._clip(x, y, width, height)
+        if not (width and height):
+            return
+        self._set_window(x, y, x + width - 1, y + height - 1)
+        view = self._fill_view
+        if color != self._fill_color:
+            # Fill the reusable chunk by doubling, without temporary copies
+            struct.pack_into(">H", self._fill, 0, color)
+            filled = 2
+            while filled < len(view):
+                n = min(filled, len(view) - filled)
+                view[filled:filled + n] = view[:n]
+                filled += n
+            self._fill_color = color
+        chunks, rest = divmod(width * height, _FILL_CHUNK)
+        self.gpio.output(self.dc, 1)
+        for _ in range(chunks):
+            self._send(view)
+        if rest:
+            self._send(view[:rest * 2])
+
+    def fill(self, color):
+        self.fill_rect(0, 0, self.width, self.height, color)
+
+    def pixel(self, x, y, color):
+        """Set one pixel; off-screen pixels are ignored"""
+        self.fill_rect(x, y, 1, 1, color)
+
+    def close(self):
+        try:
+            self.spi.close()
+        except OSError:
+            pass
+
+
+def benchmark(frames=100):
+    """
+    Frames per second and SPI bytes per frame on the real panel:
+    luma full frames vs spidev full frames vs spidev + DirtyRectDisplay
+    drawing a running timer.
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw
+    import RPi.GPIO as GPIO
+    from display import DirtyRectDisplay, DigitAtlas, Frame565, rgb_to_565, _bench_font
+
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setwarnings(False)
+    width, height = 320, 240
+    image = Image.new("RGB", (width, height))
+    ImageDraw.Draw(image).rectangle((20, 20, 300, 220), outline=(0, 255, 255), width=3)
+    results = []
+
+    def report(name, elapsed, nbytes):
+        results.append((name, frames / elapsed, nbytes / frames))
+
+    # luma: every display() converts and sends the whole frame
+    from luma.core.interface.serial import spi
+    from luma.lcd.device import st7789
+    serial = spi(port=0, device=0, gpio_DC=24, gpio_RST=25, spi_speed_hz=80000000)
+    sent = [0]
+    send = serial.data
+
+    def counted(buf):
+        sent[0] += len(buf)
+        send(buf)
+
+    device = st7789(serial, width=width, height=height, rotate=0)
+    serial.data = counted
+    start = time.perf_counter()
+    for i in range(frames):
+        image.putpixel((160, 120), (i & 0xFF, 0, 0))
+        device.display(image)
+    report("luma full frame", time.perf_counter() - start, sent[0])
+    serial.cleanup()
+
+    # spidev: the same frames, already converted to 565, straight to SPI
+    GPIO.setmode(GPIO.BCM)
+    panel = ST7789()
+    frame = Frame565(width, height)
+    frame.pixels[:] = rgb_to_565(np.asarray(image))
+    panel.bytes_written = 0
+    start = time.perf_counter()
+    for i in range(frames):
+        frame.pixels[120, 160] = i
+        panel.blit_buffer(frame.pixels, 0, 0, width, height)
+    report("spidev full frame", time.perf_counter() - start, panel.bytes_written)
+
+    # spidev + dirty rectangles: a running timer
+    screen = DirtyRectDisplay(panel, width, height)
+    atlas = DigitAtlas(_bench_font(28), ((0, 255, 0),))
+    frame = Frame565(width, height)
+    screen.display(frame)
+    panel.bytes_written = 0
+    start = time.perf_counter()
+    for i in range(frames):
+        text = "{:6.1f}".format(i * 0.1)
+        atlas.draw_565(frame, text, (width - atlas.width(text)) // 2, (height - atlas.height) // 2, (0, 255, 0))
+        screen.display(frame)
+    report("spidev dirty timer", time.perf_counter() - start, panel.bytes_written)
+    panel.close()
+    GPIO.cleanup()
+
+    for name, fps, nbytes in results:
+        print(f"{name:20s} {fps:7.1f} fps  {nbytes:9.0f} bytes/frame")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+    else:
+        print("Usage: python3 st7789spi.py bench [FRAMES]")
+        sys.exit(1)
@@ -0,0 +1,154 @@
+"""
+Rolling solve statistics for RasPiCube
+
+Keeps ao5, ao12, ao50, ao100 and ao1000 up to date as solves are appended,
+so the results screen never has to re-sort the whole history.
+
+Every window is an order-statistic window: the last N times in arrival order
+plus the same times kept sorted. Appending a solve is a bisect (O(log N)) and
+a couple of O(1) updates to the trimmed sums, instead of sorting N times.
+
+Trimming follows the usual WCA/csTimer convention: ceil(5%) of the window is
+dropped from each end, which is exactly "best and worst" for ao5 and ao12.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+# Averages shown/logged by the timer
+AVERAGE_SIZES = (5, 12, 50, 100, 1000)
+
+# Times are kept as integer microseconds so the running sums never drift
+_SCALE = 1000000
+
+
+def trim_count(size):
+    """Number of solves dropped from EACH end of an aoN (ceil of 5%)"""
+    return max(1, -(-size // 20))
+
+
+def to_units(seconds):
+    """Convert a time in seconds to the integer units used internally"""
+    return int(round(seconds * _SCALE))
+
+
+class RollingAverage:
+    """Trimmed average of the last `size` solves, updated in O(log size)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.trim = trim_count(size)
+        self.best = None
+        self.reset()
+
+    def reset(self):
+        """Forget every solve (and the best average)"""
+        self._window = deque()   # arrival order
+        self._sorted = []        # same values, sorted
+        self._total = 0
+        self._low = 0            # sum of the `trim` smallest values
+        self._high = 0           # sum of the `trim` largest values
+        self.best = None
+
+    def __len__(self):
+        return len(self._window)
+
+    def push(self, value):
+        """Add one time (integer units) and return the current average"""
+        window = self._window
+        ordered = self._sorted
+        size, trim = self.size, self.trim
+
+        window.append(value)
+        self._total += value
+
+        if len(window) <= size:
+            ordered.insert(bisect_right(ordered, value), value)
+            if len(window) < size:
+                return None
+            # Window just filled up: compute the trimmed sums once
+            self._low = sum(ordered[:trim])
+            self._high = sum(ordered[-trim:])
+        else:
+            self._replace(window.popleft(), value)
+
+        avg = self.current_units()
+        if self.best is None or avg < self.best:
+            self.best = avg
+        return avg
+
+    def _replace(self, old, new):
+        """Swap `old` for `new` in a full window, keeping the trimmed sums"""
+        ordered = self._sorted
+        size, trim = self.size, self.trim
+        self._total -= old
+
+        # Remove the old value (ordered has `size` items before this)
+        i = bisect_left(ordered, old)
+        if i < trim:
+            self._low += ordered[trim] - old
+        if i >= size - trim:
+            self._high += ordered[size - trim - 1] - old
+        del ordered[i]
+
+        # Insert the new value (ordered has `size - 1` items before this)
+        j = bisect_right(ordered, new)
+        if j < trim:
+            self._low += new - ordered[trim - 1]
+        if j >= size - trim:
+            self._high += new - ordered[size - 1 - trim]
+        ordered.insert(j, new)
+
+    def current_units(self):
+        """Current trimmed average in integer units, or None"""
+        if len(self._window) < self.size:
+            return None
+        return (self._total - self._low - self._high) / (self.size - 2 * self.trim)
+
+
+class SolveStats:
+    """Every tracked average plus the best of each over the whole history"""
+
+    def __init__(self, sizes=AVERAGE_SIZES):
+        self.averages = {size: RollingAverage(size) for size in sizes}
+        self.count = 0
+        self.best_single = None
+
+    def reset(self):
+        """Clear all statistics (used when the history is cleared)"""
+        for avg in self.averages.values():
+            avg.reset()
+        self.count = 0
+        self.best_single = None
+
+    def add(self, seconds):
+        """Record one solve time in seconds"""
+        value = to_units(seconds)
+        self.count += 1
+        if self.best_single is None or value < self.best_single:
+            self.best_single = value
+        for avg in self.averages.values():
+            avg.push(value)
+
+    def extend(self, entries):
+        """Replay a saved history (list of {"time": ...} dicts)"""
+        self.extend_times(entry["time"] for entry in entries)
+
+    def extend_times(self, times):
+        """Replay an iterable of solve times in seconds"""
+        for seconds in times:
+            self.add(seconds)
+
+    def average(self, size):
+        """Current aoN in seconds, or None if there aren't enough solves"""
+        value = self.averages[size].current_units()
+        return None if value is None else value / _SCALE
+
+    def best_average(self, size):
+        """Best aoN ever seen in this history, in seconds, or None"""
+        value = self.averages[size].best
+        return None if value is None else value / _SCALE
+
+    def best(self):
+        """Best single in seconds, or None"""
+        return None if self.best_single is None else self.best_single / _SCALE
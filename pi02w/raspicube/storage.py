@@ -0,0 +1,516 @@
+"""
+Solve history storage for RasPiCube
+
+Three on-disk formats are supported:
+
+- JsonStore: the original pretty-printed cube_times.json, rewritten in full
+  on every save (kept for compatibility)
+- JsonLinesStore: an append-only JSON Lines log, one solve per line. Each
+  save appends and fsyncs a single line, so save latency stays constant no
+  matter how long the history gets. An existing cube_times.json is migrated
+  on first run.
+- BinaryStore: fixed-width 40-byte records (time in us, unix timestamp and
+  the scramble packed one byte per move). The file is memory-mapped, so
+  loading is near-instant and solve N is an O(1) lookup. An existing JSON
+  or JSON Lines history is converted on first run; if that fails, the store
+  keeps using the old file and tries again on the next start.
+
+Run `python3 storage.py convert <cube_times.json|.jsonl> <cube_times.bin>`
+to convert an existing history to the binary format.
+"""
+
+import json
+import os
+import logging
+import mmap
+import struct
+import sys
+import time
+
+logger = logging.getLogger("raspicube")
+
+
+def _replace_file(src, dst):
+    """Atomically replace dst with src"""
+    if os.name == 'nt':  # Windows
+        if os.path.exists(dst):
+            os.remove(dst)
+    os.rename(src, dst)
+
+
+def _remove_quietly(path):
+    """Remove a file, ignoring errors"""
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def read_json_history(path):
+    """Read a legacy cube_times.json file, backing it up if it is corrupted"""
+    try:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        else:
+            logger.warning(f"⚠️ No existing results file found at {path}")
+            return []
+    except json.JSONDecodeError as e:
+        logger.warning(f"⚠️ Error reading results file: Invalid JSON format - {e}")
+        # Backup corrupted file
+        if os.path.exists(path):
+            backup = f"{path}.bak"
+            try:
+                os.rename(path, backup)
+                logger.info(f"📦 Corrupted file backed up to {backup}")
+            except OSError as e:
+                logger.error(f"❌ Failed to backup corrupted file: {e}")
+        return []
+    except OSError as e:
+        logger.warning(f"⚠️ Error accessing results file: {e}")
+        return []
+    except Exception as e:
+        logger.warning(f"⚠️ Unexpected error loading results: {e}")
+        return []
+
+
+class JsonStore:
+    """Original format: the whole history rewritten as one JSON list"""
+
+    def __init__(self, path):
+        self.path = path
+        self._times = []
+
+    def load(self):
+        """Load the full history"""
+        self._times = read_json_history(self.path)
+        return list(self._times)
+
+    def append(self, entry):
+        """Add one solve and rewrite the file"""
+        self.write([entry])
+
+    def write(self, entries):
+        """Add several solves with a single rewrite"""
+        self._times.extend(entries)
+        self._write(self._times)
+
+    def sync(self):
+        pass
+
+    def clear(self):
+        """Clear all solve times"""
+        self._times = []
+        try:
+            with open(self.path, "w") as f:
+                json.dump([], f)
+        except Exception as e:
+            logger.error(f"❌ Error clearing times: {e}")
+
+    def close(self):
+        pass
+
+    def _write(self, times):
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, "w") as f:
+                json.dump(times, f, indent=2)
+            _replace_file(temp_file, self.path)
+        except Exception as e:
+            logger.error(f"❌ Error saving times: {e}")
+            _remove_quietly(temp_file)
+
+
+class JsonLinesStore:
+    """Append-only JSON Lines log, one fsynced line per solve"""
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._file = None
+
+    def load(self):
+        """Replay the log (migrating the legacy JSON file if needed)"""
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            legacy_times = self._migrate()
+            if not os.path.exists(self.path):
+                # Migration failed; keep running on the legacy data
+                return legacy_times
+
+        times = []
+        if not os.path.exists(self.path):
+            logger.warning(f"⚠️ No existing solve log found at {self.path}")
+            return times
+
+        good_end = 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Torn write from a power cut: drop the partial record
+                        logger.warning("⚠️ Dropping incomplete last record in solve log")
+                        break
+                    stripped = line.strip()
+                    if stripped:
+                        try:
+                            times.append(json.loads(stripped))
+                        except ValueError as e:
+                            logger.warning(f"⚠️ Skipping bad line in solve log: {e}")
+                    good_end += len(line)
+            if good_end != os.path.getsize(self.path):
+                # Make sure the next append starts on a fresh line
+                with open(self.path, "r+b") as f:
+                    f.truncate(good_end)
+        except OSError as e:
+            logger.warning(f"⚠️ Error accessing solve log: {e}")
+        return times
+
+    def append(self, entry):
+        """Append one solve and fsync it"""
+        self.write([entry])
+        self.sync()
+
+    def write(self, entries):
+        """Append solves to the log (flushed to the OS, not yet fsynced)"""
+        try:
+            f = self._open()
+            f.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+            f.flush()
+        except Exception as e:
+            logger.error(f"❌ Error saving solve: {e}")
+            self.close()
+
+    def sync(self):
+        """fsync everything written so far"""
+        if self._file is not None:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.error(f"❌ Error syncing solve log: {e}")
+
+    def clear(self):
+        """Clear all solve times"""
+        self.close()
+        try:
+            with open(self.path, "w") as f:
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"❌ Error clearing times: {e}")
+
+    def close(self):
+        """Close the log file handle"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        return self._file
+
+    def _migrate(self):
+        """Convert the legacy cube_times.json into the log, once"""
+        times = read_json_history(self.legacy_path)
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, "w") as f:
+                for entry in times:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            _replace_file(temp_file, self.path)
+            if os.path.exists(self.legacy_path):
+                os.rename(self.legacy_path, f"{self.legacy_path}.migrated")
+            logger.info(f"📦 Migrated {len(times)} solves from {self.legacy_path} to {self.path}")
+        except OSError as e:
+            logger.error(f"❌ Failed to migrate results file: {e}")
+            _remove_quietly(temp_file)
+        return times
+
+
+# Binary format
+# header: magic, version, record size (little endian, padded to 16 bytes)
+# record: time (uint32 us, up to ~71 minutes), timestamp (uint32 unix seconds),
+#         move count (uint8), moves (31 bytes, one code per move, 0 = padding)
+BINARY_MAGIC = b"RPCB"
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<4sHH8x")
+_RECORD = struct.Struct("<IIB31s")
+MAX_SCRAMBLE_MOVES = 31
+MAX_TIME_US = 0xFFFFFFFF
+
+# Move codes 1..18, in face-major order: U U' U2 D D' D2 ...
+MOVES = [f + m for f in "UDLRFB" for m in ("", "'", "2")]
+_MOVE_CODES = {move: i + 1 for i, move in enumerate(MOVES)}
+
+
+def pack_scramble(scramble):
+    """Pack a scramble string into (move count, 31-byte move codes)"""
+    moves = scramble.split()
+    if len(moves) > MAX_SCRAMBLE_MOVES:
+        raise ValueError(f"Scramble too long for binary record: {len(moves)} moves")
+    try:
+        codes = bytes(_MOVE_CODES[m] for m in moves)
+    except KeyError as e:
+        raise ValueError(f"Unknown move in scramble: {e}")
+    return len(codes), codes
+
+
+def unpack_scramble(count, codes):
+    """Inverse of pack_scramble"""
+    return " ".join(MOVES[c - 1] for c in codes[:count])
+
+
+def _saturate(value, limit, name):
+    """Clamp a field to 0..limit, warning when it doesn't fit"""
+    if 0 <= value <= limit:
+        return value
+    logger.warning(f"⚠️ {name} {value} does not fit a binary record, storing {min(max(value, 0), limit)}")
+    return min(max(value, 0), limit)
+
+
+def encode_record(entry):
+    """
+    Encode a {"time", "scramble", "timestamp"} dict as one binary record.
+    Times beyond MAX_TIME_US (~71 minutes) are saturated rather than
+    rejected, so a long solve is still saved; bad scrambles raise ValueError.
+    """
+    count, codes = pack_scramble(entry.get("scramble", ""))
+    return _RECORD.pack(
+        _saturate(int(round(entry["time"] * 1000000)), MAX_TIME_US, "Solve time (us)"),
+        _saturate(int(entry.get("timestamp", 0)), 0xFFFFFFFF, "Timestamp"),
+        count,
+        codes,
+    )
+
+
+def decode_record(buf, offset=0):
+    """Decode one binary record back into a solve dict"""
+    us, timestamp, count, codes = _RECORD.unpack_from(buf, offset)
+    return {"time": us / 1000000, "scramble": unpack_scramble(count, codes), "timestamp": timestamp}
+
+
+def iter_times(history):
+    """Iterate over the solve times (seconds) of any loaded history"""
+    if isinstance(history, BinarySolveView):
+        return history.iter_times()
+    return (entry["time"] for entry in history)
+
+
+class BinarySolveView:
+    """
+    Read-only sequence of solves backed by a memory-mapped binary file.
+    Records are decoded on access; solves appended this session are kept
+    in a small in-memory tail so the map never has to be rebuilt.
+    """
+
+    def __init__(self, path):
+        self._mm = None
+        self._mapped = 0
+        self._tail = []
+        size = os.path.getsize(path)
+        count = (size - _HEADER.size) // _RECORD.size if size > _HEADER.size else 0
+        if count:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = count
+
+    def __len__(self):
+        return self._mapped + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("solve index out of range")
+        if index < self._mapped:
+            return decode_record(self._mm, _HEADER.size + index * _RECORD.size)
+        return self._tail[index - self._mapped]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, entry):
+        """Track a solve that has been written after the file was mapped"""
+        self._tail.append(entry)
+
+    def iter_times(self):
+        """Iterate over just the times (seconds), without decoding scrambles"""
+        if self._mapped:
+            view = memoryview(self._mm)[_HEADER.size:_HEADER.size + self._mapped * _RECORD.size]
+            try:
+                for us, _, _, _ in _RECORD.iter_unpack(view):
+                    yield us / 1000000
+            finally:
+                view.release()
+        for entry in self._tail:
+            yield entry["time"]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class BinaryStore:
+    """Fixed-width binary records, memory-mapped for reading"""
+
+    def __init__(self, path, legacy_paths=()):
+        self.path = path
+        self.legacy_paths = legacy_paths
+        self._file = None
+        self._view = None
+        # Store for the legacy file when conversion failed this run
+        self._fallback = None
+
+    def load(self):
+        """Map the history file (converting an older format if needed)"""
+        if not os.path.exists(self.path):
+            for legacy in self.legacy_paths:
+                if os.path.exists(legacy):
+                    try:
+                        count = convert_to_binary(legacy, self.path)
+                        logger.info(f"📦 Converted {count} solves from {legacy} to {self.path}")
+                    except (OSError, ValueError) as e:
+                        # No .bin is left behind, so the conversion is retried next start
+                        logger.error(f"❌ Failed to convert {legacy}, keeping it for now: {e}")
+                        self._fallback = legacy_store(legacy)
+                        return self._fallback.load()
+                    break
+        try:
+            if not os.path.exists(self.path):
+                logger.warning(f"⚠️ No existing solve file found at {self.path}")
+                self._create()
+            self._check_file()
+            self._view = BinarySolveView(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Error accessing solve file: {e}")
+            return []
+        return self._view
+
+    def append(self, entry):
+        """Append one record and fsync it"""
+        self.write([entry])
+        self.sync()
+
+    def write(self, entries):
+        """Append records (flushed to the OS, not yet fsynced)"""
+        if self._fallback is not None:
+            return self._fallback.write(entries)
+        try:
+            f = self._open()
+            f.write(b"".join(encode_record(entry) for entry in entries))
+            f.flush()
+        except Exception as e:
+            logger.error(f"❌ Error saving solve: {e}")
+            self._close_file()
+
+    def sync(self):
+        """fsync everything written so far"""
+        if self._fallback is not None:
+            return self._fallback.sync()
+        if self._file is not None:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.error(f"❌ Error syncing solve file: {e}")
+
+    def clear(self):
+        """Clear all solve times"""
+        if self._fallback is not None:
+            return self._fallback.clear()
+        self.close()
+        try:
+            self._create()
+        except Exception as e:
+            logger.error(f"❌ Error clearing times: {e}")
+
+    def close(self):
+        """Close the append handle and the memory map"""
+        if self._fallback is not None:
+            self._fallback.close()
+        self._close_file()
+        if self._view is not None:
+            self._view.close()
+            self._view = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _create(self):
+        with open(self.path, "wb") as f:
+            f.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, _RECORD.size))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _check_file(self):
+        """Validate the header and drop a partially written last record"""
+        with open(self.path, "r+b") as f:
+            magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != BINARY_MAGIC or version != BINARY_VERSION or record_size != _RECORD.size:
+                raise ValueError(f"{self.path} is not a v{BINARY_VERSION} RasPiCube solve file")
+            size = os.fstat(f.fileno()).st_size
+            extra = (size - _HEADER.size) % _RECORD.size
+            if extra:
+                logger.warning("⚠️ Dropping incomplete last record in solve file")
+                f.truncate(size - extra)
+
+
+def legacy_store(path):
+    """The store class that reads and writes a .json or .jsonl history"""
+    if path.endswith(".jsonl"):
+        return JsonLinesStore(path)
+    return JsonStore(path)
+
+
+def read_history(path):
+    """Read a .json or .jsonl history file into a list of solves"""
+    if path.endswith(".jsonl"):
+        return JsonLinesStore(path).load()
+    return read_json_history(path)
+
+
+def convert_to_binary(src, dst):
+    """Convert a JSON/JSON Lines history into the binary format"""
+    times = read_history(src)
+    temp_file = f"{dst}.tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            f.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, _RECORD.size))
+            for entry in times:
+                f.write(encode_record(entry))
+            f.flush()
+            os.fsync(f.fileno())
+        _replace_file(temp_file, dst)
+    except Exception:
+        _remove_quietly(temp_file)
+        raise
+    return len(times)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("Usage: python3 storage.py convert <cube_times.json|.jsonl> <cube_times.bin>")
+        sys.exit(1)
+    start = time.perf_counter()
+    n = convert_to_binary(sys.argv[2], sys.argv[3])
+    print(f"Converted {n} solves in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Timing core for RasPiCube
+
+All solve timing goes through now_ns(): CLOCK_MONOTONIC_RAW where the
+platform has it (never stepped or slewed by NTP), otherwise perf_counter_ns.
+The Pi Zero 2 W has no RTC, so the wall clock (time.time()) can jump by
+seconds when NTP syncs after boot, possibly in the middle of a solve.
+
+Button edges are stamped with now_ns() in the GPIO callback, and a solve is
+exactly stop edge - start edge, kept as integer microseconds from there on.
+Wall-clock time is only used for the "when was this solve" timestamp.
+
+    python3 timing.py bench [SECONDS]    # drift/jitter vs the old time.time() ticks
+"""
+
+import sys
+import time
+import statistics
+
+if hasattr(time, "CLOCK_MONOTONIC_RAW"):
+    CLOCK_NAME = "CLOCK_MONOTONIC_RAW"
+
+    def now_ns():
+        """Monotonic time in nanoseconds (the one clock used for solves)"""
+        return time.clock_gettime_ns(time.CLOCK_MONOTONIC_RAW)
+else:
+    CLOCK_NAME = "perf_counter"
+    now_ns = time.perf_counter_ns
+
+
+def ticks_ms():
+    """Monotonic milliseconds (like Pico's time.ticks_ms())"""
+    return now_ns() // 1000000
+
+
+def elapsed_us(start_ns, stop_ns):
+    """Whole microseconds between two now_ns() instants"""
+    return (stop_ns - start_ns) // 1000
+
+
+def us_to_seconds(us):
+    return us / 1000000
+
+
+def format_time(seconds, decimals=3):
+    """Solve time for display, e.g. 12.345"""
+    return f"{seconds:.{decimals}f}"
+
+
+def _old_ticks_ms():
+    """The previous clock: truncated wall-clock milliseconds"""
+    return int(time.time() * 1000)
+
+
+def _resolution_ns(clock, samples=20000):
+    """Smallest non-zero step seen between consecutive reads of `clock`"""
+    best = None
+    last = clock()
+    for _ in range(samples):
+        now = clock()
+        if now != last:
+            step = now - last
+            best = step if best is None else min(best, step)
+            last = now
+    return best
+
+
+def benchmark(seconds=10.0, interval_ms=10):
+    """
+    Compare the old wall-clock ticks with now_ns():
+    - resolution: smallest step each clock can report
+    - jitter: spread of repeated `interval_ms` sleeps as measured by each clock
+    - drift: how far the wall clock moved relative to the monotonic clock
+    """
+    print(f"Monotonic clock: {CLOCK_NAME}")
+    old_res = _resolution_ns(lambda: _old_ticks_ms() * 1000000)
+    new_res = _resolution_ns(now_ns)
+    print(f"Resolution: old {old_res / 1e6:.3f} ms, new {new_res / 1e3:.3f} us")
+
+    old_d, new_d = [], []
+    wall_start, mono_start = time.time_ns(), now_ns()
+    end = mono_start + int(seconds * 1e9)
+    while now_ns() < end:
+        o0, n0 = _old_ticks_ms(), now_ns()
+        time.sleep(interval_ms / 1000)
+        n1, o1 = now_ns(), _old_ticks_ms()
+        old_d.append(o1 - o0)
+        new_d.append((n1 - n0) / 1e6)
+    wall_elapsed, mono_elapsed = time.time_ns() - wall_start, now_ns() - mono_start
+
+    for name, d in (("old", old_d), ("new", new_d)):
+        print(f"Jitter ({name}): {len(d)} x {interval_ms} ms sleeps, "
+              f"mean {statistics.mean(d):.3f} ms, stdev {statistics.pstdev(d):.3f} ms, "
+              f"min {min(d):.3f} ms, max {max(d):.3f} ms")
+    errors = [abs(o - n) for o, n in zip(old_d, new_d)]
+    print(f"Old clock error per interval: mean {statistics.mean(errors):.3f} ms, max {max(errors):.3f} ms")
+    drift_ms = (wall_elapsed - mono_elapsed) / 1e6
+    print(f"Drift over {mono_elapsed / 1e9:.1f} s: wall clock {drift_ms:+.3f} ms "
+          f"({drift_ms * 1e3 / (mono_elapsed / 1e9):+.1f} ppm)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(float(sys.argv[2]) if len(sys.argv) > 2 else 10.0)
+    else:
+        print("Usage: python3 timing.py bench [SECONDS]")
+        sys.exit(1)
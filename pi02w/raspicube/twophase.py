@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Random-state 3x3 scrambles for RasPiCube (Kociemba two-phase)
+
+generate_scramble() picks a uniformly random cube state and returns the
+inverse of a two-phase solution for it, which is what WCA scramblers do,
+instead of 20 random moves.
+
+Phase 1 brings the cube into <U, D, R2, F2, L2, B2> (orientations fixed and
+the E-slice edges in the E slice), phase 2 solves it using only those moves.
+Both phases are IDA* searches over small coordinates with move tables and
+pruning tables. Each iteration is expanded a level at a time with NumPy: all
+nodes of a level take all their moves at once, and the pruning tables are
+looked up for the whole level in one go, instead of one Python call per node.
+
+The tables (~6 MB) are built once with NumPy and written to TABLE_DIR (next
+to this file, so the installer and the service see the same tables whoever
+runs them) as raw arrays. At runtime they are memory-mapped read-only, so
+startup is instant, nothing is copied into the Python heap and the page
+cache shares them.
+
+Search time varies a lot from state to state. The scramble screen is not
+meant to wait for it: scrambles are served from ScrambleProvider's queue
+(scrambles.py), which a worker process refills in the background, with no
+latency. Only when that queue is empty is a scramble generated inline, with
+SCRAMBLE_TIME_LIMIT_S as a cap: past it the caller gets ScrambleTimeout and
+falls back to random moves. The search is not fast enough to always finish
+within that cap, least of all on a Pi Zero 2 W.
+
+    python3 twophase.py build        # build the tables (one-off, a few minutes on a Pi Zero 2 W)
+    python3 twophase.py bench [N]    # time N scrambles, and how often an inline one would fall back
+"""
+
+import os
+import sys
+import mmap
+import time
+import random
+import logging
+from array import array
+from itertools import permutations, combinations
+from math import comb, factorial
+
+import numpy as np
+
+logger = logging.getLogger("raspicube")
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+TABLE_VERSION = 1
+
+# Longest scramble we accept; the search stops at the first solution this short
+# (with the phase 2 cap below, scrambles come out at ~22 moves on average)
+MAX_SCRAMBLE_LENGTH = 30
+
+# Inline scrambles (the queue is empty) give up after this long; the caller
+# then falls back to random moves
+SCRAMBLE_TIME_LIMIT_S = 0.2
+
+# Deep phase 2 searches are slow in Python; it is much cheaper to try more
+# phase 1 solutions and only accept ones that finish in a few phase 2 moves
+PHASE2_MAX_DEPTH = 12
+
+# --- Cubie level model ---
+# Corners: URF UFL ULB UBR DFR DLF DBL DRB
+# Edges:   UR UF UL UB DR DF DL DB FR FL BL BR
+# A cube is (cp, co, ep, eo). Applying move M to state S gives
+#   cp[i] = S.cp[M.cp[i]], co[i] = S.co[M.cp[i]] + M.co[i] (mod 3), same for edges.
+
+FACES = "URFDLB"
+POWERS = ("", "2", "'")
+
+_BASIC_MOVES = {
+    "U": ([3, 0, 1, 2, 4, 5, 6, 7], [0] * 8,
+          [3, 0, 1, 2, 4, 5, 6, 7, 8, 9, 10, 11], [0] * 12),
+    "R": ([4, 1, 2, 0, 7, 5, 6, 3], [2, 0, 0, 1, 1, 0, 0, 2],
+          [8, 1, 2, 3, 11, 5, 6, 7, 4, 9, 10, 0], [0] * 12),
+    "F": ([1, 5, 2, 3, 0, 4, 6, 7], [1, 2, 0, 0, 2, 1, 0, 0],
+          [0, 9, 2, 3, 4, 8, 6, 7, 1, 5, 10, 11], [0, 1, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0]),
+    "D": ([0, 1, 2, 3, 5, 6, 7, 4], [0] * 8,
+          [0, 1, 2, 3, 5, 6, 7, 4, 8, 9, 10, 11], [0] * 12),
+    "L": ([0, 2, 6, 3, 4, 1, 5, 7], [0, 1, 2, 0, 0, 2, 1, 0],
+          [0, 1, 10, 3, 4, 5, 9, 7, 8, 2, 6, 11], [0] * 12),
+    "B": ([0, 1, 3, 7, 4, 5, 2, 6], [0, 0, 1, 2, 0, 0, 2, 1],
+          [0, 1, 2, 11, 4, 5, 6, 10, 8, 9, 3, 7], [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 1, 1]),
+}
+
+SOLVED = (list(range(8)), [0] * 8, list(range(12)), [0] * 12)
+
+
+def multiply(a, b):
+    """Cube a followed by cube b"""
+    acp, aco, aep, aeo = a
+    bcp, bco, bep, beo = b
+    return (
+        [acp[bcp[i]] for i in range(8)],
+        [(aco[bcp[i]] + bco[i]) % 3 for i in range(8)],
+        [aep[bep[i]] for i in range(12)],
+        [(aeo[bep[i]] + beo[i]) % 2 for i in range(12)],
+    )
+
+
+def _build_moves():
+    """All 18 moves as cubes, index = 3 * face + (power - 1)"""
+    moves = []
+    for face in FACES:
+        basic = _BASIC_MOVES[face]
+        cube = basic
+        for _ in range(3):
+            moves.append(cube)
+            cube = multiply(cube, basic)
+    return moves
+
+
+MOVE_CUBES = _build_moves()
+MOVE_NAMES = [face + power for face in FACES for power in POWERS]
+N_MOVES = 18
+
+# Phase 2 moves: U, U2, U', R2, F2, D, D2, D', L2, B2
+PHASE2_MOVES = [0, 1, 2, 4, 7, 9, 10, 11, 13, 16]
+N_MOVES2 = len(PHASE2_MOVES)
+_PHASE2_SET = frozenset(PHASE2_MOVES)
+
+
+def _allowed_after(last_face, candidates):
+    """Moves worth trying after a turn of last_face (no same face, opposite faces in one order)"""
+    return tuple((k, m, m // 3) for k, m in enumerate(candidates)
+                 if m // 3 != last_face and m // 3 != last_face - 3)
+
+
+def _allowed_mask(candidates):
+    """Row last_face + 1 (-1 = no previous move): which candidates may follow"""
+    mask = np.zeros((7, len(candidates)), dtype=bool)
+    for f in range(-1, 6):
+        for k, _, _ in _allowed_after(f, candidates):
+            mask[f + 1, k] = True
+    return mask
+
+
+_NEXT1 = _allowed_mask(range(N_MOVES))
+_NEXT2 = _allowed_mask(PHASE2_MOVES)
+# face + 1 of each candidate, to index the masks with after it
+_NEXT1_ROW = np.array([m // 3 + 1 for m in range(N_MOVES)])
+_NEXT2_ROW = np.array([m // 3 + 1 for m in PHASE2_MOVES])
+
+
+# --- Coordinates ---
+N_TWIST = 2187      # 3^7 corner orientations
+N_FLIP = 2048       # 2^11 edge orientations
+N_SLICE = 495       # C(12, 4) positions of the E-slice edges
+N_CPERM = 40320     # 8! corner permutations
+N_EPERM = 40320     # 8! U/D edge permutations (phase 2)
+N_SPERM = 24        # 4! E-slice edge permutations (phase 2)
+
+
+def twist_coord(co):
+    t = 0
+    for i in range(7):
+        t = 3 * t + co[i]
+    return t
+
+
+def flip_coord(eo):
+    f = 0
+    for i in range(11):
+        f = 2 * f + eo[i]
+    return f
+
+
+def slice_coord(ep):
+    """Which 4 positions hold E-slice edges (0 when solved)"""
+    a = 0
+    x = 0
+    for j in range(11, -1, -1):
+        if ep[j] >= 8:
+            x += 1
+            a += comb(11 - j, x)
+    return a
+
+
+def perm_rank(p):
+    """Lexicographic rank of a permutation of 0..n-1"""
+    n = len(p)
+    r = 0
+    for i in range(n):
+        pi = p[i]
+        smaller = 0
+        for j in range(i + 1, n):
+            if p[j] < pi:
+                smaller += 1
+        r = r * (n - i) + smaller
+    return r
+
+
+def _decode(value, base, n):
+    digits = [0] * n
+    for i in range(n - 1, -1, -1):
+        value, digits[i] = divmod(value, base)
+    return digits
+
+
+# --- Table building (NumPy, one-off) ---
+_TABLES = {
+    # name: (dtype, entries)
+    "twist_move": (np.uint16, N_TWIST * N_MOVES),
+    "flip_move": (np.uint16, N_FLIP * N_MOVES),
+    "slice_move": (np.uint16, N_SLICE * N_MOVES),
+    "cperm_move": (np.uint16, N_CPERM * N_MOVES2),
+    "eperm_move": (np.uint16, N_EPERM * N_MOVES2),
+    "sperm_move": (np.uint16, N_SPERM * N_MOVES2),
+    "twist_slice_prune": (np.uint8, N_TWIST * N_SLICE),
+    "flip_slice_prune": (np.uint8, N_FLIP * N_SLICE),
+    "cperm_sperm_prune": (np.uint8, N_CPERM * N_SPERM),
+    "eperm_sperm_prune": (np.uint8, N_EPERM * N_SPERM),
+}
+
+
+def _table_path(table_dir, name):
+    return os.path.join(table_dir, f"v{TABLE_VERSION}", name + ".bin")
+
+
+def _orientation_move_table(n, digits, base, coord_fn, perm_index, ori_index):
+    table = array("H", bytes(2 * n * N_MOVES))
+    for value in range(n):
+        ori = _decode(value, base, digits)
+        ori.append((-sum(ori)) % base)
+        for m, cube in enumerate(MOVE_CUBES):
+            perm = cube[perm_index]
+            mori = cube[ori_index]
+            table[value * N_MOVES + m] = coord_fn(
+                [(ori[perm[i]] + mori[i]) % base for i in range(digits + 1)])
+    return table
+
+
+def _slice_move_table():
+    table = array("H", bytes(2 * N_SLICE * N_MOVES))
+    for positions in combinations(range(12), 4):
+        ep = [0] * 12
+        for p in positions:
+            ep[p] = 8
+        value = slice_coord(ep)
+        for m, (_, _, mep, _) in enumerate(MOVE_CUBES):
+            table[value * N_MOVES + m] = slice_coord([ep[mep[i]] for i in range(12)])
+    return table
+
+
+def _perm_move_table(n, cube_index, positions):
+    """Move table (phase 2 moves) for the permutation of the pieces in `positions`"""
+    table = array("H", bytes(2 * factorial(n) * N_MOVES2))
+    base = positions[0]
+    for value, p in enumerate(permutations(range(n))):
+        for k, m in enumerate(PHASE2_MOVES):
+            mperm = MOVE_CUBES[m][cube_index]
+            table[value * N_MOVES2 + k] = perm_rank([p[mperm[i] - base] for i in positions])
+    return table
+
+
+def _prune_table(move_a, n_a, move_b, n_b, n_moves):
+    """Breadth-first distance table over the product coordinate a * n_b + b"""
+    ma = np.frombuffer(move_a, dtype=np.uint16).reshape(n_a, n_moves).astype(np.int32)
+    mb = np.frombuffer(move_b, dtype=np.uint16).reshape(n_b, n_moves).astype(np.int32)
+    dist = np.full(n_a * n_b, 255, dtype=np.uint8)
+    dist[0] = 0
+    frontier = np.zeros(1, dtype=np.int32)
+    depth = 0
+    while frontier.size:
+        a, b = np.divmod(frontier, n_b)
+        nxt = (ma[a] * n_b + mb[b]).ravel()
+        depth += 1
+        dist[nxt[dist[nxt] == 255]] = depth
+        frontier = np.flatnonzero(dist == depth).astype(np.int32)
+    return dist.tobytes()
+
+
+def build_tables(table_dir=TABLE_DIR):
+    """Generate every move/pruning table and write them to table_dir"""
+    start = time.perf_counter()
+    tables = {}
+    tables["twist_move"] = _orientation_move_table(N_TWIST, 7, 3, twist_coord, 0, 1)
+    tables["flip_move"] = _orientation_move_table(N_FLIP, 11, 2, flip_coord, 2, 3)
+    tables["slice_move"] = _slice_move_table()
+    logger.info(f"🧮 Phase 1 move tables done ({time.perf_counter() - start:.1f}s)")
+    tables["cperm_move"] = _perm_move_table(8, 0, range(8))
+    tables["eperm_move"] = _perm_move_table(8, 2, range(8))
+    tables["sperm_move"] = _perm_move_table(4, 2, range(8, 12))
+    logger.info(f"🧮 Phase 2 move tables done ({time.perf_counter() - start:.1f}s)")
+
+    tables["twist_slice_prune"] = _prune_table(
+        tables["twist_move"], N_TWIST, tables["slice_move"], N_SLICE, N_MOVES)
+    tables["flip_slice_prune"] = _prune_table(
+        tables["flip_move"], N_FLIP, tables["slice_move"], N_SLICE, N_MOVES)
+    tables["cperm_sperm_prune"] = _prune_table(
+        tables["cperm_move"], N_CPERM, tables["sperm_move"], N_SPERM, N_MOVES2)
+    tables["eperm_sperm_prune"] = _prune_table(
+        tables["eperm_move"], N_EPERM, tables["sperm_move"], N_SPERM, N_MOVES2)
+    logger.info(f"🧮 Pruning tables done ({time.perf_counter() - start:.1f}s)")
+
+    os.makedirs(os.path.dirname(_table_path(table_dir, "x")), exist_ok=True)
+    for name, data in tables.items():
+        path = _table_path(table_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+    logger.info(f"✅ Scramble tables written to {table_dir}")
+
+
+class ScrambleTimeout(Exception):
+    """No scramble was found within the time limit"""
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+# --- Solver ---
+class TwoPhaseSolver:
+    """Two-phase solver over memory-mapped tables"""
+
+    def __init__(self, table_dir=TABLE_DIR):
+        self._maps = []
+        for name, (dtype, entries) in _TABLES.items():
+            path = _table_path(table_dir, name)
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mm)
+            if len(mm) != entries * np.dtype(dtype).itemsize:
+                self.close()
+                raise ValueError(f"Stale or corrupt scramble table: {path}")
+            setattr(self, name, np.frombuffer(mm, dtype=dtype))
+
+    @staticmethod
+    def tables_exist(table_dir=TABLE_DIR):
+        return all(os.path.exists(_table_path(table_dir, name)) for name in _TABLES)
+
+    def solve(self, cube, max_length=MAX_SCRAMBLE_LENGTH, phase2_depth=PHASE2_MAX_DEPTH, deadline=None):
+        """
+        Return a list of move indices solving `cube`, or None if there is no
+        solution within max_length or time.perf_counter() passes `deadline`
+        """
+        cp, co, ep, eo = cube
+        twist = twist_coord(co)
+        flip = flip_coord(eo)
+        slice_ = slice_coord(ep)
+        self._cube = cube
+        self._max_length = max_length
+        self._phase2_depth = phase2_depth
+        self._deadline = deadline
+        start = max(self.twist_slice_prune[twist * 495 + slice_],
+                    self.flip_slice_prune[flip * 495 + slice_])
+        root = np.array([twist]), np.array([flip]), np.array([slice_])
+        try:
+            for depth in range(start, max_length + 1):
+                for moves in self._search(root, depth, self._phase1_step, _NEXT1, _NEXT1_ROW, -1):
+                    if moves and moves[-1] in _PHASE2_SET:
+                        # Ending on a phase 2 move means a shorter phase 1 exists
+                        continue
+                    solution = self._start_phase2(moves)
+                    if solution is not None:
+                        return solution
+        except _SearchTimeout:
+            pass
+        return None
+
+    def _check_deadline(self):
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _SearchTimeout()
+
+    def _search(self, root, depth, step, next_mask, next_row, last_face):
+        """
+        One IDA* iteration, a level at a time over NumPy arrays: expand every
+        node still within `depth` by all its allowed moves at once, keeping
+        the children the pruning tables don't rule out. Nodes left after
+        `depth` moves are solved (both pruning distances are 0). Returns the
+        move lists that reach them.
+        """
+        coords = root
+        last = np.array([last_face + 1])
+        levels = []
+        for level in range(depth):
+            self._check_deadline()
+            parent, k = np.nonzero(next_mask[last])
+            coords, keep = step(coords, parent, k, depth - level)
+            parent = parent[keep]
+            k = k[keep]
+            if not parent.size:
+                return []
+            levels.append((parent, k))
+            last = next_row[k]
+        solutions = []
+        for leaf in range(len(levels[-1][0]) if levels else 1):
+            moves = []
+            for parent, k in reversed(levels):
+                moves.append(int(k[leaf]))
+                leaf = parent[leaf]
+            moves.reverse()
+            solutions.append(moves)
+        return solutions
+
+    def _phase1_step(self, coords, parent, m, togo):
+        twist, flip, slice_ = coords
+        t = self.twist_move[twist[parent] * N_MOVES + m].astype(np.intp)
+        s = self.slice_move[slice_[parent] * N_MOVES + m].astype(np.intp)
+        f = self.flip_move[flip[parent] * N_MOVES + m].astype(np.intp)
+        keep = np.flatnonzero((self.twist_slice_prune[t * N_SLICE + s] < togo)
+                              & (self.flip_slice_prune[f * N_SLICE + s] < togo))
+        return (t[keep], f[keep], s[keep]), keep
+
+    def _phase2_step(self, coords, parent, k, togo):
+        cperm, eperm, sperm = coords
+        c = self.cperm_move[cperm[parent] * N_MOVES2 + k].astype(np.intp)
+        e = self.eperm_move[eperm[parent] * N_MOVES2 + k].astype(np.intp)
+        s = self.sperm_move[sperm[parent] * N_MOVES2 + k].astype(np.intp)
+        keep = np.flatnonzero((self.cperm_sperm_prune[c * N_SPERM + s] < togo)
+                              & (self.eperm_sperm_prune[e * N_SPERM + s] < togo))
+        return (c[keep], e[keep], s[keep]), keep
+
+    def _start_phase2(self, phase1_moves):
+        cube = self._cube
+        for m in phase1_moves:
+            cube = multiply(cube, MOVE_CUBES[m])
+        cp, _, ep, _ = cube
+        cperm = perm_rank(cp)
+        eperm = perm_rank(ep[:8])
+        sperm = perm_rank([e - 8 for e in ep[8:]])
+        limit = min(self._max_length - len(phase1_moves), self._phase2_depth)
+        last_face = phase1_moves[-1] // 3 if phase1_moves else -1
+        dist = max(self.cperm_sperm_prune[cperm * 24 + sperm],
+                   self.eperm_sperm_prune[eperm * 24 + sperm])
+        root = np.array([cperm]), np.array([eperm]), np.array([sperm])
+        for depth in range(dist, limit + 1):
+            solutions = self._search(root, depth, self._phase2_step, _NEXT2, _NEXT2_ROW, last_face)
+            if solutions:
+                return list(phase1_moves) + [PHASE2_MOVES[k] for k in solutions[0]]
+        return None
+
+    def close(self):
+        for name in _TABLES:
+            # the arrays hold the mappings open
+            setattr(self, name, None)
+        for mm in self._maps:
+            mm.close()
+        self._maps = []
+
+
+def random_cube(rng=random):
+    """A uniformly random solvable cube state"""
+    while True:
+        cp = list(range(8))
+        ep = list(range(12))
+        rng.shuffle(cp)
+        rng.shuffle(ep)
+        if _parity(cp) == _parity(ep):
+            break
+    co = [rng.randrange(3) for _ in range(7)]
+    co.append((-sum(co)) % 3)
+    eo = [rng.randrange(2) for _ in range(11)]
+    eo.append(sum(eo) % 2)
+    return cp, co, ep, eo
+
+
+def _parity(p):
+    parity = 0
+    for i in range(len(p)):
+        for j in range(i + 1, len(p)):
+            if p[j] < p[i]:
+                parity ^= 1
+    return parity
+
+
+def invert_moves(moves):
+    """Inverse of a move sequence (reverse order, U <-> U')"""
+    return [3 * (m // 3) + 2 - (m % 3) for m in reversed(moves)]
+
+
+def format_moves(moves):
+    return " ".join(MOVE_NAMES[m] for m in moves)
+
+
+def parse_moves(text):
+    return [MOVE_NAMES.index(token) for token in text.split()]
+
+
+def apply_moves(cube, moves):
+    for m in moves:
+        cube = multiply(cube, MOVE_CUBES[m])
+    return cube
+
+
+_solver = None
+
+
+def get_solver(table_dir=TABLE_DIR):
+    """Shared solver instance (tables are mapped once per process)"""
+    global _solver
+    if _solver is None:
+        _solver = TwoPhaseSolver(table_dir)
+    return _solver
+
+
+def generate_scramble(rng=random, max_length=MAX_SCRAMBLE_LENGTH, time_limit=None):
+    """
+    Random-state scramble string, e.g. "R U2 F' ...". With `time_limit`
+    (seconds), raises ScrambleTimeout rather than take longer.
+    """
+    solver = get_solver()
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    while True:
+        solution = solver.solve(random_cube(rng), max_length, deadline=deadline)
+        if solution:
+            return format_moves(invert_moves(solution))
+        if deadline is not None and time.perf_counter() > deadline:
+            raise ScrambleTimeout(f"no scramble within {time_limit * 1000:.0f} ms")
+
+
+def benchmark(count=50):
+    """
+    Time `count` random-state scrambles without a limit, then count how
+    often an inline scramble would hit SCRAMBLE_TIME_LIMIT_S and fall back to
+    random moves. There is no pass/fail latency target: the scramble screen
+    is served from the ScrambleProvider queue.
+    """
+    import platform
+    get_solver()  # table mapping is not part of the per-scramble cost
+    print(f"{platform.machine()} {platform.processor() or platform.platform()}, "
+          f"Python {platform.python_version()}")
+    samples = []
+    lengths = []
+    for _ in range(count):
+        start = time.perf_counter()
+        scramble = generate_scramble()
+        samples.append((time.perf_counter() - start) * 1000)
+        lengths.append(len(scramble.split()))
+    samples.sort()
+    mean = sum(samples) / count
+    median = samples[count // 2]
+    p95 = samples[min(count - 1, int(count * 0.95))]
+    print(f"{count} scrambles: mean {mean:.1f} ms, median {median:.1f} ms, "
+          f"p95 {p95:.1f} ms, max {samples[-1]:.1f} ms, "
+          f"avg length {sum(lengths) / count:.1f} moves")
+
+    timeouts = 0
+    worst = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            generate_scramble(time_limit=SCRAMBLE_TIME_LIMIT_S)
+        except ScrambleTimeout:
+            timeouts += 1
+        worst = max(worst, (time.perf_counter() - start) * 1000)
+    print(f"with the {SCRAMBLE_TIME_LIMIT_S * 1000:.0f} ms limit: {timeouts}/{count} fall back "
+          f"to random moves, slowest {worst:.1f} ms")
+    print("ℹ️ Scrambles are normally served from the ScrambleProvider queue (no latency); "
+          "the limit only applies when it is empty")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else "scramble"
+    if command == "build":
+        build_tables()
+    elif command == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 50)
+    elif command == "scramble":
+        print(generate_scramble())
+    else:
+        print("Usage: python3 twophase.py [build | bench [N] | scramble]")
+        sys.exit(1)
@@ -0,0 +1,406 @@
+"""
+SPI benchmarks for the st7789py driver, without a panel
+
+FakeSPI stands in for machine.SPI: it decodes CASET/RASET/RAMWR into an
+emulated panel memory and counts what went over the bus (commands, windows,
+SPI writes, CS edges and bytes), so changes to the driver can be checked for
+both traffic and pixel-for-pixel output.
+
+Runs under CPython from this directory:
+
+    python3 bench_st7789.py
+
+or on the Pico itself (copy it next to main.py and run it with mpremote).
+"""
+
+import gc
+import sys
+
+try:
+    import os.path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+except ImportError:
+    pass    # MicroPython: lib/ is already on the path
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(new, old):
+        return new - old
+
+import st7789py as st7789
+import vga1_16x32 as font_big
+import vga1_8x16 as font_small
+
+_CASET = 0x2A
+_RASET = 0x2B
+_RAMWR = 0x2C
+_PANEL = 320    # emulated memory is _PANEL x _PANEL pixels
+
+
+class FakePin:
+    """machine.Pin stand-in that remembers its level and counts falling edges"""
+
+    def __init__(self, value=1):
+        self._value = value
+        self.falls = 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        if self._value and not value:
+            self.falls += 1
+        self._value = 1 if value else 0
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+
+class FakeSPI:
+    """
+    machine.SPI stand-in: decodes the ST7789 commands the driver sends.
+    With `cs`, it also checks the framing: `misframed` counts writes made
+    with CS high, and pixel data not in the same CS frame as its RAMWR.
+    """
+
+    def __init__(self, dc, emulate=True, cs=None):
+        self.dc = dc
+        self.cs = cs
+        self.emulate = emulate
+        self.memory = bytearray(_PANEL * _PANEL * 2)
+        self.reset_counts()
+        self._command = None
+        self._window = [0, 0, 0, 0]
+        self._x = self._y = 0
+
+    def reset_counts(self):
+        self.commands = 0
+        self.windows = 0
+        self.writes = 0
+        self.bytes = 0
+        self.misframed = 0
+
+    def write(self, buf):
+        self.writes += 1
+        self.bytes += len(buf)
+        frame = None
+        if self.cs is not None:
+            frame = self.cs.falls
+            if self.cs.value():
+                self.misframed += 1
+        if not self.dc.value():
+            self.commands += 1
+            self._command = buf[0]
+            if self._command == _RAMWR:
+                self.windows += 1
+                self._x, self._y = self._window[0], self._window[2]
+                self._frame = frame
+            return
+        if self._command == _RAMWR and frame != self._frame:
+            self.misframed += 1
+        if self._command == _CASET:
+            self._window[0] = buf[0] << 8 | buf[1]
+            self._window[1] = buf[2] << 8 | buf[3]
+        elif self._command == _RASET:
+            self._window[2] = buf[0] << 8 | buf[1]
+            self._window[3] = buf[2] << 8 | buf[3]
+        elif self._command == _RAMWR and self.emulate:
+            self._pixels(buf)
+
+    def _pixels(self, buf):
+        x0, x1, _, y1 = self._window
+        x, y = self._x, self._y
+        memory = self.memory
+        for i in range(0, len(buf) - 1, 2):
+            if y <= y1 and x < _PANEL and y < _PANEL:
+                at = (y * _PANEL + x) * 2
+                memory[at] = buf[i]
+                memory[at + 1] = buf[i + 1]
+            x += 1
+            if x > x1:
+                x = x0
+                y += 1
+        self._x, self._y = x, y
+
+
+def make_display(emulate=True, **kwargs):
+    dc = FakePin()
+    cs = FakePin()
+    spi = FakeSPI(dc, emulate, cs)
+    tft = st7789.ST7789(spi, 240, 320, reset=FakePin(), dc=dc, cs=cs, rotation=1, **kwargs)
+    return tft, spi, cs
+
+
+def text_per_char(tft, font, text, x0, y0, color=st7789.WHITE, background=st7789.BLACK):
+    """The previous text path: one _pack8/_pack16 + blit_buffer per 8 pixel band per character"""
+    fg = ((color << 8) & 0xFF00) | (color >> 8)
+    bg = ((background << 8) & 0xFF00) | (background >> 8)
+    pack = tft._pack8 if font.WIDTH == 8 else tft._pack16
+    passes = font.HEIGHT // 8
+    size = (font.WIDTH // 8) * font.HEIGHT
+    for char in text:
+        ch = ord(char)
+        if font.FIRST <= ch < font.LAST and x0 + font.WIDTH <= tft.width and y0 + font.HEIGHT <= tft.height:
+            for line in range(passes):
+                buffer = pack(font.FONT, (ch - font.FIRST) * size + font.WIDTH * line, fg, bg)
+                tft.blit_buffer(buffer, x0, y0 + 8 * line, font.WIDTH, 8)
+            x0 += font.WIDTH
+        elif font.WIDTH == 16:
+            x0 += 16
+
+
+# (name, font, text, x, y): what the Pico UI draws most
+TEXT_CASES = (
+    ("timer", font_big, "  12.3", 112, 104),
+    ("scramble line", font_big, "R U2 F' L D2 B", 48, 90),
+    ("results line", font_small, " 5: 12.34", 70, 60),
+    ("prompt", font_small, "GP19: Clear | GP15: Exit", 64, 220),
+)
+
+
+def _count(spi, cs, draw):
+    spi.reset_counts()
+    cs.falls = 0
+    draw()
+    return spi.windows, spi.commands, spi.writes, cs.falls
+
+
+def _time(call, repeat=20):
+    """Microseconds per call"""
+    start = ticks_us()
+    for _ in range(repeat):
+        call()
+    return ticks_diff(ticks_us(), start) // repeat
+
+
+def bench_text():
+    """
+    Per-character vs batched text: bus traffic and identical pixels on the
+    emulated panel, then the time per call with the SPI stand-in not
+    decoding anything. Batched text is timed twice: drawn for the first
+    time (glyph cache cleared each call) and drawn again (its glyphs
+    cached). Under CPython the viper pointer shims dominate these times;
+    run it on the Pico for real numbers.
+    """
+    print("text: per-character -> batched")
+    print("{:14s} {:>9s} {:>11s} {:>11s} {:>11s} {:>19s}  {}".format(
+        "", "windows", "commands", "spi writes", "cs edges", "us first/again", "pixels"))
+    for name, font, text, x, y in TEXT_CASES:
+        tft, spi, cs = make_display()
+        old = _count(spi, cs, lambda: text_per_char(tft, font, text, x, y))
+        old_memory = bytes(spi.memory)
+        tft.fill(0)
+        new = _count(spi, cs, lambda: tft.text(font, text, x, y))
+        same = "same" if bytes(spi.memory) == old_memory else "DIFFERENT"
+
+        tft, spi, cs = make_display(emulate=False)
+        old_us = _time(lambda: text_per_char(tft, font, text, x, y))
+
+        def first():
+            tft.clear_glyph_cache()
+            tft.text(font, text, x, y)
+        first_us = _time(first)
+        tft.text(font, text, x, y)
+        again_us = _time(lambda: tft.text(font, text, x, y))
+        print("{:14s} {:>4d}->{:<4d} {:>5d}->{:<5d} {:>5d}->{:<5d} {:>5d}->{:<5d} {:>5d}->{:>5d}/{:<5d}  {}".format(
+            name, old[0], new[0], old[1], new[1], old[2], new[2], old[3], new[3],
+            old_us, first_us, again_us, same))
+
+
+def bench_glyph_cache(updates=100):
+    """
+    A running timer: `updates` readouts in font_big, green, as the Pico
+    draws them every 100 ms. Packing every glyph vs the glyph cache.
+    """
+    print("glyph cache: running timer, {} updates".format(updates))
+    results = []
+    for name, budget in (("packed", 0), ("cached", st7789._GLYPH_CACHE_BYTES)):
+        tft, spi, cs = make_display(glyph_cache=budget)
+        start = ticks_us()
+        for tenths in range(updates):
+            tft.text(font_big, "{:6.1f}".format(tenths / 10), 112, 104, st7789.GREEN)
+        elapsed = ticks_diff(ticks_us(), start)
+        results.append(bytes(spi.memory))
+        print("{:8s} {:8d} us/update  hits {:5d}  misses {:3d}  cached {:5d} bytes".format(
+            name, elapsed // updates, tft.glyph_hits, tft.glyph_misses, tft.glyph_cache_bytes))
+    print("pixels", "same" if results[0] == results[1] else "DIFFERENT")
+
+
+class TestBitmap:
+    """A 2 bpp 32x32 bitmap module, laid out like the converted ones"""
+    WIDTH = 32
+    HEIGHT = 32
+    BPP = 2
+    PALETTE = (st7789.BLACK, st7789.RED, st7789.GREEN, st7789.BLUE)
+    BITMAP = bytes(range(256))
+
+
+class TestFont:
+    """A converted TrueType font module with four 8x12 glyphs"""
+    MAP = "015."
+    HEIGHT = 12
+    MAX_WIDTH = 8
+    OFFSET_WIDTH = 1
+    OFFSETS = bytes((0, 12, 24, 36))
+    WIDTHS = bytes((8, 8, 8, 4))
+    BITMAPS = bytes(range(0, 256, 5))
+
+
+def bench_transactions():
+    """
+    CS edges per drawing call: each should be one CS frame, ending with CS
+    released, with every RAMWR's pixels inside the frame that sent it.
+    """
+    tft, spi, cs = make_display(emulate=False)
+    pixels = bytearray(16 * 16 * 2)
+
+    def timer_update():
+        with tft:
+            tft.fill_rect(112, 104, 96, 32, st7789.BLACK)
+            tft.text(font_big, "  12.3", 112, 104, st7789.GREEN)
+
+    cases = (
+        ("command", lambda: tft.inversion_mode(True)),
+        ("pixel", lambda: tft.pixel(5, 5, st7789.WHITE)),
+        ("fill_rect", lambda: tft.fill_rect(10, 20, 60, 25, st7789.BLUE)),
+        ("fill", lambda: tft.fill(st7789.BLACK)),
+        ("rect", lambda: tft.rect(10, 20, 60, 25, st7789.RED)),
+        ("line", lambda: tft.line(0, 0, 50, 20, st7789.RED)),
+        ("blit_buffer", lambda: tft.blit_buffer(pixels, 0, 0, 16, 16)),
+        ("bitmap", lambda: tft.bitmap(TestBitmap, 100, 100)),
+        ("text big", lambda: tft.text(font_big, "R U2 F'", 48, 90)),
+        ("text small", lambda: tft.text(font_small, " 5: 12.34", 70, 60)),
+        ("timer update", timer_update),
+    )
+    print("transactions: CS edges per call")
+    print("{:14s} {:>8s} {:>9s} {:>11s} {:>10s}".format("", "cs edges", "windows", "spi writes", "misframed"))
+    failed = 0
+    for name, call in cases:
+        spi.reset_counts()
+        cs.falls = 0
+        call()
+        ok = cs.falls == 1 and cs.value() == 1 and not spi.misframed
+        failed += not ok
+        print("{:14s} {:8d} {:9d} {:11d} {:10d}  {}".format(
+            name, cs.falls, spi.windows, spi.writes, spi.misframed, "OK" if ok else "FAIL"))
+    return not failed
+
+
+class NullPin:
+    """machine.Pin stand-in that does nothing (and allocates nothing)"""
+
+    def value(self, value=None):
+        return 1
+
+    def on(self):
+        pass
+
+    def off(self):
+        pass
+
+
+class NullSPI:
+    """machine.SPI stand-in that drops everything"""
+
+    def write(self, buf):
+        pass
+
+
+def allocated(call, repeat=20):
+    """
+    Heap bytes per call after two warm-up calls (text() caches a glyph the
+    second time it is drawn): gc.mem_alloc() growth with
+    the collector off on MicroPython. CPython has no such counter, so
+    there it is the tracemalloc peak, which only catches buffer-sized
+    allocations: boxed ints and the viper pointer shims add a few hundred
+    bytes of their own.
+    """
+    call()
+    call()
+    gc.collect()
+    if hasattr(gc, "mem_alloc"):
+        gc.disable()
+        before = gc.mem_alloc()
+        for _ in range(repeat):
+            call()
+        used = gc.mem_alloc() - before
+        gc.enable()
+        return used // repeat
+    import tracemalloc
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(repeat):
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+# bytes per call that still count as not allocating
+_ALLOC_SLACK = 0 if hasattr(gc, "mem_alloc") else 512
+# the same for text(). Under CPython the pointer shims' memoryview casts for
+# every band of every character cost more than packing glyphs would, so no
+# byte count can tell the two apart: there (None) redrawing the text must not
+# miss the glyph cache instead.
+_TEXT_ALLOC_SLACK = 0 if hasattr(gc, "mem_alloc") else None
+# pack_glyph(): one glyph through the pointer shims is about 1.2 KB under
+# CPython, packing it into a new buffer would add another 1 KB
+_PACK_ALLOC_SLACK = 0 if hasattr(gc, "mem_alloc") else 1536
+
+
+def bench_allocations():
+    """
+    Heap allocated per call by the drawing paths, including text() redrawing
+    cached glyphs as the running timer does.
+    """
+    tft = st7789.ST7789(NullSPI(), 240, 320, reset=NullPin(), dc=NullPin(), cs=NullPin(), rotation=1)
+    pixels = bytearray(16 * 16 * 2)
+    strip = bytearray(320 * 24 * 2)
+    cases = (
+        ("fill_rect", _ALLOC_SLACK, lambda: tft.fill_rect(10, 20, 60, 25, st7789.BLUE)),
+        ("fill", _ALLOC_SLACK, lambda: tft.fill(st7789.BLACK)),
+        ("hline", _ALLOC_SLACK, lambda: tft.hline(0, 100, 320, st7789.RED)),
+        ("pixel", _ALLOC_SLACK, lambda: tft.pixel(5, 5, st7789.WHITE)),
+        ("blit_buffer", _ALLOC_SLACK, lambda: tft.blit_buffer(pixels, 0, 0, 16, 16)),
+        ("bitmap", _ALLOC_SLACK, lambda: tft.bitmap(TestBitmap, 100, 100)),
+        ("pbitmap", _ALLOC_SLACK, lambda: tft.pbitmap(TestBitmap, 100, 100)),
+        ("write", _ALLOC_SLACK, lambda: tft.write(TestFont, "10.5", 10, 10)),
+        ("pack_glyph", _PACK_ALLOC_SLACK, lambda: tft.pack_glyph(strip, 320, 24, font_big, "8", 100, -4, st7789.GREEN)),
+        ("text big", _TEXT_ALLOC_SLACK, lambda: tft.text(font_big, "  12.3", 112, 104, st7789.GREEN)),
+        ("text small", _TEXT_ALLOC_SLACK, lambda: tft.text(font_small, " 5: 12.34", 70, 60)),
+    )
+    print("allocations: bytes per call")
+    failed = 0
+    for name, limit, call in cases:
+        call()
+        call()
+        misses = tft.glyph_misses
+        used = allocated(call)
+        if limit is None:
+            ok = tft.glyph_misses == misses
+        else:
+            ok = used <= limit
+        failed += not ok
+        failure = "ALLOCATES" if limit is not None else "MISSES GLYPH CACHE"
+        print("{:14s} {:7d}  {}".format(name, used, "OK" if ok else failure))
+    return not failed
+
+
+if __name__ == "__main__":
+    bench_text()
+    print()
+    bench_glyph_cache()
+    print()
+    ok = bench_transactions()
+    print()
+    ok = bench_allocations() and ok
+    if not ok:
+        sys.exit(1)
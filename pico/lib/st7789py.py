@@ -72,6 +72,16 @@ except ImportError:
         def native(func):
             return func
 
+    # viper pointers, so the driver also runs (slowly) under CPython
+    def ptr8(buf):
+        return memoryview(buf).cast("B")
+
+    def ptr16(buf):
+        return memoryview(buf).cast("B").cast("H")
+
+    def ptr32(buf):
+        return memoryview(buf).cast("B").cast("i")
+
 
 #
 # If you don't need to build the docs, you can remove all of the lines between
@@ -79,6 +89,8 @@ except ImportError:
 #
 
 import struct
+from array import array
+from collections import OrderedDict
 
 # ST7789 commands
 _ST7789_SWRESET = b"\x01"
@@ -137,6 +149,25 @@ _ENCODE_POS_16 = const("<HH")
 # must be at least 256 for 16 bit wide fonts
 _BUFFER_SIZE = const(256)
 
+# bytes in the scratch buffer used by bitmap() and write(), grown when a
+# converted font's glyph doesn't fit
+_SCRATCH_SIZE = const(1024)
+
+# bytes per pixel row of a text band: 8 rows of 16 bit pixels
+_BAND_ROW_BYTES = const(16)
+
+# default glyph cache budget in bytes: the running timer's digits in
+# vga1_16x32 (12 glyphs of 1 KB) plus room for a few more
+_GLYPH_CACHE_BYTES = const(16384)
+
+# glyphs text() has missed once, remembered so the second miss caches them;
+# forgotten all at once when there are this many
+_GLYPHS_SEEN = const(64)
+
+# foreground/background color pairs the glyph cache keeps ids for (8 bits of
+# the key); the cache starts over when they run out
+_COLOR_PAIRS = const(256)
+
 _BIT7 = const(0x80)
 _BIT6 = const(0x40)
 _BIT5 = const(0x20)
@@ -256,6 +287,9 @@ class ST7789:
 
           - ((width, height, xstart, ystart, madctl, needs_swap), ...)
 
+        glyph_cache (int): bytes of packed glyphs text() may keep, 0 to
+          disable the cache
+
     """
 
     def __init__(
@@ -271,6 +305,7 @@ class ST7789:
         color_order=BGR,
         custom_init=None,
         custom_rotations=None,
+        glyph_cache=_GLYPH_CACHE_BYTES,
     ):
         """
         Initialize display.
@@ -299,6 +334,34 @@ class ST7789:
         self._rotation = rotation % 4
         self.color_order = color_order
         self.init_cmds = custom_init or _ST7789_INIT_CMDS
+        # preallocated buffers, so drawing doesn't allocate on the heap
+        self._pos = bytearray(4)
+        self._pixel = bytearray(2)
+        self._fill_buffer = bytearray(_BUFFER_SIZE * 2)
+        self._fill_color = -1
+        self._fill_views = {}
+        self._scratch = bytearray(_SCRATCH_SIZE)
+        self._scratch_views = {}
+        self._band_views = {}
+        self._transaction = 0  # begin() nesting depth
+        # one 8 pixel high band of text, as wide as the display can be
+        self._band = bytearray(max(width, height) * _BAND_ROW_BYTES)
+        self._pack_args = array("i", (0, 0, 0, 0, 0, 0, 8))
+        self._glyph_args = array("i", (0, 0, 0, 0, 0, 0, 0))  # pack_glyph()
+        # LRU of packed glyphs, keyed by int (see _glyph_key) -> bytearray
+        self._glyphs = OrderedDict()
+        self._glyphs_seen = set()
+        self._font_ids = {}
+        self._pair_fg = array("H", [0] * _COLOR_PAIRS)
+        self._pair_bg = array("H", [0] * _COLOR_PAIRS)
+        self._pairs = 0
+        self._glyph_budget = glyph_cache
+        self._run_glyphs = [None] * (max(width, height) >> 3)
+        self._run_chars = array("i", [0] * (max(width, height) >> 3))
+        self._copy_args = array("i", (0, 0, 0, 0))
+        self.glyph_cache_bytes = 0
+        self.glyph_hits = 0
+        self.glyph_misses = 0
         self.hard_reset()
         # yes, twice, once is not always enough
         self.init(self.init_cmds)
@@ -326,17 +389,47 @@ class ST7789:
             sleep_ms(delay)
 
     def _write(self, command=None, data=None):
-        """SPI write to the device: commands and data."""
-        if self.cs:
-            self.cs.off()
+        """
+        SPI write to the device: commands and data. Outside a transaction
+        CS is asserted for just this write, inside one it stays low.
+        """
+        cs = None if self._transaction else self.cs
+        if cs:
+            cs.off()
         if command is not None:
             self.dc.off()
             self.spi.write(command)
         if data is not None:
             self.dc.on()
             self.spi.write(data)
-            if self.cs:
-                self.cs.on()
+        if cs:
+            cs.on()
+
+    def begin(self):
+        """
+        Start an SPI transaction: CS stays asserted until the matching
+        end(), so a window and its pixels, or several drawing calls, go
+        out without CS toggling in between. Transactions nest.
+        """
+        if not self._transaction and self.cs:
+            self.cs.off()
+        self._transaction += 1
+
+    def end(self):
+        """
+        End an SPI transaction started with begin(); the outermost end()
+        releases CS.
+        """
+        self._transaction -= 1
+        if not self._transaction and self.cs:
+            self.cs.on()
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
 
     def hard_reset(self):
         """
@@ -412,6 +505,7 @@ class ST7789:
             self.ystart,
             self.needs_swap,
         ) = self.rotations[rotation]
+        self._fill_color = -1  # byte order may have changed
 
         if self.color_order == BGR:
             madctl |= _ST7789_MADCTL_BGR
@@ -431,15 +525,49 @@ class ST7789:
             y1 (int): row end address
         """
         if x0 <= x1 <= self.width and y0 <= y1 <= self.height:
-            self._write(
-                _ST7789_CASET,
-                struct.pack(_ENCODE_POS, x0 + self.xstart, x1 + self.xstart),
-            )
-            self._write(
-                _ST7789_RASET,
-                struct.pack(_ENCODE_POS, y0 + self.ystart, y1 + self.ystart),
-            )
-            self._write(_ST7789_RAMWR)
+            pos = self._pos
+            self.begin()
+            try:
+                self._encode_pos(pos, x0 + self.xstart, x1 + self.xstart)
+                self._write(_ST7789_CASET, pos)
+                self._encode_pos(pos, y0 + self.ystart, y1 + self.ystart)
+                self._write(_ST7789_RASET, pos)
+                self._write(_ST7789_RAMWR)
+            finally:
+                self.end()
+
+    @staticmethod
+    def _encode_pos(buffer, start, end):
+        """
+        Internal method to store a start and end address big-endian, like
+        struct.pack(">HH", start, end) without allocating.
+        """
+        buffer[0] = start >> 8
+        buffer[1] = start & 0xFF
+        buffer[2] = end >> 8
+        buffer[3] = end & 0xFF
+
+    @staticmethod
+    def _view(views, buffer, nbytes):
+        """
+        Internal method to get the first `nbytes` of `buffer` as a
+        memoryview. Views are kept in `views` by length, so each length
+        is only sliced once.
+        """
+        view = views.get(nbytes)
+        if view is None:
+            view = views[nbytes] = memoryview(buffer)[:nbytes]
+        return view
+
+    def _scratch_buffer(self, nbytes):
+        """
+        Internal method to get the scratch buffer, grown to at least
+        `nbytes`.
+        """
+        if len(self._scratch) < nbytes:
+            self._scratch = bytearray(nbytes)
+            self._scratch_views = {}
+        return self._scratch
 
     def vline(self, x, y, length, color):
         """
@@ -474,13 +602,24 @@ class ST7789:
             Y (int): y coordinate
             color (int): 565 encoded color
         """
-        self._set_window(x, y, x, y)
-        self._write(
-            None,
-            struct.pack(
-                _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
-            ),
-        )
+        self._encode_pixel(self._pixel, color)
+        self.begin()
+        try:
+            self._set_window(x, y, x, y)
+            self._write(None, self._pixel)
+        finally:
+            self.end()
+
+    def _encode_pixel(self, buffer, color):
+        """
+        Internal method to store a 565 color in the display's byte order.
+        """
+        if self.needs_swap:
+            buffer[0] = color & 0xFF
+            buffer[1] = color >> 8
+        else:
+            buffer[0] = color >> 8
+            buffer[1] = color & 0xFF
 
     def blit_buffer(self, buffer, x, y, width, height):
         """
@@ -493,8 +632,12 @@ class ST7789:
             width (int): Width
             height (int): Height
         """
-        self._set_window(x, y, x + width - 1, y + height - 1)
-        self._write(None, buffer)
+        self.begin()
+        try:
+            self._set_window(x, y, x + width - 1, y + height - 1)
+            self._write(None, buffer)
+        finally:
+            self.end()
 
     def rect(self, x, y, w, h, color):
         """
@@ -507,10 +650,14 @@ class ST7789:
             height (int): Height in pixels
             color (int): 565 encoded color
         """
-        self.hline(x, y, w, color)
-        self.vline(x, y, h, color)
-        self.vline(x + w - 1, y, h, color)
-        self.hline(x, y + h - 1, w, color)
+        self.begin()
+        try:
+            self.hline(x, y, w, color)
+            self.vline(x, y, h, color)
+            self.vline(x + w - 1, y, h, color)
+            self.hline(x, y + h - 1, w, color)
+        finally:
+            self.end()
 
     def fill_rect(self, x, y, width, height, color):
         """
@@ -523,18 +670,40 @@ class ST7789:
             height (int): Height in pixels
             color (int): 565 encoded color
         """
-        self._set_window(x, y, x + width - 1, y + height - 1)
-        chunks, rest = divmod(width * height, _BUFFER_SIZE)
-        pixel = struct.pack(
-            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
-        )
-        self.dc.on()
-        if chunks:
-            data = pixel * _BUFFER_SIZE
+        pixels = width * height
+        chunks = pixels // _BUFFER_SIZE  # not divmod(), its tuple allocates
+        rest = pixels % _BUFFER_SIZE
+        data = self._fill_buffer
+        if color != self._fill_color:
+            self._encode_pixel(self._pixel, color)
+            self._fill16(data, self._pixel[0], self._pixel[1])
+            self._fill_color = color
+        self.begin()
+        try:
+            self._set_window(x, y, x + width - 1, y + height - 1)
             for _ in range(chunks):
                 self._write(None, data)
-        if rest:
-            self._write(None, pixel * rest)
+            if rest:
+                self._write(None, self._view(self._fill_views, data, rest * 2))
+        finally:
+            self.end()
+
+    @micropython.viper
+    @staticmethod
+    def _fill16(buffer, hi: uint, lo: uint):
+        """
+        Internal method to fill a buffer with one 16 bit color.
+
+        Args:
+            buffer (bytearray): buffer to fill
+            hi (int): first byte of the color
+            lo (int): second byte of the color
+        """
+        buf = ptr8(buffer)
+        n = int(len(buffer))
+        for i in range(0, n, 2):
+            buf[i] = hi
+            buf[i + 1] = lo
 
     def fill(self, color):
         """
@@ -567,16 +736,20 @@ class ST7789:
         dy = abs(y1 - y0)
         err = dx // 2
         ystep = 1 if y0 < y1 else -1
-        while x0 <= x1:
-            if steep:
-                self.pixel(y0, x0, color)
-            else:
-                self.pixel(x0, y0, color)
-            err -= dy
-            if err < 0:
-                y0 += ystep
-                err += dx
-            x0 += 1
+        self.begin()
+        try:
+            while x0 <= x1:
+                if steep:
+                    self.pixel(y0, x0, color)
+                else:
+                    self.pixel(x0, y0, color)
+                err -= dy
+                if err < 0:
+                    y0 += ystep
+                    err += dx
+                x0 += 1
+        finally:
+            self.end()
 
     def vscrdef(self, tfa, vsa, bfa):
         """
@@ -678,11 +851,330 @@ class ST7789:
 
         return buffer
 
+    @micropython.viper
+    @staticmethod
+    def _pack_band(glyphs, buffer, args):
+        """
+        Pack rows of one character (8 of them for a text band) into a band.
+
+        Args:
+            glyphs (buffer): font bitmap
+            buffer (bytearray): band being built
+            args (array): glyph byte index, foreground color, background
+                color, pixel offset in the band, band width in pixels,
+                bytes per glyph row (1 or 2) and number of rows
+        """
+        arg = ptr32(args)
+        idx = arg[0]
+        fg_color = arg[1]
+        bg_color = arg[2]
+        i = arg[3]
+        stride = arg[4]
+        row_bytes = arg[5]
+        rows = arg[6]
+        bitmap = ptr16(buffer)
+        glyph = ptr8(glyphs)
+
+        for _ in range(rows):
+            p = i
+            for _ in range(row_bytes):
+                byte = glyph[idx]
+                bitmap[p] = fg_color if byte & _BIT7 else bg_color
+                bitmap[p + 1] = fg_color if byte & _BIT6 else bg_color
+                bitmap[p + 2] = fg_color if byte & _BIT5 else bg_color
+                bitmap[p + 3] = fg_color if byte & _BIT4 else bg_color
+                bitmap[p + 4] = fg_color if byte & _BIT3 else bg_color
+                bitmap[p + 5] = fg_color if byte & _BIT2 else bg_color
+                bitmap[p + 6] = fg_color if byte & _BIT1 else bg_color
+                bitmap[p + 7] = fg_color if byte & _BIT0 else bg_color
+                p += 8
+                idx += 1
+            i += stride
+
+    @micropython.viper
+    @staticmethod
+    def _copy_band(glyph, buffer, args):
+        """
+        Copy 8 rows of a packed glyph into a text band.
+
+        Args:
+            glyph (bytearray): packed glyph
+            buffer (bytearray): band being built
+            args (array): glyph word offset, band word offset, band width
+                in words and glyph width in words (32 bit words)
+        """
+        arg = ptr32(args)
+        s = arg[0]
+        d = arg[1]
+        stride = arg[2]
+        words = arg[3]
+        src = ptr32(glyph)
+        dst = ptr32(buffer)
+
+        for _ in range(8):
+            for k in range(words):
+                dst[d + k] = src[s + k]
+            s += words
+            d += stride
+
+    def _glyph_key(self, font, ch, fg_color, bg_color):
+        """
+        Internal method to get the glyph cache key of a character:
+        font id << 16 | char << 8 | color pair id. A small int, so unlike a
+        tuple it isn't allocated on the heap. Font and color pair ids are
+        handed out on first use.
+        """
+        font_id = self._font_ids.get(font)
+        if font_id is None:
+            font_id = self._font_ids[font] = len(self._font_ids)
+        fgs = self._pair_fg
+        bgs = self._pair_bg
+        for pair in range(self._pairs):
+            if fgs[pair] == fg_color and bgs[pair] == bg_color:
+                break
+        else:
+            if self._pairs == _COLOR_PAIRS:
+                # keys of the old pairs would be reused for new colors
+                self.clear_glyph_cache()
+            pair = self._pairs
+            fgs[pair] = fg_color
+            bgs[pair] = bg_color
+            self._pairs += 1
+        return font_id << 16 | ch << 8 | pair
+
+    def _glyph(self, font, ch, fg_color, bg_color, reused=False):
+        """
+        Internal method to get a character packed in color565, from the
+        glyph cache when possible. Glyphs that don't fit the cache budget
+        are packed but not kept; the least recently used glyphs are
+        dropped to make room.
+
+        With `reused`, a glyph missing from the cache is only packed the
+        second time it is asked for (and never if it can't be kept); until
+        then this returns None and the caller packs it from the font itself. Text that is drawn once
+        (a scramble, a results line) then doesn't pay for packing glyphs
+        into the cache and copying them out again.
+
+        Returns:
+            bytearray: font.WIDTH * font.HEIGHT pixels, or None
+        """
+        key = self._glyph_key(font, ch, fg_color, bg_color)
+        cache = self._glyphs
+        glyph = cache.pop(key, None)
+        if glyph is not None:
+            self.glyph_hits += 1
+            cache[key] = glyph  # move to the most recently used end
+            return glyph
+
+        self.glyph_misses += 1
+        width = font.WIDTH
+        size = width * font.HEIGHT * 2
+        if reused:
+            if size > self._glyph_budget:
+                return None  # would never be kept
+            seen = self._glyphs_seen
+            if key not in seen:
+                if len(seen) >= _GLYPHS_SEEN:
+                    seen.clear()
+                seen.add(key)
+                return None
+            seen.discard(key)
+        glyph = bytearray(size)
+        args = self._pack_args
+        base = (ch - font.FIRST) * (width >> 3) * font.HEIGHT
+        args[1] = fg_color
+        args[2] = bg_color
+        args[4] = width
+        args[5] = width >> 3
+        for line in range(font.HEIGHT >> 3):
+            args[0] = base + width * line
+            args[3] = line * width * 8
+            self._pack_band(font.FONT, glyph, args)
+
+        if size <= self._glyph_budget:
+            while self.glyph_cache_bytes + size > self._glyph_budget:
+                oldest = next(iter(cache))
+                self.glyph_cache_bytes -= len(cache.pop(oldest))
+            cache[key] = glyph
+            self.glyph_cache_bytes += size
+        return glyph
+
+    def glyph(self, font, char, color=WHITE, background=BLACK):
+        """
+        Get a character of an 8 or 16 bit wide font packed in color565, in
+        the byte order the display expects, e.g. to compose text off-screen
+        in a framebuf.FrameBuffer before a blit_buffer. Comes from the glyph
+        cache when enabled; don't modify it.
+
+        Args:
+            font (module): font module to use
+            char (str): character to pack, must be in the font
+            color (int): 565 encoded color to use for the character
+            background (int): 565 encoded color to use for background
+
+        Returns:
+            bytearray: font.WIDTH * font.HEIGHT pixels
+        """
+        fg_color = color if self.needs_swap else ((color << 8) & 0xFF00) | (color >> 8)
+        bg_color = (
+            background
+            if self.needs_swap
+            else ((background << 8) & 0xFF00) | (background >> 8)
+        )
+        return self._glyph(font, ord(char), fg_color, bg_color)
+
+    def pack_glyph(self, buffer, width, height, font, char, x, y, color=WHITE, background=BLACK):
+        """
+        Pack a character of an 8 or 16 bit wide font straight into a color565
+        buffer of width x height pixels (e.g. one strip of a screen composed
+        off-screen before a blit_buffer), in the byte order the display
+        expects, with its top left corner at x, y. Rows above or below the
+        buffer are skipped; the character must fit across it. Doesn't use the
+        glyph cache and doesn't allocate.
+
+        Args:
+            buffer (bytearray): width * height pixels
+            width (int): buffer width in pixels
+            height (int): buffer height in pixels
+            font (module): font module to use
+            char (str): character to pack, must be in the font
+            x (int): column in the buffer
+            y (int): row in the buffer, may be negative
+            color (int): 565 encoded color to use for the character
+            background (int): 565 encoded color to use for background
+        """
+        first = -y if y < 0 else 0
+        last = height - y if y + font.HEIGHT > height else font.HEIGHT
+        if first >= last:
+            return
+        row_bytes = font.WIDTH >> 3
+        args = self._glyph_args
+        args[0] = ((ord(char) - font.FIRST) * font.HEIGHT + first) * row_bytes
+        args[1] = color if self.needs_swap else ((color << 8) & 0xFF00) | (color >> 8)
+        args[2] = (
+            background
+            if self.needs_swap
+            else ((background << 8) & 0xFF00) | (background >> 8)
+        )
+        args[3] = (y + first) * width + x
+        args[4] = width
+        args[5] = row_bytes
+        args[6] = last - first
+        self._pack_band(font.FONT, buffer, args)
+
+    def clear_glyph_cache(self):
+        """
+        Drop all cached glyphs, e.g. to free memory for something else.
+        """
+        self._glyphs = OrderedDict()
+        self._glyphs_seen = set()
+        self._pairs = 0
+        self.glyph_cache_bytes = 0
+
+    def _text_run(self, font, text, start, count, x0, y0, fg_color, bg_color):
+        """
+        Internal method to draw `count` characters of `text`, starting at
+        index `start` and skipping characters the font doesn't have, as a
+        single window. The window is streamed one 8 pixel high band at a
+        time, so it costs one CASET/RASET/RAMWR sequence for the whole run.
+        With the glyph cache enabled, bands of glyphs drawn before are copied
+        from the cache; the rest are packed from the font bitmap.
+
+        Returns:
+            int: index in `text` after the last character drawn
+        """
+        if not self._glyph_budget:
+            return self._pack_run(font, text, start, count, x0, y0, fg_color, bg_color)
+
+        width = font.WIDTH
+        first = font.FIRST
+        last = font.LAST
+        stride = count * width
+        band = self._view(self._band_views, self._band, stride * _BAND_ROW_BYTES)
+
+        glyphs = self._run_glyphs
+        chars = self._run_chars
+        i = start
+        n = 0
+        while n < count:
+            ch = ord(text[i])
+            i += 1
+            if first <= ch < last:
+                glyphs[n] = self._glyph(font, ch, fg_color, bg_color, True)
+                chars[n] = ch
+                n += 1
+
+        args = self._copy_args
+        words = width >> 1
+        args[2] = stride >> 1
+        args[3] = words
+        pack = self._pack_args
+        pack[1] = fg_color
+        pack[2] = bg_color
+        pack[4] = stride
+        pack[5] = width >> 3
+        glyph_size = (width >> 3) * font.HEIGHT
+        self._set_window(x0, y0, x0 + stride - 1, y0 + font.HEIGHT - 1)
+        for line in range(font.HEIGHT >> 3):
+            args[0] = line * words * 8
+            for n in range(count):
+                glyph = glyphs[n]
+                if glyph is None:
+                    pack[0] = (chars[n] - first) * glyph_size + width * line
+                    pack[3] = n * width
+                    self._pack_band(font.FONT, self._band, pack)
+                else:
+                    args[1] = n * words
+                    self._copy_band(glyph, self._band, args)
+            self._write(None, band)
+
+        for n in range(count):
+            glyphs[n] = None
+        return i
+
+    def _pack_run(self, font, text, start, count, x0, y0, fg_color, bg_color):
+        """
+        Internal method to draw a run of characters like _text_run, packing
+        each band straight from the font bitmap (glyph cache disabled).
+
+        Returns:
+            int: index in `text` after the last character drawn
+        """
+        width = font.WIDTH
+        glyph_size = (width >> 3) * font.HEIGHT
+        first = font.FIRST
+        last = font.LAST
+        stride = count * width
+        band = self._view(self._band_views, self._band, stride * _BAND_ROW_BYTES)
+        args = self._pack_args
+        args[1] = fg_color
+        args[2] = bg_color
+        args[4] = stride
+        args[5] = width >> 3
+
+        self._set_window(x0, y0, x0 + stride - 1, y0 + font.HEIGHT - 1)
+        for line in range(font.HEIGHT >> 3):
+            i = start
+            offset = 0
+            while offset < stride:
+                ch = ord(text[i])
+                i += 1
+                if first <= ch < last:
+                    args[0] = (ch - first) * glyph_size + width * line
+                    args[3] = offset
+                    self._pack_band(font.FONT, self._band, args)
+                    offset += width
+            self._write(None, band)
+        return i
+
     def _text8(self, font, text, x0, y0, fg_color=WHITE, bg_color=BLACK):
         """
         Internal method to write characters with width of 8 and
         heights of 8 or 16.
 
+        Characters the font doesn't have are skipped without advancing, so
+        everything that fits is drawn as one run.
+
         Args:
             font (module): font module to use
             text (str): text to write
@@ -691,35 +1183,28 @@ class ST7789:
             color (int): 565 encoded color to use for characters
             background (int): 565 encoded color to use for background
         """
+        if y0 + font.HEIGHT > self.height or x0 + 8 > self.width:
+            return
 
+        count = 0
+        fits = (self.width - x0) >> 3
         for char in text:
-            ch = ord(char)
-            if (
-                font.FIRST <= ch < font.LAST
-                and x0 + font.WIDTH <= self.width
-                and y0 + font.HEIGHT <= self.height
-            ):
-                if font.HEIGHT == 8:
-                    passes = 1
-                    size = 8
-                    each = 0
-                else:
-                    passes = 2
-                    size = 16
-                    each = 8
-
-                for line in range(passes):
-                    idx = (ch - font.FIRST) * size + (each * line)
-                    buffer = self._pack8(font.FONT, idx, fg_color, bg_color)
-                    self.blit_buffer(buffer, x0, y0 + 8 * line, 8, 8)
+            if font.FIRST <= ord(char) < font.LAST:
+                count += 1
+                if count == fits:
+                    break
 
-                x0 += 8
+        if count:
+            self._text_run(font, text, 0, count, x0, y0, fg_color, bg_color)
 
     def _text16(self, font, text, x0, y0, fg_color=WHITE, bg_color=BLACK):
         """
         Internal method to draw characters with width of 16 and heights of 16
         or 32.
 
+        Characters the font doesn't have leave a gap, so each run of
+        characters between gaps is drawn as one window.
+
         Args:
             font (module): font module to use
             text (str): text to write
@@ -728,27 +1213,26 @@ class ST7789:
             color (int): 565 encoded color to use for characters
             background (int): 565 encoded color to use for background
         """
+        if y0 + font.HEIGHT > self.height:
+            return
 
-        for char in text:
-            ch = ord(char)
-            if (
-                font.FIRST <= ch < font.LAST
-                and x0 + font.WIDTH <= self.width
-                and y0 + font.HEIGHT <= self.height
-            ):
-                each = 16
-                if font.HEIGHT == 16:
-                    passes = 2
-                    size = 32
-                else:
-                    passes = 4
-                    size = 64
-
-                for line in range(passes):
-                    idx = (ch - font.FIRST) * size + (each * line)
-                    buffer = self._pack16(font.FONT, idx, fg_color, bg_color)
-                    self.blit_buffer(buffer, x0, y0 + 8 * line, 16, 8)
+        start = 0
+        count = 0
+        for i in range(len(text)):
+            if x0 + (count + 1) * 16 > self.width:
+                break
+            if font.FIRST <= ord(text[i]) < font.LAST:
+                count += 1
+                continue
+            if count:
+                self._text_run(font, text, start, count, x0, y0, fg_color, bg_color)
+                x0 += count * 16
+                count = 0
             x0 += 16
+            start = i + 1
+
+        if count:
+            self._text_run(font, text, start, count, x0, y0, fg_color, bg_color)
 
     def text(self, font, text, x0, y0, color=WHITE, background=BLACK):
         """
@@ -770,10 +1254,14 @@ class ST7789:
             else ((background << 8) & 0xFF00) | (background >> 8)
         )
 
-        if font.WIDTH == 8:
-            self._text8(font, text, x0, y0, fg_color, bg_color)
-        else:
-            self._text16(font, text, x0, y0, fg_color, bg_color)
+        self.begin()
+        try:
+            if font.WIDTH == 8:
+                self._text8(font, text, x0, y0, fg_color, bg_color)
+            else:
+                self._text16(font, text, x0, y0, fg_color, bg_color)
+        finally:
+            self.end()
 
     def bitmap(self, bitmap, x, y, index=0):
         """
@@ -799,26 +1287,36 @@ class ST7789:
         bs_bit = bpp * bitmap_size * index  # if index > 0 else 0
         palette = bitmap.PALETTE
         needs_swap = self.needs_swap
-        buffer = bytearray(buffer_len)
 
-        for i in range(0, buffer_len, 2):
-            color_index = 0
-            for _ in range(bpp):
-                color_index = (color_index << 1) | (
-                    (bitmap.BITMAP[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1
-                )
-                bs_bit += 1
-
-            color = palette[color_index]
-            if needs_swap:
-                buffer[i] = color & 0xFF
-                buffer[i + 1] = color >> 8
-            else:
-                buffer[i] = color >> 8
-                buffer[i + 1] = color & 0xFF
+        # convert a band of whole rows at a time in the scratch buffer
+        row_len = width * 2
+        buffer = self._scratch_buffer(row_len)
+        band_len = min(buffer_len, len(buffer) // row_len * row_len)
+
+        self.begin()
+        try:
+            self._set_window(x, y, to_col, to_row)
+            for start in range(0, buffer_len, band_len):
+                chunk_len = min(band_len, buffer_len - start)
+                for i in range(0, chunk_len, 2):
+                    color_index = 0
+                    for _ in range(bpp):
+                        color_index = (color_index << 1) | (
+                            (bitmap.BITMAP[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1
+                        )
+                        bs_bit += 1
+
+                    color = palette[color_index]
+                    if needs_swap:
+                        buffer[i] = color & 0xFF
+                        buffer[i + 1] = color >> 8
+                    else:
+                        buffer[i] = color >> 8
+                        buffer[i + 1] = color & 0xFF
 
-        self._set_window(x, y, to_col, to_row)
-        self._write(None, buffer)
+                self._write(None, self._view(self._scratch_views, buffer, chunk_len))
+        finally:
+            self.end()
 
     def pbitmap(self, bitmap, x, y, index=0):
         """
@@ -839,9 +1337,10 @@ class ST7789:
         bs_bit = bpp * bitmap_size * index  # if index > 0 else 0
         palette = bitmap.PALETTE
         needs_swap = self.needs_swap
-        buffer = bytearray(bitmap.WIDTH * 2)
+        buffer = self._scratch_buffer(width * 2)
+        row = self._view(self._scratch_views, buffer, width * 2)
 
-        for row in range(height):
+        for row_index in range(height):
             for col in range(width):
                 color_index = 0
                 for _ in range(bpp):
@@ -859,10 +1358,9 @@ class ST7789:
                     buffer[col * 2 + 1] = color & 0xFF
 
             to_col = x + width - 1
-            to_row = y + row
+            to_row = y + row_index
             if self.width > to_col and self.height > to_row:
-                self._set_window(x, y + row, to_col, to_row)
-                self._write(None, buffer)
+                self.blit_buffer(row, x, to_row, width, 1)
 
     def write(self, font, string, x, y, fg=WHITE, bg=BLACK):
         """
@@ -877,8 +1375,7 @@ class ST7789:
             fg (int): foreground color, optional, defaults to WHITE
             bg (int): background color, optional, defaults to BLACK
         """
-        buffer_len = font.HEIGHT * font.MAX_WIDTH * 2
-        buffer = bytearray(buffer_len)
+        buffer = self._scratch_buffer(font.HEIGHT * font.MAX_WIDTH * 2)
         fg_hi = fg >> 8
         fg_lo = fg & 0xFF
 
@@ -912,8 +1409,13 @@ class ST7789:
                 to_col = x + char_width - 1
                 to_row = y + font.HEIGHT - 1
                 if self.width > to_col and self.height > to_row:
-                    self._set_window(x, y, to_col, to_row)
-                    self._write(None, buffer[:buffer_needed])
+                    self.blit_buffer(
+                        self._view(self._scratch_views, buffer, buffer_needed),
+                        x,
+                        y,
+                        char_width,
+                        font.HEIGHT,
+                    )
 
                 x += char_width
 
@@ -1,6 +1,7 @@
 import machine
 import time
 import random
+import framebuf
 
 # screen library
 import st7789py as st7789
@@ -34,6 +35,14 @@ tft = st7789.ST7789(
     rotation=1
 )
 
+# Off-screen composition: full screens (scramble, results) are composed in RAM with framebuf
+# and pushed with one blit_buffer per strip, instead of tft.fill() followed by text drawn
+# straight to the panel, which flickers. A whole 320x240 RGB565 frame is 150 KB, too much
+# for the Pico's RAM, so the screen is built STRIP_ROWS rows at a time.
+STRIP_ROWS = 24
+strip_buf = bytearray(REAL_WIDTH * STRIP_ROWS * 2)
+strip = framebuf.FrameBuffer(strip_buf, REAL_WIDTH, STRIP_ROWS, framebuf.RGB565)
+
 timer_pin = machine.Pin(15, machine.Pin.IN, machine.Pin.PULL_DOWN)   # Timer control (GP15)
 next_pin = machine.Pin(19, machine.Pin.IN, machine.Pin.PULL_DOWN)    # Next scramble / show avgs (GP19)
 
@@ -50,9 +59,10 @@ def draw_version():
     tft.text(font_small, version_str, 255, 210, st7789.RED)
 '''
 
-def draw_version():
+def draw_version(items=None):
     """Draw version in bottom-right corner with proper calculations
     Based on the coordinates (255, 210) that worked previously (the function above)
+    With `items`, the version is queued for show_composed() instead of drawn right away
     
     This is created with help from GitHub Copilot, using the previous function above"""
     version_str = VERSION
@@ -63,6 +73,10 @@ def draw_version():
     # Calculate position - preserve the right and bottom offsets that worked
     x = 255 - (version_width - len("v1.1.0") * font_small.WIDTH)  # Adjust if version is longer than v1.1.0
     y = 210  # Keep the y position that worked
+
+    if items is not None:
+        compose_text(items, font_small, version_str, x, y, st7789.RED)
+        return
     
     # Clear background area with a bit of padding
     tft.fill_rect(x-2, y-2, version_width+4, font_small.HEIGHT+4, st7789.BLACK)
@@ -70,6 +84,31 @@ def draw_version():
     # Draw version text
     tft.text(font_small, version_str, x, y, st7789.RED)
 
+def compose_text(items, font, text, x, y, color):
+    """Queue text for show_composed(), clipped the same way tft.text() does"""
+    for ch in text:
+        if font.FIRST <= ord(ch) < font.LAST:
+            if x + font.WIDTH > REAL_WIDTH or y + font.HEIGHT > REAL_HEIGHT:
+                break
+            items.append((font, ch, color, x, y))
+            x += font.WIDTH
+        elif font.WIDTH == 16:
+            x += 16
+
+def show_composed(items, background=st7789.BLACK):
+    """Draw the whole screen from queued text, one strip (and one blit_buffer) at a time"""
+    # framebuf keeps RGB565 little-endian, the panel wants big-endian
+    fill = ((background << 8) & 0xFF00) | (background >> 8)
+    with tft:
+        for top in range(0, REAL_HEIGHT, STRIP_ROWS):
+            strip.fill(fill)
+            for font, ch, color, x, y in items:
+                if y < top + STRIP_ROWS and y + font.HEIGHT > top:
+                    # Packed straight into the strip, in the panel's byte order; a screen
+                    # of big glyphs would only churn the glyph cache
+                    tft.pack_glyph(strip_buf, REAL_WIDTH, STRIP_ROWS, font, ch, x, y - top, color, background)
+            tft.blit_buffer(strip_buf, 0, top, REAL_WIDTH, STRIP_ROWS)
+
 def load_times():
     try:
         with open(RESULTS_FILE, "r") as f:
@@ -119,21 +158,22 @@ def wrap_scramble(scramble, max_line_len=15):
     return lines
 
 def display_scramble(scramble):
-    tft.fill(st7789.BLACK)
+    items = []
     title = "RasPiCube - PicoCube"
     x_title = max(0, (TFT_WIDTH - font_big.WIDTH * len(title)) // 2)
-    tft.text(font_big, title, x_title, 10, st7789.CYAN)
+    compose_text(items, font_big, title, x_title, 10, st7789.CYAN)
     subtitle = "Hold GP15 to prep"
     x_sub = max(0, (TFT_WIDTH - font_big.WIDTH * len(subtitle)) // 2)
-    tft.text(font_big, subtitle, x_sub, 45, st7789.YELLOW)
+    compose_text(items, font_big, subtitle, x_sub, 45, st7789.YELLOW)
     lines = wrap_scramble(scramble)
     block_height = len(lines) * 35
     y = max(70, (TFT_HEIGHT - block_height) // 2)
     for line in lines:
         x_line = max(0, (TFT_WIDTH - font_big.WIDTH * len(line)) // 2)
-        tft.text(font_big, line, x_line, y, st7789.WHITE)
+        compose_text(items, font_big, line, x_line, y, st7789.WHITE)
         y += 35
-    draw_version()
+    draw_version(items)
+    show_composed(items)
 
 def display_timer(time_val, running=True, clear_all=False):
     if clear_all:
@@ -146,9 +186,10 @@ def display_timer(time_val, running=True, clear_all=False):
     timer_width = font_big.WIDTH * len(timer_str)
     
     # Only clear the rectangle where the time will be displayed. This should increases the frame rate and reduce flickering
-    tft.fill_rect(x_timer, y_timer, timer_width, font_big.HEIGHT, st7789.BLACK)
-    
-    tft.text(font_big, timer_str, x_timer, y_timer, st7789.GREEN if running else st7789.CYAN)
+    # One SPI transaction (CS held low) for the clear and the digits
+    with tft:
+        tft.fill_rect(x_timer, y_timer, timer_width, font_big.HEIGHT, st7789.BLACK)
+        tft.text(font_big, timer_str, x_timer, y_timer, st7789.GREEN if running else st7789.CYAN)
 
 def avg_of(times, count):
     """
@@ -172,26 +213,27 @@ def display_results_and_avgs(latest_time, times, clear_msg=False):
     """
     Part of this function is created with assistance from GitHub Copilot, since my old method was not working
     """
-    tft.fill(st7789.BLACK)
+    items = []
     title = "Solve Results"
     x_title = max(0, (TFT_WIDTH - font_small.WIDTH * len(title)) // 2)
-    tft.text(font_small, title, x_title, 10, st7789.CYAN)
+    compose_text(items, font_small, title, x_title, 10, st7789.CYAN)
     if clear_msg:
         msg = "History Cleared!"
         x_msg = max(0, (TFT_WIDTH - font_small.WIDTH * len(msg)) // 2)
-        tft.text(font_small, msg, x_msg, 30, st7789.RED)
+        compose_text(items, font_small, msg, x_msg, 30, st7789.RED)
         prompt = "Tap GP15 to exit"
         x_prompt = max(0, (TFT_WIDTH - font_small.WIDTH * len(prompt)) // 2)
-        tft.text(font_small, prompt, x_prompt, TFT_HEIGHT - font_small.HEIGHT - 4, st7789.MAGENTA)
-        draw_version()
+        compose_text(items, font_small, prompt, x_prompt, TFT_HEIGHT - font_small.HEIGHT - 4, st7789.MAGENTA)
+        draw_version(items)
+        show_composed(items)
         return
     s = "Latest: {:.2f}".format(latest_time)
-    tft.text(font_small, s, 10, 40, st7789.GREEN)
+    compose_text(items, font_small, s, 10, 40, st7789.GREEN)
     y = 60
-    tft.text(font_small, "Last 5:", 10, y, st7789.YELLOW)
+    compose_text(items, font_small, "Last 5:", 10, y, st7789.YELLOW)
     for i, entry in enumerate(times[-5:][::-1]):
         t = entry["time"]
-        tft.text(font_small, "{:2d}: {:.2f}".format(len(times)-i, t), 70, y, st7789.WHITE)
+        compose_text(items, font_small, "{:2d}: {:.2f}".format(len(times)-i, t), 70, y, st7789.WHITE)
         y += font_small.HEIGHT + 2
     y += 10
 
@@ -201,23 +243,25 @@ def display_results_and_avgs(latest_time, times, clear_msg=False):
 
     ao5_str = "ao5:  --.--" if ao5 is None else "ao5: {:.2f}".format(ao5)
     ao12_str = "ao12: --.--" if ao12 is None else "ao12: {:.2f}".format(ao12)
-    tft.text(font_small, ao5_str, 10, y, st7789.CYAN)
+    compose_text(items, font_small, ao5_str, 10, y, st7789.CYAN)
     y += font_small.HEIGHT + 2
-    tft.text(font_small, ao12_str, 10, y, st7789.CYAN)
+    compose_text(items, font_small, ao12_str, 10, y, st7789.CYAN)
     prompt = "GP19: Clear | GP15: Exit"
     x_prompt = max(0, (TFT_WIDTH - font_small.WIDTH * len(prompt)) // 2)
-    tft.text(font_small, prompt, x_prompt, TFT_HEIGHT - font_small.HEIGHT - 4, st7789.MAGENTA)
-    draw_version()
+    compose_text(items, font_small, prompt, x_prompt, TFT_HEIGHT - font_small.HEIGHT - 4, st7789.MAGENTA)
+    draw_version(items)
+    show_composed(items)
 
 def display_are_you_sure():
-    tft.fill(st7789.BLACK)
+    items = []
     msg = "Are you sure?"
     x_msg = max(0, (TFT_WIDTH - font_small.WIDTH * len(msg)) // 2)
-    tft.text(font_small, msg, x_msg, 40, st7789.YELLOW)
+    compose_text(items, font_small, msg, x_msg, 40, st7789.YELLOW)
     msg2 = "GP19: Clear | GP15: Cancel"
     x_msg2 = max(0, (TFT_WIDTH - font_small.WIDTH * len(msg2)) // 2)
-    tft.text(font_small, msg2, x_msg2, 90, st7789.MAGENTA)
-    draw_version()
+    compose_text(items, font_small, msg2, x_msg2, 90, st7789.MAGENTA)
+    draw_version(items)
+    show_composed(items)
 
 def any_touch():
     return timer_pin.value() or next_pin.value()